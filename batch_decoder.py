@@ -0,0 +1,177 @@
+from bisect import bisect_right
+import numpy as np
+
+DECODE_MODES = ('insertion', 'semi_active')
+
+def decode_batch(population, mode='insertion'):
+    """
+    Giải mã cả quần thể trong 1 lượt NumPy trên dữ liệu CompiledInstance.
+
+    Vòng lặp chạy theo vị trí OS (total_ops bước), mỗi bước xử lý đồng thời mọi cá thể.
+    Ghi makespan, total_energy, wcm ngược lại vào từng Individual.
+
+    Args:
+        population (list): Danh sách Individual (cùng instance).
+        mode (str):
+            'insertion'   - Insertion-based (cho kết quả giống Individual.decode()).
+            'semi_active' - Không chèn vào khe hở: start = max(máy rảnh, job đến).
+
+    Lưu ý: không dựng detailed_schedule (để {}), VNS/ES sẽ tự decode() khi cần lịch chi tiết.
+    """
+    if mode not in DECODE_MODES:
+        raise ValueError(f"decode mode không hợp lệ: {mode}")
+    if not population:
+        return population
+
+    ci = population[0].compiled
+    factory = population[0].factory
+    P = len(population)
+    n = ci.total_ops
+    M = len(ci.machine_ids)
+    rows = np.arange(P)
+
+    MS = np.array([ind.ms for ind in population], dtype=np.int64).reshape(P, n)
+    OS = np.array([ind.os for ind in population], dtype=np.int64).reshape(P, n)
+
+    # --- A. Breakdown (dùng chung cho cả quần thể) ---
+    bd_starts, bd_ends, bd_total = [], [], np.zeros(M)
+    mach_end_init = np.zeros(M)
+    for c, m in enumerate(factory.machines):
+        history = getattr(m, 'breakdown_history', None) or []
+        starts, ends = [], []
+        for bd in history:
+            idx = bisect_right(starts, bd['start'])
+            starts.insert(idx, bd['start'])
+            ends.insert(idx, bd['end'])
+            if bd['end'] > mach_end_init[c]:
+                mach_end_init[c] = bd['end']
+        bd_starts.append(starts)
+        bd_ends.append(ends)
+        # Giống Individual.decode(): cộng theo thứ tự lịch sử hỏng
+        bd_total[c] = sum(bd['end'] - bd['start'] for bd in history)
+
+    # Mọi trạng thái lưu dạng phẳng (cá thể x job / cá thể x máy) để gather/scatter 1 chiều
+    num_slots = ci.max_slots
+    num_job_rows = len(ci.job_first_op)
+    job_base = rows * num_job_rows
+    mach_base = rows * M
+    ms_base = rows * n
+
+    machine_of = ci.machine_of.ravel()
+    col_flat = ci.col_of.ravel()
+    PT_flat = ci.PT.ravel()
+    ST_flat = ci.ST.ravel()
+    AP_flat = ci.AP.ravel()
+    AS_flat = ci.AS.ravel()
+    TT_flat = ci.TT.ravel()
+    num_tt = ci.TT.shape[1] if ci.TT.ndim == 2 else 0
+
+    mach_end = np.tile(mach_end_init, P)
+
+    if mode == 'insertion':
+        # Timeline đã sort của từng (cá thể, máy); start đệm +inf (để bisect bằng phép đếm).
+        # tl_start[:, 0] = -inf và tl_end[:, 0] = 0.0 là cột giả "khối trước khối đầu tiên"
+        # -> tl_end[:, j] chính là prev_end của khối j (giống prev_block_end = 0.0 ban đầu).
+        K = ci.max_ops_per_machine + max(len(s) for s in bd_starts) + 1
+        tl_start = np.full((P * M, K + 1), np.inf)
+        tl_end = np.zeros((P * M, K + 1))
+        tl_start[:, 0] = -np.inf
+        tl_count = np.zeros(P * M, dtype=np.int64)
+        for c in range(M):
+            nb = len(bd_starts[c])
+            if nb:
+                tl_start[c::M, 1:nb + 1] = bd_starts[c]
+                tl_end[c::M, 1:nb + 1] = bd_ends[c]
+                tl_count[c::M] = nb
+        cols = np.arange(K)
+
+    job_counter = np.zeros(P * num_job_rows, dtype=np.int64)
+    job_end = np.zeros(P * num_job_rows)
+    job_prev = np.full(P * num_job_rows, -1, dtype=np.int64)
+    busy = np.zeros(P * M)
+
+    E_processing = np.zeros(P)
+    E_setup = np.zeros(P)
+    E_transport = np.zeros(P)
+
+    OS_by_pos = np.ascontiguousarray(OS.T)
+    MS_flat = MS.ravel()
+
+    # --- B. Vòng lặp giải mã theo vị trí OS (vector hóa theo cá thể) ---
+    for pos in range(n):
+        job = OS_by_pos[pos]
+        jf = job_base + job
+        k = job_counter[jf]
+        job_counter[jf] = k + 1
+        g = ci.job_first_op[job] + k
+        gs = g * num_slots + MS_flat[ms_base + g]
+
+        m_id = machine_of[gs]
+        mc = mach_base + col_flat[gs]
+        PT = PT_flat[gs]
+        ST = ST_flat[gs]
+
+        # Arrival time (+ vận chuyển nếu đổi máy)
+        prev_m = job_prev[jf]
+        moved = (prev_m >= 0) & (prev_m != m_id)
+        transport = np.where(moved, TT_flat[np.maximum(prev_m, 0) * num_tt + m_id], 0.0)
+        E_transport += np.where(moved, transport * ci.UT_k, 0.0)
+        arrival = job_end[jf] + transport
+
+        duration = PT + ST
+        E_processing += AP_flat[gs] * PT
+        E_setup += AS_flat[gs] * ST
+
+        if mode == 'insertion':
+            count = tl_count[mc]
+            width = int(count.max()) + 1
+            S_ext = tl_start[mc, :width + 1]
+            E_ext = tl_end[mc, :width + 1]
+            S = S_ext[:, 1:]
+            prev_end = E_ext[:, :-1]
+
+            cw = cols[:width]
+            dur = duration[:, None]
+            fits = (cw < count[:, None]) & (S - prev_end >= dur) & \
+                   (np.maximum(prev_end, arrival[:, None]) + dur <= S)
+            has_gap = fits.any(axis=1)
+            first = fits.argmax(axis=1)
+            gap_start = np.maximum(prev_end.ravel()[rows * width + first], arrival)
+            start = np.where(has_gap, gap_start, np.maximum(mach_end[mc], arrival))
+            end = start + duration
+
+            # Chèn [start, end) vào timeline (sau các khối cùng start)
+            ins = (S <= start[:, None]).sum(axis=1)[:, None]
+            before = cw < ins
+            at = cw == ins
+            tl_start[mc, 1:width + 1] = np.where(before, S, np.where(at, start[:, None], S_ext[:, :-1]))
+            tl_end[mc, 1:width + 1] = np.where(before, E_ext[:, 1:], np.where(at, end[:, None], prev_end))
+            tl_count[mc] = count + 1
+        else:
+            start = np.maximum(mach_end[mc], arrival)
+            end = start + duration
+
+        mach_end[mc] = np.maximum(mach_end[mc], end)
+        busy[mc] += end - start
+        job_end[jf] = end
+        job_prev[jf] = m_id
+
+    mach_end = mach_end.reshape(P, M)
+    busy = busy.reshape(P, M)
+
+    # --- C. Tính toán Fitness (cùng thứ tự phép tính với Individual.decode) ---
+    makespan = mach_end.max(axis=1) if M else np.zeros(P)
+    wcm = np.maximum(busy.max(axis=1), 0.0) if M else np.zeros(P)
+    E_idle = np.zeros(P)
+    for c in range(M):
+        idle = np.maximum(0.0, mach_end[:, c] - busy[:, c] - bd_total[c])
+        E_idle += idle * ci.AI[c]
+    E_common = makespan * ci.AC
+    total_energy = E_processing + E_setup + E_transport + E_idle + E_common
+
+    for i, ind in enumerate(population):
+        ind.makespan = float(makespan[i])
+        ind.total_energy = float(total_energy[i])
+        ind.wcm = float(wcm[i])
+        ind.detailed_schedule = {}
+    return population
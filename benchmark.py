@@ -0,0 +1,687 @@
+import io
+import csv
+import copy
+import json
+import time
+import platform
+import random
+import argparse
+import contextlib
+import os
+import sys
+import tracemalloc
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource # Chỉ có trên Unix (peak RSS)
+except ImportError:
+    resource = None
+
+from data_loader import DataLoader
+from factory_model import Parameter, Machine, Job, Operation, Factory
+from initialization import Initialization
+from individual import Individual
+from nsga2_utils import NSGAII_Utils, RankedPopulation
+from batch_decoder import decode_batch
+from numba_decoder import NUMBA_AVAILABLE
+from parallel_evaluator import ParallelEvaluator
+import quality_indicators
+from kearl_framework import KEARL_Framework, PHASES
+from variable_neighborhood_search import VariableNeighborhoodSearch
+
+# --- CẤU HÌNH ---
+BASE_DATA_DIR = "./data"
+DEFAULT_INSTANCES = ["mk01", "mk02", "mk03", "mk04", "mk05"]
+
+def load_instance(instance_name):
+    """Load instance (ẩn log của DataLoader)."""
+    loader = DataLoader(os.path.join(BASE_DATA_DIR, instance_name))
+    with contextlib.redirect_stdout(io.StringIO()):
+        factory, jobs = loader.load_instance(instance_name)
+    return factory, jobs
+
+def synthetic_instance(num_ops, num_machines=10, ops_per_job=10, seed=0):
+    """
+    Sinh instance tổng hợp (kiểu Brandimarte) với num_ops operations.
+    Mỗi operation có 1-3 máy khả dụng, PT trong [1, 20], ST trong [0, 5].
+    """
+    rnd = random.Random(seed)
+    params = Parameter()
+    params.n = max(1, num_ops // ops_per_job)
+    params.m = num_machines
+    params.TT_matrix = [[0.0 if a == b else float(rnd.randint(1, 5)) for b in range(num_machines)]
+                        for a in range(num_machines)]
+
+    machines = [Machine(machine_id=k, energy_idle_unit=float(rnd.randint(1, 3))) for k in range(num_machines)]
+    jobs = []
+    for i in range(params.n):
+        job = Job(job_id=i)
+        for j in range(ops_per_job):
+            op = Operation(job_id=i, op_id=j)
+            for m_id in rnd.sample(range(num_machines), rnd.randint(1, 3)):
+                op.add_machine_info(m_id, PT=float(rnd.randint(1, 20)), AP=float(rnd.randint(3, 8)),
+                                    ST=float(rnd.randint(0, 5)), AS=float(rnd.randint(2, 4)))
+            job.operations.append(op)
+        jobs.append(job)
+    return Factory(params, machines, jobs), jobs
+
+def random_population(factory, jobs, size, seed=0):
+    """Sinh quần thể ngẫu nhiên (Strategy 1) phục vụ đo đạc."""
+    random.seed(seed)
+    init_module = Initialization(size, 1.0, 0.0, 0.0, 0.0, jobs, factory)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return init_module.generate_population()
+
+def _time_loop(func, min_time):
+    """Gọi func() lặp lại tới khi đủ min_time giây. Trả về (số lần gọi, thời gian)."""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+# ========================================================
+#               BENCHMARK: DECODE THROUGHPUT
+# ========================================================
+def bench_decode(args):
+    print(f"{'Instance':<10} | {'Ops':<6} | {'Decoder':<7} | {'Decodes':<8} | {'Time(s)':<8} | {'Decodes/s':<10}")
+    print("-" * 64)
+    decoders = [("python", Individual.decode_python)]
+    if NUMBA_AVAILABLE:
+        decoders.append(("jit", Individual.decode_jit))
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size)
+
+        for name, decode in decoders:
+            def decode_all():
+                for ind in population:
+                    decode(ind)
+
+            decode_all() # Warm-up (+ biên dịch JIT)
+            calls, elapsed = _time_loop(decode_all, args.min_time)
+            n_decodes = calls * len(population)
+            print(f"{instance:<10} | {population[0].total_ops:<6} | {name:<7} | {n_decodes:<8} | {elapsed:<8.2f} | {n_decodes / elapsed:<10.1f}")
+
+# ========================================================
+#               CONFORMANCE: JIT KERNEL vs PYTHON DECODE
+# ========================================================
+def _schedule_signature(ind):
+    return {m_id: [(t['start'], t['end'], t['type'], t['op']) for t in tasks]
+            for m_id, tasks in ind.detailed_schedule.items()}
+
+def check_conformance(args):
+    """
+    Chạy decode_python() và decode_jit() trên các genome ngẫu nhiên (có và không có breakdown),
+    yêu cầu MCT, TEC, WCM và detailed_schedule giống hệt nhau. Thoát với mã 1 nếu lệch.
+    """
+    print(f"Numba: {'có' if NUMBA_AVAILABLE else 'không (kernel chạy dạng Python thuần)'}")
+    rnd = random.Random(args.seed)
+    total_bad = 0
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size, seed=args.seed)
+        bad = 0
+        for phase in ("no breakdown", "breakdown"):
+            if phase == "breakdown":
+                for m in rnd.sample(factory.machines, max(1, len(factory.machines) // 3)):
+                    for _ in range(rnd.randint(1, 3)):
+                        m.set_broken(rnd.uniform(1, 20), rnd.uniform(0, 100))
+            for ind in population:
+                ind.decode_python()
+                expected = (ind.makespan, ind.total_energy, ind.wcm, _schedule_signature(ind))
+                ind.decode_jit()
+                actual = (ind.makespan, ind.total_energy, ind.wcm, _schedule_signature(ind))
+                if actual != expected:
+                    bad += 1
+                    if bad <= 3:
+                        print(f"  MISMATCH {instance} ({phase}): python={expected[:3]} jit={actual[:3]}")
+        total_bad += bad
+        print(f"{instance:<10} | {2 * len(population)} genomes | {'OK' if bad == 0 else f'{bad} lệch'}")
+    if total_bad:
+        sys.exit(1)
+
+# ========================================================
+#               BENCHMARK: INCREMENTAL RE-DECODE
+# ========================================================
+def bench_incremental(args):
+    """
+    So sánh decode đầy đủ với decode tăng dần (decode(base=...)) cho các láng giềng
+    đổi máy 1 operation (kiểu N1/ES) và kiểm tra kết quả giống hệt nhau.
+    """
+    Individual.use_jit = NUMBA_AVAILABLE and not args.python
+    print(f"Decoder: {'jit' if Individual.use_jit else 'python'}")
+    print(f"{'Instance':<10} | {'Ops':<6} | {'Full(us)':<9} | {'Incr(us)':<9} | {'Speed-up':<8} | {'Check':<5}")
+    print("-" * 62)
+    rnd = random.Random(args.seed)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size, seed=args.seed)
+        moves = []
+        for base in population:
+            base.decode()
+            flexible = [g for g in range(base.total_ops) if base.compiled.num_slots_list[g] > 1]
+            for _ in range(args.moves):
+                neighbor = base.clone(copy_objectives=False)
+                g = rnd.choice(flexible)
+                neighbor.ms[g] = (neighbor.ms[g] + 1) % base.compiled.num_slots_list[g]
+                moves.append((base, neighbor, base.os_position(g)))
+
+        def full():
+            for _, neighbor, _ in moves:
+                neighbor.decode()
+
+        def incremental():
+            for base, neighbor, first_pos in moves:
+                neighbor.decode(base=base, first_pos=first_pos)
+
+        full()
+        expected = [(nb.makespan, nb.total_energy, nb.wcm, _schedule_signature(nb)) for _, nb, _ in moves]
+        incremental()
+        ok = expected == [(nb.makespan, nb.total_energy, nb.wcm, _schedule_signature(nb)) for _, nb, _ in moves]
+
+        calls_f, elapsed_f = _time_loop(full, args.min_time)
+        calls_i, elapsed_i = _time_loop(incremental, args.min_time)
+        us_full = elapsed_f / (calls_f * len(moves)) * 1e6
+        us_incr = elapsed_i / (calls_i * len(moves)) * 1e6
+        print(f"{instance:<10} | {population[0].total_ops:<6} | {us_full:<9.1f} | {us_incr:<9.1f} | {us_full / us_incr:<8.2f} | {'OK' if ok else 'FAIL':<5}")
+
+# ========================================================
+#               BENCHMARK: SCALAR vs BATCH DECODE
+# ========================================================
+def bench_batch(args):
+    print(f"{'Instance':<10} | {'Decoder':<20} | {'Individuals/s':<13} | {'Speed-up':<8}")
+    print("-" * 60)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size)
+
+        def scalar():
+            for ind in population:
+                ind.decode()
+
+        decoders = [("scalar decode()", scalar),
+                    ("batch insertion", lambda: decode_batch(population, mode='insertion')),
+                    ("batch semi_active", lambda: decode_batch(population, mode='semi_active'))]
+        base_rate = None
+        for name, func in decoders:
+            calls, elapsed = _time_loop(func, args.min_time)
+            rate = calls * len(population) / elapsed
+            base_rate = base_rate or rate
+            print(f"{instance:<10} | {name:<20} | {rate:<13.1f} | {rate / base_rate:<8.2f}")
+
+# ========================================================
+#               BENCHMARK: PROCESS-POOL EVALUATION
+# ========================================================
+def bench_parallel(args):
+    print(f"{'Instance':<10} | {'Workers':<7} | {'Individuals/s':<13} | {'Speed-up':<8}")
+    print("-" * 48)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size)
+        base_rate = None
+        for workers in args.workers:
+            evaluator = ParallelEvaluator(factory, jobs, workers=workers)
+            evaluator.evaluate(population) # Warm-up (khởi động pool)
+            calls, elapsed = _time_loop(lambda: evaluator.evaluate(population), args.min_time)
+            evaluator.close()
+            rate = calls * len(population) / elapsed
+            base_rate = base_rate or rate
+            print(f"{instance:<10} | {workers:<7} | {rate:<13.1f} | {rate / base_rate:<8.2f}")
+
+# ========================================================
+#               BENCHMARK: DECODE SCALING (SYNTHETIC)
+# ========================================================
+def bench_scaling(args):
+    print(f"{'Ops':<6} | {'Machines':<8} | {'Decodes':<8} | {'ms/decode':<10}")
+    print("-" * 42)
+    for num_ops in args.sizes:
+        factory, jobs = synthetic_instance(num_ops, num_machines=args.machines)
+        population = random_population(factory, jobs, args.pop_size)
+
+        def decode_all():
+            for ind in population:
+                ind.decode()
+
+        calls, elapsed = _time_loop(decode_all, args.min_time)
+        n_decodes = calls * len(population)
+        print(f"{population[0].total_ops:<6} | {args.machines:<8} | {n_decodes:<8} | {elapsed / n_decodes * 1e3:<10.2f}")
+
+# ========================================================
+#               BENCHMARK: INDIVIDUAL CONSTRUCTION
+# ========================================================
+def bench_construct(args):
+    print(f"{'Instance':<10} | {'Ops':<6} | {'Individuals':<11} | {'us/Individual':<13}")
+    print("-" * 50)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        Individual(jobs, factory) # Warm-up (biên dịch instance)
+
+        def construct_batch():
+            for _ in range(100):
+                Individual(jobs, factory)
+
+        calls, elapsed = _time_loop(construct_batch, args.min_time)
+        n_inds = calls * 100
+        total_ops = sum(len(j.operations) for j in jobs)
+        print(f"{instance:<10} | {total_ops:<6} | {n_inds:<11} | {elapsed / n_inds * 1e6:<13.2f}")
+
+# ========================================================
+#               BENCHMARK: DEEPCOPY vs CLONE
+# ========================================================
+def bench_clone(args):
+    print(f"{'Instance':<10} | {'Method':<9} | {'us/copy':<10} | {'KiB/copy':<10}")
+    print("-" * 48)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size)
+        for ind in population:
+            ind.decode()
+        # Giống trạng thái trong KEARL_Framework.run (rank...)
+        NSGAII_Utils.fast_non_dominated_sort(population)
+
+        methods = [("deepcopy", copy.deepcopy), ("clone", lambda ind: ind.clone())]
+        for name, copy_func in methods:
+            calls, elapsed = _time_loop(lambda: [copy_func(ind) for ind in population], args.min_time)
+            us_per_copy = elapsed / (calls * len(population)) * 1e6
+
+            tracemalloc.start()
+            copies = [copy_func(ind) for ind in population]
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del copies
+            kib_per_copy = size / len(population) / 1024
+            print(f"{instance:<10} | {name:<9} | {us_per_copy:<10.1f} | {kib_per_copy:<10.1f}")
+
+# ========================================================
+#               BENCHMARK: NON-DOMINATED SORTING
+# ========================================================
+def bench_sort(args):
+    """
+    So sánh naive_non_dominated_sort (O(M.N^2)) với fast_non_dominated_sort (NumPy)
+    trên quần thể đã decode, kiểm tra các front (và thứ tự trong front) giống hệt nhau.
+    Bản gốc chỉ chạy khi N <= --naive-limit (N = 10000 mất vài phút).
+    Select(ms): select_survivors(N/2) (phân lớp + crowding + cắt front cuối).
+    """
+    print(f"{'Instance':<10} | {'N':<6} | {'Fronts':<6} | {'Naive(ms)':<10} | {'Fast(ms)':<9} | {'Speed-up':<8} | {'Select(ms)':<10} | {'Check':<5}")
+    print("-" * 85)
+    factory, jobs = load_instance(args.instance)
+    for size in args.sizes:
+        population = random_population(factory, jobs, size, seed=args.seed)
+        decode_batch(population, mode='insertion')
+
+        calls, elapsed = _time_loop(lambda: NSGAII_Utils.fast_non_dominated_sort(population), args.min_time)
+        ms_fast = elapsed / calls * 1e3
+        calls, elapsed = _time_loop(lambda: NSGAII_Utils.select_survivors(population, size // 2), args.min_time)
+        ms_select = elapsed / calls * 1e3
+        fronts = NSGAII_Utils.fast_non_dominated_sort(population)
+        ms_naive, check = float('nan'), '-'
+        if size <= args.naive_limit:
+            calls, elapsed = _time_loop(lambda: NSGAII_Utils.naive_non_dominated_sort(population), args.min_time)
+            ms_naive = elapsed / calls * 1e3
+            expected = NSGAII_Utils.naive_non_dominated_sort(population)
+            check = 'OK' if [list(map(id, f)) for f in expected] == [list(map(id, f)) for f in fronts] else 'FAIL'
+        print(f"{args.instance:<10} | {size:<6} | {len(fronts):<6} | {ms_naive:<10.2f} | {ms_fast:<9.2f} | {ms_naive / ms_fast:<8.2f} | {ms_select:<10.2f} | {check:<5}")
+
+# ========================================================
+#               BENCHMARK: SORTING WITHIN ONE GENERATION
+# ========================================================
+def bench_generation_sort(args):
+    """
+    Thời gian phân lớp trong 1 thế hệ (như KEARL_Framework.run):
+        trước: fast_non_dominated_sort trước VNS, trước ES và trong select_survivors.
+        sau: RankedPopulation dựng 1 lần, extend() kết quả VNS/ES, select_survivors().
+    Kết quả VNS (5 cá thể mới) và ES (front 0: cá thể mới hoặc chính cá thể gốc) được sinh trước.
+    """
+    print(f"{'Instance':<10} | {'Pop':<5} | {'Before(ms)':<10} | {'After(ms)':<9} | {'Speed-up':<8} | {'Check':<5}")
+    print("-" * 60)
+    rnd = random.Random(args.seed)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        combined = random_population(factory, jobs, 2 * args.pop_size, seed=args.seed)
+        decode_batch(combined, mode='insertion')
+
+        def mutant(ind):
+            new_ind = ind.clone(copy_objectives=False)
+            new_ind.mutation_machine_selection(mutation_rate=0.1)
+            new_ind.decode()
+            return new_ind
+
+        top_front = NSGAII_Utils.fast_non_dominated_sort(combined)[0]
+        vns_list = [mutant(ind) for ind in top_front[:5]]
+        es_front = NSGAII_Utils.fast_non_dominated_sort(combined + vns_list)[0]
+        es_list = [mutant(ind) if rnd.random() < 0.5 else ind for ind in es_front]
+
+        def before():
+            pop = list(combined)
+            NSGAII_Utils.fast_non_dominated_sort(pop)
+            pop.extend(vns_list)
+            NSGAII_Utils.fast_non_dominated_sort(pop)
+            pop.extend(es_list)
+            return NSGAII_Utils.select_survivors(pop, args.pop_size)
+
+        def after():
+            pop = RankedPopulation(combined)
+            pop.first_front()
+            pop.extend(vns_list)
+            pop.first_front()
+            pop.extend(es_list)
+            return pop.select_survivors(args.pop_size)
+
+        ok = list(map(id, before())) == list(map(id, after()))
+        calls_b, elapsed_b = _time_loop(before, args.min_time)
+        calls_a, elapsed_a = _time_loop(after, args.min_time)
+        ms_before = elapsed_b / calls_b * 1e3
+        ms_after = elapsed_a / calls_a * 1e3
+        print(f"{instance:<10} | {args.pop_size:<5} | {ms_before:<10.2f} | {ms_after:<9.2f} | {ms_before / ms_after:<8.2f} | {'OK' if ok else 'FAIL':<5}")
+
+# ========================================================
+#               BENCHMARK: HYPERVOLUME 3-D
+# ========================================================
+def bench_hypervolume(args):
+    """Thời gian hypervolume_3d trên front tổng hợp (các điểm gần mặt x + y + z = 1.5)."""
+    print(f"{'Points':<7} | {'Non-dominated':<13} | {'ms/HV':<8}")
+    print("-" * 34)
+    rng = np.random.default_rng(args.seed)
+    for n in args.sizes:
+        xy = rng.random((n, 2))
+        points = np.column_stack([xy, 1.5 - xy.sum(axis=1) + 0.1 * rng.random(n)])
+        n_front = int((NSGAII_Utils.pareto_ranks(points) == 0).sum())
+        calls, elapsed = _time_loop(lambda: quality_indicators.hypervolume_3d(points, (2.0, 2.0, 2.0)), args.min_time)
+        print(f"{n:<7} | {n_front:<13} | {elapsed / calls * 1e3:<8.2f}")
+
+# ========================================================
+#               BENCHMARK: N1' TABU SEARCH
+# ========================================================
+def bench_n1(args):
+    """Thời gian 1 lần operator_n1_tabu_search (ReassignmentEvaluator) theo max_iter."""
+    Individual.use_jit = NUMBA_AVAILABLE and not args.python
+    print(f"Decoder: {'jit' if Individual.use_jit else 'python'}")
+    print(f"{'Instance':<10} | {'Ops':<6} | {'Max iter':<8} | {'Neighbors':<9} | {'ms/call':<8} | {'us/neighbor':<11}")
+    print("-" * 67)
+    for instance in args.instances:
+        factory, jobs = load_instance(instance)
+        population = random_population(factory, jobs, args.pop_size, seed=args.seed)
+        for ind in population:
+            ind.decode()
+        for max_iter in args.max_iters:
+            vns = VariableNeighborhoodSearch(factory, max_iter=max_iter, rng=random.Random(args.seed))
+
+            def search_all():
+                for ind in population:
+                    vns.tabu_list = []
+                    vns.operator_n1_tabu_search(ind)
+
+            search_all() # Warm-up (+ biên dịch JIT)
+            vns.evaluations = 0
+            calls, elapsed = _time_loop(search_all, args.min_time)
+            n_calls = calls * len(population)
+            print(f"{instance:<10} | {population[0].total_ops:<6} | {max_iter:<8} | {vns.evaluations / n_calls:<9.1f} | "
+                  f"{elapsed / n_calls * 1e3:<8.2f} | {elapsed / max(vns.evaluations, 1) * 1e6:<11.2f}")
+
+# ========================================================
+#               BENCHMARK: KEARL END-TO-END (INSTANCES x SEEDS)
+# ========================================================
+def _peak_rss_mb():
+    """Peak RSS của process hiện tại (MB), None nếu không đo được."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _kearl_run(instance, seed, pop_size, max_gen, workers, vns_block_scan=False):
+    """1 lần chạy KEARL_Framework (ẩn log). Trả về dict kết quả (1 dòng của report)."""
+    factory, jobs = load_instance(instance)
+    algorithm = KEARL_Framework(factory, jobs, pop_size=pop_size, max_gen=max_gen, workers=workers, seed=seed,
+                                vns_block_scan=vns_block_scan)
+
+    decodes_before = Individual.decode_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        front, best = algorithm.run()
+    wall_time = time.perf_counter() - start
+    decodes = Individual.decode_count - decodes_before
+
+    result = {
+        "instance": instance,
+        "seed": seed,
+        "wall_time": wall_time,
+        "decodes": decodes,
+        "decodes_per_sec": decodes / wall_time if wall_time > 0 else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "best_makespan": best.makespan if best is not None else None,
+        "best_total_energy": best.total_energy if best is not None else None,
+        "best_wcm": best.wcm if best is not None else None,
+        "archive_size": len(front),
+        "hypervolume": algorithm.indicator_history[-1]["hv"] if algorithm.indicator_history else None,
+    }
+    for phase in PHASES:
+        result[f"phase_{phase}"] = algorithm.phase_times[phase]
+    return result
+
+def _write_csv(path, runs):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(runs[0].keys()))
+        writer.writeheader()
+        writer.writerows(runs)
+
+def _load_report(path):
+    """Đọc report dạng JSON (bench_kearl --json) hoặc CSV (--csv). Trả về list các lần chạy."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            for key, value in row.items():
+                if key != "instance":
+                    row[key] = float(value) if value not in ("", "None") else None
+        return rows
+    with open(path) as f:
+        return json.load(f)["runs"]
+
+def bench_kearl(args):
+    """
+    Chạy KEARL_Framework trên các instance x seed, mỗi lần chạy trong 1 process mới
+    (peak RSS không bị lẫn giữa các lần chạy; --in-process để chạy tuần tự trong process hiện tại).
+    In thời gian theo pha (KEARL_Framework.phase_times), decodes/s, peak RSS, objectives cuối;
+    ghi report JSON/CSV nếu có --json/--csv.
+    """
+    print(f"{'Instance':<10} | {'Seed':<4} | {'Wall(s)':<7} | {'Decodes/s':<9} | {'RSS(MB)':<7} | {'MCT':<8} | {'TEC':<10} | {'WCM':<7} | {'HV':<10}")
+    print("-" * 96)
+    runs = []
+    for instance in args.instances:
+        for seed in args.seeds:
+            run_args = (instance, seed, args.pop_size, args.max_gen, args.workers, args.vns_block_scan)
+            if args.in_process:
+                result = _kearl_run(*run_args)
+            else:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(_kearl_run, *run_args).result()
+            runs.append(result)
+            rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else "-"
+            hv = f"{result['hypervolume']:.4g}" if result['hypervolume'] is not None else "-"
+            print(f"{instance:<10} | {seed:<4} | {result['wall_time']:<7.2f} | {result['decodes_per_sec']:<9.1f} | {rss:<7} | "
+                  f"{result['best_makespan']:<8.1f} | {result['best_total_energy']:<10.1f} | {result['best_wcm']:<7.1f} | {hv:<10}")
+
+    print()
+    print("Thời gian theo pha (trung bình, % wall time):")
+    print(f"{'Instance':<10} | " + " | ".join(f"{phase[:8]:<8}" for phase in PHASES))
+    print("-" * (13 + 11 * len(PHASES)))
+    for instance in args.instances:
+        rows = [r for r in runs if r["instance"] == instance]
+        wall = sum(r["wall_time"] for r in rows)
+        shares = [100 * sum(r[f"phase_{phase}"] for r in rows) / wall for phase in PHASES]
+        print(f"{instance:<10} | " + " | ".join(f"{share:<8.1f}" for share in shares))
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numba": NUMBA_AVAILABLE,
+            "pop_size": args.pop_size,
+            "max_gen": args.max_gen,
+            "workers": args.workers,
+            "seeds": args.seeds,
+        },
+        "runs": runs,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"-> Đã ghi {args.json}")
+    if args.csv:
+        _write_csv(args.csv, runs)
+        print(f"-> Đã ghi {args.csv}")
+
+# Chỉ số so sánh: (tên cột, hướng tốt: +1 = càng lớn càng tốt, -1 = càng nhỏ càng tốt, loại ngưỡng)
+COMPARE_METRICS = [
+    ("wall_time", -1, "time"),
+    ("decodes_per_sec", +1, "time"),
+    ("peak_rss_mb", -1, "time"),
+    ("best_makespan", -1, "quality"),
+    ("best_total_energy", -1, "quality"),
+    ("hypervolume", +1, "quality"),
+]
+
+def compare_reports(args):
+    """
+    So sánh 2 report (trung bình theo instance). Đánh dấu REGRESSION khi chỉ số xấu đi quá ngưỡng
+    (--time-tolerance cho thời gian/bộ nhớ, --quality-tolerance cho objectives). Thoát với mã 1 nếu có.
+    """
+    base_runs, new_runs = _load_report(args.base), _load_report(args.new)
+    tolerances = {"time": args.time_tolerance, "quality": args.quality_tolerance}
+    print(f"{'Instance':<10} | {'Metric':<17} | {'Base':<12} | {'New':<12} | {'Change':<8} | Status")
+    print("-" * 80)
+    regressions = 0
+    instances = [i for i in dict.fromkeys(r["instance"] for r in base_runs) if any(r["instance"] == i for r in new_runs)]
+    for instance in instances:
+        for metric, direction, kind in COMPARE_METRICS:
+            base_vals = [r[metric] for r in base_runs if r["instance"] == instance and r.get(metric) is not None]
+            new_vals = [r[metric] for r in new_runs if r["instance"] == instance and r.get(metric) is not None]
+            if not base_vals or not new_vals:
+                continue
+            base, new = float(np.mean(base_vals)), float(np.mean(new_vals))
+            change = (new - base) / abs(base) if base != 0 else 0.0
+            worse = -direction * change
+            status = "REGRESSION" if worse > tolerances[kind] else ("better" if worse < -tolerances[kind] else "ok")
+            regressions += status == "REGRESSION"
+            print(f"{instance:<10} | {metric:<17} | {base:<12.4g} | {new:<12.4g} | {100 * change:<+7.1f}% | {status}")
+    print(f"-> {regressions} regression(s)")
+    if regressions:
+        sys.exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark các thành phần của KEARL.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_decode = sub.add_parser("decode", help="Đo số lần Individual.decode()/giây.")
+    p_decode.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_decode.add_argument("--pop-size", type=int, default=50)
+    p_decode.add_argument("--min-time", type=float, default=2.0)
+    p_decode.set_defaults(func=bench_decode)
+
+    p_conf = sub.add_parser("conformance", help="Kiểm tra kernel JIT cho kết quả giống decode Python thuần.")
+    p_conf.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_conf.add_argument("--pop-size", type=int, default=100)
+    p_conf.add_argument("--seed", type=int, default=0)
+    p_conf.set_defaults(func=check_conformance)
+
+    p_incr = sub.add_parser("incremental", help="So sánh decode đầy đủ với decode tăng dần từ cá thể gốc.")
+    p_incr.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_incr.add_argument("--pop-size", type=int, default=20)
+    p_incr.add_argument("--moves", type=int, default=5)
+    p_incr.add_argument("--seed", type=int, default=0)
+    p_incr.add_argument("--python", action="store_true", help="Dùng decode Python thuần thay cho kernel JIT.")
+    p_incr.add_argument("--min-time", type=float, default=1.0)
+    p_incr.set_defaults(func=bench_incremental)
+
+    p_batch = sub.add_parser("batch", help="So sánh decode() từng cá thể với decode_batch().")
+    p_batch.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_batch.add_argument("--pop-size", type=int, default=100)
+    p_batch.add_argument("--min-time", type=float, default=2.0)
+    p_batch.set_defaults(func=bench_batch)
+
+    p_parallel = sub.add_parser("parallel", help="Đo ParallelEvaluator.evaluate() theo số worker.")
+    p_parallel.add_argument("--instances", nargs="+", default=["mk05"])
+    p_parallel.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    p_parallel.add_argument("--pop-size", type=int, default=200)
+    p_parallel.add_argument("--min-time", type=float, default=2.0)
+    p_parallel.set_defaults(func=bench_parallel)
+
+    p_scaling = sub.add_parser("scaling", help="Đo thời gian decode trên instance tổng hợp 500-5000 ops.")
+    p_scaling.add_argument("--sizes", nargs="+", type=int, default=[500, 1000, 2000, 5000])
+    p_scaling.add_argument("--machines", type=int, default=10)
+    p_scaling.add_argument("--pop-size", type=int, default=5)
+    p_scaling.add_argument("--min-time", type=float, default=2.0)
+    p_scaling.set_defaults(func=bench_scaling)
+
+    p_construct = sub.add_parser("construct", help="Đo chi phí khởi tạo một Individual.")
+    p_construct.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_construct.add_argument("--min-time", type=float, default=1.0)
+    p_construct.set_defaults(func=bench_construct)
+
+    p_clone = sub.add_parser("clone", help="So sánh thời gian/bộ nhớ copy.deepcopy và Individual.clone().")
+    p_clone.add_argument("--instances", nargs="+", default=["mk05"])
+    p_clone.add_argument("--pop-size", type=int, default=100)
+    p_clone.add_argument("--min-time", type=float, default=1.0)
+    p_clone.set_defaults(func=bench_clone)
+
+    p_sort = sub.add_parser("sort", help="So sánh non-dominated sort gốc với bản NumPy.")
+    p_sort.add_argument("--instance", default="mk01")
+    p_sort.add_argument("--sizes", nargs="+", type=int, default=[200, 1000, 10000])
+    p_sort.add_argument("--naive-limit", type=int, default=2000)
+    p_sort.add_argument("--seed", type=int, default=0)
+    p_sort.add_argument("--min-time", type=float, default=1.0)
+    p_sort.set_defaults(func=bench_sort)
+
+    p_gsort = sub.add_parser("generation-sort", help="Thời gian phân lớp trong 1 thế hệ: sắp xếp lại 3 lần vs RankedPopulation.")
+    p_gsort.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_gsort.add_argument("--pop-size", type=int, default=100)
+    p_gsort.add_argument("--seed", type=int, default=0)
+    p_gsort.add_argument("--min-time", type=float, default=1.0)
+    p_gsort.set_defaults(func=bench_generation_sort)
+
+    p_hv = sub.add_parser("hypervolume", help="Đo thời gian tính Hypervolume 3-D.")
+    p_hv.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000])
+    p_hv.add_argument("--seed", type=int, default=0)
+    p_hv.add_argument("--min-time", type=float, default=1.0)
+    p_hv.set_defaults(func=bench_hypervolume)
+
+    p_n1 = sub.add_parser("n1", help="Đo thời gian tabu search N1' (đổi máy trên đường găng) theo max_iter.")
+    p_n1.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_n1.add_argument("--pop-size", type=int, default=20)
+    p_n1.add_argument("--max-iters", nargs="+", type=int, default=[30, 300])
+    p_n1.add_argument("--seed", type=int, default=0)
+    p_n1.add_argument("--python", action="store_true", help="Dùng decode Python thuần thay cho kernel JIT.")
+    p_n1.add_argument("--min-time", type=float, default=1.0)
+    p_n1.set_defaults(func=bench_n1)
+
+    p_kearl = sub.add_parser("kearl", help="Chạy KEARL trên nhiều instance/seed, đo thời gian theo pha, ghi report JSON/CSV.")
+    p_kearl.add_argument("--instances", nargs="+", default=DEFAULT_INSTANCES)
+    p_kearl.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    p_kearl.add_argument("--pop-size", type=int, default=100)
+    p_kearl.add_argument("--max-gen", type=int, default=100)
+    p_kearl.add_argument("--workers", type=int, default=1)
+    p_kearl.add_argument("--vns-block-scan", action="store_true", help="VNS quét toàn bộ láng giềng N2'/N3'/N4' của các block.")
+    p_kearl.add_argument("--in-process", action="store_true", help="Chạy trong process hiện tại (peak RSS cộng dồn).")
+    p_kearl.add_argument("--json", help="Ghi report JSON.")
+    p_kearl.add_argument("--csv", help="Ghi report CSV.")
+    p_kearl.set_defaults(func=bench_kearl)
+
+    p_compare = sub.add_parser("compare", help="So sánh 2 report của 'kearl' (JSON/CSV), thoát mã 1 nếu có regression.")
+    p_compare.add_argument("base")
+    p_compare.add_argument("new")
+    p_compare.add_argument("--time-tolerance", type=float, default=0.10)
+    p_compare.add_argument("--quality-tolerance", type=float, default=0.02)
+    p_compare.set_defaults(func=compare_reports)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
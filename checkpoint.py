@@ -0,0 +1,68 @@
+"""
+Đọc/ghi checkpoint của KEARL_Framework dưới dạng .npz:
+    - Dữ liệu lớn (genome MS/OS, objectives, Q-table, trạng thái RNG, lịch sử breakdown) là các mảng numpy.
+    - Phần còn lại (thế hệ, lịch sử hội tụ, chỉ số...) là 1 chuỗi JSON trong khoá '__meta__'.
+Không pickle Individual -> file nhỏ, ghi nhanh, đọc được với allow_pickle=False.
+"""
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 1
+META_KEY = '__meta__'
+
+def write_checkpoint(path, arrays, meta):
+    """Ghi arrays (dict tên -> np.ndarray) + meta (dict JSON) vào path, thay thế file cũ một cách nguyên tử."""
+    meta = dict(meta, format_version=FORMAT_VERSION)
+    tmp_path = f"{path}.tmp"
+    # Ghi qua file object để numpy không tự thêm đuôi .npz vào tên file tạm
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays, **{META_KEY: np.array(json.dumps(meta))})
+    os.replace(tmp_path, path)
+
+def read_checkpoint(path):
+    """Đọc checkpoint -> (arrays, meta)."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files if name != META_KEY}
+        meta = json.loads(str(data[META_KEY]))
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Checkpoint {path}: format_version {meta.get('format_version')} không được hỗ trợ")
+    return arrays, meta
+
+# ========================================================
+#               GENOME / TRẠNG THÁI -> MẢNG
+# ========================================================
+def genome_arrays(individuals):
+    """(ms, os, objectives) dạng mảng (N, total_ops), (N, total_ops), (N, 3)."""
+    ms = np.array([ind.ms for ind in individuals], dtype=np.int32)
+    os_ = np.array([ind.os for ind in individuals], dtype=np.int32)
+    objectives = np.array([(ind.makespan, ind.total_energy, ind.wcm) for ind in individuals], dtype=float)
+    return ms, os_, objectives.reshape(-1, 3)
+
+def random_state_to_array(state):
+    """random.Random.getstate() -> (mảng uint32 của Mersenne Twister, gauss_next)."""
+    version, internal, gauss_next = state
+    return np.array(internal, dtype=np.uint32), gauss_next
+
+def random_state_from_array(internal, gauss_next, version=3):
+    """Ngược lại của random_state_to_array: trả về tuple cho random.Random.setstate()."""
+    return version, tuple(int(v) for v in internal), gauss_next
+
+def split_state(prefix, state):
+    """Tách state dict của 1 thành phần: mảng numpy -> arrays['prefix.tên'], còn lại -> dict JSON."""
+    arrays, meta = {}, {}
+    for name, value in state.items():
+        if isinstance(value, np.ndarray):
+            arrays[f"{prefix}.{name}"] = value
+        else:
+            meta[name] = value
+    return arrays, meta
+
+def join_state(prefix, arrays, meta):
+    """Ngược lại của split_state."""
+    state = dict(meta)
+    start = len(prefix) + 1
+    for name, value in arrays.items():
+        if name.startswith(prefix + '.'):
+            state[name[start:]] = value
+    return state
@@ -0,0 +1,113 @@
+import numpy as np
+
+class CompiledInstance:
+    """
+    Dạng "biên dịch" (compiled) một lần của instance EEDFJSP.
+
+    Chuyển các đối tượng Factory/Job/Operation (dict lồng dict) sang mảng NumPy phẳng
+    để Individual.decode(), VNS và EnergyEfficientScheduler tra cứu theo index thay vì
+    duyệt list/dict ở mỗi gene.
+
+    Quy ước index:
+        - Global op index g: thứ tự Job -> Operation (giống vector MS).
+        - Machine slot s: vị trí của máy trong op.sorted_machine_ids (giá trị gene MS).
+    """
+    def __init__(self, factory, jobs):
+        self.factory = factory
+        self.jobs = jobs
+
+        self.num_jobs = len(jobs)
+        self.num_machines = len(factory.machines)
+
+        # --- 1. Flatten Operations & Map (Job, Op) -> Global op index ---
+        # Dùng chung (chỉ đọc) cho mọi Individual của instance.
+        self.all_operations = []
+        self.op_to_index_map = {}
+        for job in jobs:
+            for op in job.operations:
+                if not hasattr(op, 'sorted_machine_ids'):
+                    op.sorted_machine_ids = sorted(list(op.compatible_machines.keys()))
+                self.op_to_index_map[(job.job_id, op.op_id)] = len(self.all_operations)
+                self.all_operations.append(op)
+        self.total_ops = len(self.all_operations)
+        self.max_slots = max((len(op.sorted_machine_ids) for op in self.all_operations), default=1)
+
+        # Offset Job -> Op đầu tiên (index theo job_id)
+        num_job_rows = max((j.job_id for j in jobs), default=-1) + 1
+        self.job_first_op = np.zeros(num_job_rows, dtype=np.int64)
+        self.job_num_ops = np.zeros(num_job_rows, dtype=np.int64)
+        self.op_job = np.zeros(self.total_ops, dtype=np.int64)
+
+        g = 0
+        for job in jobs:
+            self.job_first_op[job.job_id] = g
+            self.job_num_ops[job.job_id] = len(job.operations)
+            self.op_job[g:g + len(job.operations)] = job.job_id
+            g += len(job.operations)
+
+        # --- 2. Ma trận (global op, machine slot) ---
+        shape = (self.total_ops, self.max_slots)
+        self.num_slots = np.zeros(self.total_ops, dtype=np.int64)
+        self.machine_of = np.full(shape, -1, dtype=np.int64)
+        self.PT = np.zeros(shape)
+        self.ST = np.zeros(shape)
+        self.AP = np.zeros(shape)
+        self.AS = np.zeros(shape)
+
+        for g, op in enumerate(self.all_operations):
+            self.num_slots[g] = len(op.sorted_machine_ids)
+            for s, m_id in enumerate(op.sorted_machine_ids):
+                info = op.compatible_machines[m_id]
+                self.machine_of[g, s] = m_id
+                self.PT[g, s] = info['PT']
+                self.ST[g, s] = info['ST']
+                self.AP[g, s] = info['AP']
+                self.AS[g, s] = info['AS']
+
+        # --- 3. Dữ liệu máy & môi trường ---
+        self.machine_ids = [m.machine_id for m in factory.machines]
+        self.TT = np.asarray(factory.params.TT_matrix, dtype=float)
+        self.AI = np.array([m.AI for m in factory.machines], dtype=float)
+        self.UT_k = factory.params.UT_k
+        self.AC = factory.params.AC
+
+        # Machine id -> cột (theo thứ tự factory.machines), và cột của từng (op, slot)
+        m_col = np.zeros(max(self.machine_ids, default=0) + 1, dtype=np.int64)
+        m_col[self.machine_ids] = np.arange(self.num_machines)
+        self.col_of = m_col[np.maximum(self.machine_of, 0)]
+        # Cận trên số operation có thể xếp lên 1 máy (kích thước timeline)
+        ops_per_machine = np.bincount(self.col_of[self.machine_of >= 0], minlength=self.num_machines)
+        self.max_ops_per_machine = int(ops_per_machine.max(initial=0))
+
+        # --- 4. List views cho các vòng lặp Python vô hướng ---
+        # (Truy cập phần tử ndarray từng cái một chậm hơn list thuần)
+        self.job_first_op_list = self.job_first_op.tolist()
+        self.job_num_ops_list = self.job_num_ops.tolist()
+        self.num_slots_list = self.num_slots.tolist()
+        self.machine_of_list = self.machine_of.tolist()
+        self.col_of_list = self.col_of.tolist()
+        self.PT_list = self.PT.tolist()
+        self.ST_list = self.ST.tolist()
+        self.AP_list = self.AP.tolist()
+        self.AS_list = self.AS.tolist()
+        self.TT_list = self.TT.tolist()
+        self.AI_by_machine = dict(zip(self.machine_ids, self.AI.tolist()))
+
+    @classmethod
+    def get(cls, factory, jobs):
+        """
+        Lấy CompiledInstance dùng chung của factory (biên dịch lần đầu, sau đó cache lại).
+        """
+        compiled = getattr(factory, 'compiled', None)
+        if compiled is None:
+            compiled = cls(factory, jobs)
+            factory.compiled = compiled
+        return compiled
+
+    def __deepcopy__(self, memo):
+        # Dữ liệu tĩnh, chỉ đọc -> các bản deepcopy của Individual/Factory dùng chung
+        return self
+
+    def op_index(self, op):
+        """Global op index của một Operation."""
+        return self.job_first_op_list[op.job_id] + op.op_id
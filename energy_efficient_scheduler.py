@@ -1,11 +1,13 @@
-import copy
-
 class EnergyEfficientScheduler:
-    def __init__(self, factory):
+    def __init__(self, factory, evaluator=None):
         """
         Energy Efficient Scheduling Strategy (Algorithm 3).
+
+        Args:
+            evaluator (ParallelEvaluator): Nếu có, các ứng viên ES được decode song song.
         """
         self.factory = factory
+        self.evaluator = evaluator
 
     def apply_energy_strategy(self, pareto_front, zz_rate, xx_rate):
         """
@@ -24,6 +26,8 @@ class EnergyEfficientScheduler:
 
         updated_front = []
 
+        # 1. Sinh ứng viên cho từng cá thể (chưa decode)
+        candidates = []
         for i in range(n):
             current_ind = pareto_front[i]
             
@@ -32,13 +36,32 @@ class EnergyEfficientScheduler:
                 current_ind.decode()
 
             # Algorithm 3 Logic
-            improved_ind = None
+            if i < zz_idx:
+                # Perform ES1: Shift to machine with min (Setup + Processing)
+                candidates.append(self.perform_es1(current_ind, decode=False))
+            elif i < xx_idx: # zz <= i < xx
+                # Perform ES2: Shift to machine with min Energy (Trans + Setup + Proc)
+                candidates.append(self.perform_es2(current_ind, decode=False))
+            else: # i >= xx
+                # Perform ES3: Shift to machine with Lowest Workload
+                candidates.append(self.perform_es3(current_ind, decode=False))
+
+        # 2. Decode các ứng viên mới (song song nếu có evaluator)
+        # (Ứng viên chỉ đổi máy của 1 op -> decode tăng dần từ cá thể gốc)
+        pairs = [(cand, cur) for cand, cur in zip(candidates, pareto_front) if cand is not cur]
+        if self.evaluator is not None:
+            self.evaluator.evaluate_full([cand for cand, _ in pairs], bases=[cur for _, cur in pairs])
+        else:
+            for cand, cur in pairs:
+                cand.decode(base=cur)
+
+        # 3. So sánh & chọn
+        for i in range(n):
+            current_ind = pareto_front[i]
+            improved_ind = candidates[i]
 
             # --- Partition 1: Min Makespan (ES1) ---
             if i < zz_idx:
-                # Perform ES1: Shift to machine with min (Setup + Processing)
-                improved_ind = self.perform_es1(current_ind)
-                
                 # Update if Makespan is reduced
                 if improved_ind.makespan < current_ind.makespan:
                     updated_front.append(improved_ind)
@@ -46,10 +69,7 @@ class EnergyEfficientScheduler:
                     updated_front.append(current_ind)
 
             # --- Partition 2: Min Total Energy (ES2) ---
-            elif i < xx_idx: # zz <= i < xx
-                # Perform ES2: Shift to machine with min Energy (Trans + Setup + Proc)
-                improved_ind = self.perform_es2(current_ind)
-                
+            elif i < xx_idx:
                 # Update if Total Energy is reduced
                 if improved_ind.total_energy < current_ind.total_energy:
                     updated_front.append(improved_ind)
@@ -57,10 +77,7 @@ class EnergyEfficientScheduler:
                     updated_front.append(current_ind)
 
             # --- Partition 3: Min Critical Machine Workload (ES3) ---
-            else: # i >= xx
-                # Perform ES3: Shift to machine with Lowest Workload
-                improved_ind = self.perform_es3(current_ind)
-                
+            else:
                 # Tính WCM cho cả 2 để so sánh (Eq. 3)
                 wcm_current = self._calculate_wcm(current_ind)
                 wcm_improved = self._calculate_wcm(improved_ind)
@@ -79,96 +96,71 @@ class EnergyEfficientScheduler:
     # ========================================================
 
     def _find_last_operation(self, individual):
-        """Helper: Tìm operation kết thúc cuối cùng (quyết định Makespan)."""
-        # Nếu chưa có schedule thì decode
-        if not individual.detailed_schedule:
-            individual.decode()
-            
-        schedule = individual.detailed_schedule
-        last_op_info = None
-        max_end_time = -1.0
-
-        for m_id, tasks in schedule.items():
-            if not tasks: continue
-            last_task = tasks[-1]
-            if last_task['end'] > max_end_time:
-                max_end_time = last_task['end']
-                last_op_info = last_task # {'start', 'end', 'op', 'machine'}
-
-        return last_op_info
+        """Helper: Operation kết thúc cuối cùng (quyết định Makespan), dạng global op index (-1 nếu không có)."""
+        return individual.operation_records().last_operation()
 
-    def perform_es1(self, individual):
+    def perform_es1(self, individual, decode=True):
         """
         ES1: Shift last op to machine with MINIMUM (Setup Time + Processing Time).
         """
-        last_op_node = self._find_last_operation(individual)
-        if not last_op_node: return individual
+        g = self._find_last_operation(individual)
+        if g < 0: return individual
 
-        op_obj = last_op_node['op']
-        current_m_id = last_op_node['machine']
+        ci = individual.compiled
 
         # Tìm máy tốt nhất theo tiêu chí ES1
         best_m_idx = -1
         min_time_sum = float('inf')
 
         # Duyệt qua các máy khả dụng
-        for idx, m_id in enumerate(op_obj.sorted_machine_ids):
+        for idx in range(ci.num_slots_list[g]):
             # Bỏ qua máy hiện tại? Bài báo không nói rõ, nhưng nên check cả máy khác
             # Lấy thông tin PT, ST
-            info = op_obj.compatible_machines[m_id]
-            time_sum = info['PT'] + info['ST']
+            time_sum = ci.PT_list[g][idx] + ci.ST_list[g][idx]
 
             if time_sum < min_time_sum:
                 min_time_sum = time_sum
                 best_m_idx = idx
 
         if best_m_idx != -1:
-            new_ind = copy.deepcopy(individual)
+            new_ind = individual.clone(copy_objectives=False)
             # Cập nhật Gen MS
-            gene_idx = new_ind.op_to_index_map[(op_obj.job_id, op_obj.op_id)]
-            new_ind.ms[gene_idx] = best_m_idx
-            new_ind.decode() 
+            new_ind.ms[g] = best_m_idx
+            if decode: new_ind.decode(base=individual)
             return new_ind
         
         return individual
 
-    def perform_es2(self, individual):
+    def perform_es2(self, individual, decode=True):
         """
         ES2: Transfer last op to machine with SMALLEST Energy Consumption.
         Energy = Transport + Setup + Processing.
         """
-        last_op_node = self._find_last_operation(individual)
-        if not last_op_node: return individual
+        g = self._find_last_operation(individual)
+        if g < 0: return individual
 
-        op_obj = last_op_node['op']
+        ci = individual.compiled
+        records = individual.operation_records()
         
-        prev_m_id = None
-        if op_obj.op_id > 0:
-            # Tìm op trước
-            pred_op = individual.jobs[op_obj.job_id].operations[op_obj.op_id - 1]
-            # Tìm trong schedule xem pred_op nằm máy nào
-            for m_id, tasks in individual.detailed_schedule.items():
-                for t in tasks:
-                    if t['op'] is pred_op:
-                        prev_m_id = m_id
-                        break
-                if prev_m_id: break
+        # Máy của op trước trong job (None nếu là op đầu tiên)
+        pred = int(records.job_pred[g])
+        prev_m_id = int(records.machine[pred]) if pred >= 0 else None
 
         best_m_idx = -1
         min_energy = float('inf')
 
-        for idx, m_id in enumerate(op_obj.sorted_machine_ids):
-            info = op_obj.compatible_machines[m_id]
+        for idx in range(ci.num_slots_list[g]):
+            m_id = ci.machine_of_list[g][idx]
             
             # 1. Setup + Processing Energy
-            e_proc = info['PT'] * info['AP'] # Eq. 4
-            e_setup = info['ST'] * info['AS'] # Eq. 5
+            e_proc = ci.PT_list[g][idx] * ci.AP_list[g][idx] # Eq. 4
+            e_setup = ci.ST_list[g][idx] * ci.AS_list[g][idx] # Eq. 5
             
             # 2. Transport Energy
             e_trans = 0.0
-            if prev_m_id and prev_m_id != m_id:
-                dist = self.factory.params.TT_matrix[prev_m_id][m_id]
-                e_trans = dist * self.factory.params.UT_k # Eq. 6
+            if prev_m_id is not None and prev_m_id != m_id:
+                dist = ci.TT_list[prev_m_id][m_id]
+                e_trans = dist * ci.UT_k # Eq. 6
             
             total_e = e_proc + e_setup + e_trans
             
@@ -177,23 +169,24 @@ class EnergyEfficientScheduler:
                 best_m_idx = idx
 
         if best_m_idx != -1:
-            new_ind = copy.deepcopy(individual)
-            gene_idx = new_ind.op_to_index_map[(op_obj.job_id, op_obj.op_id)]
-            new_ind.ms[gene_idx] = best_m_idx
-            new_ind.decode()
+            new_ind = individual.clone(copy_objectives=False)
+            new_ind.ms[g] = best_m_idx
+            if decode: new_ind.decode(base=individual)
             return new_ind
             
         return individual
 
-    def perform_es3(self, individual):
+    def perform_es3(self, individual, decode=True):
         """
         ES3: Transfer last op to machine with LOWEST Workload.
         Workload = Tổng thời gian bận rộn hiện tại của máy.
         """
-        last_op_node = self._find_last_operation(individual)
-        if not last_op_node: return individual
+        g = self._find_last_operation(individual)
+        if g < 0: return individual
 
-        op_obj = last_op_node['op']
+        ci = individual.compiled
+        records = individual.operation_records()
+        current_m_id = int(records.machine[g])
         
         # Tính workload hiện tại của các máy
         # (Lưu ý: Workload này tính TRƯỚC khi gán task này hay SAU? 
@@ -204,22 +197,21 @@ class EnergyEfficientScheduler:
             load = sum(t['end'] - t['start'] for t in tasks)
             # Trừ đi chính operation này (vì ta đang định di chuyển nó)
             # Nếu op này đang nằm trên máy m_id, ta trừ nó ra để so sánh công bằng
-            for t in tasks:
-                if t['op'] is op_obj: # So sánh object
-                    load -= (t['end'] - t['start'])
+            if m_id == current_m_id:
+                load -= float(records.end[g] - records.start[g])
             machine_workloads[m_id] = load
 
         best_m_idx = -1
         min_workload = float('inf')
 
-        for idx, m_id in enumerate(op_obj.sorted_machine_ids):
+        for idx in range(ci.num_slots_list[g]):
+            m_id = ci.machine_of_list[g][idx]
             # Workload hiện tại của máy
             curr_load = machine_workloads.get(m_id, 0.0)
             
             # Workload dự kiến nếu gán thêm task này
             # (Task size = PT + ST)
-            info = op_obj.compatible_machines[m_id]
-            added_load = info['PT'] + info['ST']
+            added_load = ci.PT_list[g][idx] + ci.ST_list[g][idx]
             
             total_load = curr_load + added_load
             
@@ -228,10 +220,9 @@ class EnergyEfficientScheduler:
                 best_m_idx = idx
 
         if best_m_idx != -1:
-            new_ind = copy.deepcopy(individual)
-            gene_idx = new_ind.op_to_index_map[(op_obj.job_id, op_obj.op_id)]
-            new_ind.ms[gene_idx] = best_m_idx
-            new_ind.decode()
+            new_ind = individual.clone(copy_objectives=False)
+            new_ind.ms[g] = best_m_idx
+            if decode: new_ind.decode(base=individual)
             return new_ind
             
         return individual
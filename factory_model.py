@@ -59,8 +59,18 @@ class Machine:
         
         # [QUAN TRỌNG] Lưu lịch sử hỏng để Individual.decode() đọc được
         # List các dict: [{'start': 10, 'end': 15}, ...]
+        self.history_version = 0 # Tăng mỗi lần breakdown_history thay đổi (set_broken / gán mới)
         self.breakdown_history = [] 
 
+    @property
+    def breakdown_history(self):
+        return self._breakdown_history
+
+    @breakdown_history.setter
+    def breakdown_history(self, history):
+        self._breakdown_history = history
+        self.history_version += 1
+
     def update_busy_time(self, duration):
         """Cộng dồn thời gian máy chạy để tính xác suất hỏng."""
         self.T_k += duration
@@ -83,6 +93,7 @@ class Machine:
             'start': breakdown_start,
             'end': end_time
         })
+        self.history_version += 1
 
     def repair_completed(self):
         """Reset trạng thái sau khi sửa xong (dùng cho simulation)"""
@@ -122,6 +133,11 @@ class Operation:
             self.sorted_machine_ids.append(machine_id)
             self.sorted_machine_ids.sort()
 
+    def __deepcopy__(self, memo):
+        # Operation là dữ liệu tĩnh của instance (CompiledInstance cũng tham chiếu tới nó)
+        # -> deepcopy Individual/Job giữ nguyên object, không nhân bản.
+        return self
+
 # ==========================================
 # 4. JOB CLASS
 # ==========================================
@@ -142,6 +158,8 @@ class Factory:
         self.params = parameters
         self.machines = machines
         self.jobs = jobs
+        # Nguồn ngẫu nhiên cho breakdown (random.Random); None = module random toàn cục
+        self.rng = None
         
     @property
     def total_busy_time_R(self):
@@ -151,11 +169,60 @@ class Factory:
     def total_repairs_rho(self):
         return sum(m.rho_k for m in self.machines)
 
+    @property
+    def breakdown_version(self):
+        """
+        Phiên bản trạng thái hỏng máy (đổi mỗi khi breakdown_history của một máy thay đổi).
+        Dùng làm khóa cache cho kết quả decode.
+        """
+        return tuple(m.history_version for m in self.machines)
+
+    def breakdown_counts(self):
+        """Số lần hỏng đã ghi của từng máy (mốc để so sánh với breakdowns_since)."""
+        return tuple(len(m.breakdown_history) for m in self.machines)
+
+    def breakdowns_since(self, counts):
+        """
+        Các khoảng hỏng mới phát sinh sau mốc `counts` (lấy từ breakdown_counts()).
+        Returns: list các tuple (machine_id, {'start': float, 'end': float}).
+        """
+        return [(m.machine_id, bd)
+                for m, n in zip(self.machines, counts)
+                for bd in m.breakdown_history[n:]]
+
+    def breakdown_state(self):
+        """
+        Trạng thái động của các máy (cho checkpoint):
+            'machines': mảng (M, 5) [v, rho_k, T_k, is_broken, available_time]
+            'history':  mảng (K, 3) [chỉ số máy, start, end] của mọi khoảng hỏng, theo thứ tự ghi.
+        """
+        machines = np.array([(m.v, m.rho_k, m.T_k, m.is_broken, m.available_time) for m in self.machines],
+                            dtype=float).reshape(-1, 5)
+        history = np.array([(k, bd['start'], bd['end'])
+                            for k, m in enumerate(self.machines) for bd in m.breakdown_history],
+                           dtype=float).reshape(-1, 3)
+        return {'machines': machines, 'history': history}
+
+    def load_breakdown_state(self, state):
+        """Khôi phục trạng thái từ breakdown_state() (history_version tăng như mọi lần gán lịch sử mới)."""
+        histories = [[] for _ in self.machines]
+        for k, start, end in state['history'].tolist():
+            histories[int(k)].append({'start': start, 'end': end})
+        for m, (v, rho_k, T_k, is_broken, available_time), history in zip(
+                self.machines, state['machines'].tolist(), histories):
+            m.v = v
+            m.rho_k = int(rho_k)
+            m.T_k = T_k
+            m.is_broken = bool(is_broken)
+            m.available_time = available_time
+            m.breakdown_history = history
+
     def update_machine_states(self, current_makespan):
         """
         Kiểm tra và kích hoạt sự cố máy hỏng dựa trên công thức xác suất (Eq. 22).
         Được gọi ở đầu mỗi thế hệ (Generation).
         """
+        rng = self.rng or random
         # Tránh chia cho 0
         R = self.total_busy_time_R if self.total_busy_time_R > 0 else 1.0
         rho = self.total_repairs_rho if self.total_repairs_rho > 0 else 1.0
@@ -176,9 +243,9 @@ class Factory:
             Pk = self.params.lambda_0 * (1 + term1 + term2 + term3)
             
             # Random xem có hỏng không
-            if random.random() < Pk:
+            if rng.random() < Pk:
                 # --- Tính thời điểm bắt đầu hỏng (Eq. 23) ---
-                omega = random.random()
+                omega = rng.random()
                 factor = (self.params.alpha_1 + 
                           self.params.alpha_2 * (m.rho_k / rho) +
                           self.params.alpha_3 * (m.T_k / R) +
@@ -188,7 +255,7 @@ class Factory:
                 breakdown_start = current_makespan * factor
                 
                 # --- Tính thời gian sửa chữa (Eq. 24) ---
-                epsilon = random.uniform(-self.params.gamma, self.params.gamma)
+                epsilon = rng.uniform(-self.params.gamma, self.params.gamma)
                 base_repair = (self.params.beta_0 + 
                                self.params.beta_1 * m.v + 
                                self.params.beta_2 * (m.rho_k / rho))
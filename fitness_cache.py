@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+class FitnessCache:
+    """
+    Bộ nhớ đệm LRU (có giới hạn) cho kết quả decode.
+
+    Key: (decode mode, factory.breakdown_version, MS, OS).
+    Value: (makespan, total_energy, wcm, detailed_schedule | None).
+        detailed_schedule = None khi kết quả đến từ decode_batch (chỉ có objectives).
+
+    Gắn vào factory (factory.fitness_cache) để Individual.decode() và ParallelEvaluator tra cứu.
+    """
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    @classmethod
+    def attach(cls, factory, maxsize=5000):
+        """Tạo cache mới cho factory (maxsize <= 0 -> tắt cache). Trả về cache hoặc None."""
+        factory.fitness_cache = cls(maxsize) if maxsize > 0 else None
+        return factory.fitness_cache
+
+    @staticmethod
+    def key(individual, mode='insertion'):
+        return (mode, individual.factory.breakdown_version, tuple(individual.ms), tuple(individual.os))
+
+    def get(self, key, need_schedule=False):
+        """Tra cứu kết quả; need_schedule=True chỉ chấp nhận entry có detailed_schedule."""
+        entry = self._data.get(key)
+        if entry is None or (need_schedule and entry[3] is None):
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, makespan, total_energy, wcm, schedule=None):
+        """Lưu kết quả (không ghi đè entry đã có lịch chi tiết bằng entry chỉ có objectives)."""
+        old = self._data.get(key)
+        if old is not None and schedule is None and old[3] is not None:
+            self._data.move_to_end(key)
+            return
+        self._data[key] = (makespan, total_energy, wcm, schedule)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __deepcopy__(self, memo):
+        # Factory bị deepcopy có thể rẽ nhánh breakdown riêng -> dùng cache rỗng mới
+        return FitnessCache(self.maxsize)
+
+    def __getstate__(self):
+        # Gửi sang worker (ParallelEvaluator) không kèm dữ liệu
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
@@ -1,8 +1,35 @@
 import random
 import copy
+import operator
+from itertools import compress
 import numpy as np
+from compiled_instance import CompiledInstance
+from machine_timeline import MachineTimeline
+from numba_decoder import NUMBA_AVAILABLE, breakdown_arrays, decode_kernel
+from operation_records import OperationRecords
+
+class DetailedSchedule(dict):
+    """
+    detailed_schedule {machine_id: [task, ...]} kèm vết giải mã (checkpoint) để decode tăng dần.
+    Theo vị trí OS p:
+        pos_start[p], pos_end[p]: thời điểm bắt đầu/kết thúc của operation giải mã ở vị trí p.
+        pos_col[p]: cột máy (thứ tự factory.machines) của operation đó.
+    breakdown_version: factory.breakdown_version lúc decode.
+    records: OperationRecords dựng lần đầu khi cần (Individual.operation_records()).
+
+    Trạng thái decode sau vị trí p (timeline các máy, job end times, năng lượng) được dựng lại
+    từ vết này mà không cần tìm khe hở (xem decode(base, first_pos)).
+    """
+    __slots__ = ('pos_start', 'pos_end', 'pos_col', 'breakdown_version', 'records')
 
 class Individual:
+    # Dùng kernel Numba cho decode() nếu có cài numba (đặt False để ép dùng bản Python thuần)
+    use_jit = NUMBA_AVAILABLE
+    # Tổng số lần decode thực sự (không tính cache hit) trong process, gồm cả decode qua ParallelEvaluator
+    decode_count = 0
+    # Tổng số lần clone() (thay cho copy.deepcopy) trong process
+    clone_count = 0
+
     def __init__(self, jobs, factory, init_strategy=None):
         """
         Khởi tạo cá thể cho bài toán EEDFJSP (Hỗ trợ Machine Breakdown).
@@ -10,22 +37,11 @@ class Individual:
         self.jobs = jobs
         self.factory = factory
         
-        # 1. FLATTEN OPERATIONS & TẠO MAP
-        self.op_to_index_map = {} 
-        self.all_operations = [] 
-        
-        idx_counter = 0
-        for job in self.jobs:
-            for op in job.operations:
-                self.all_operations.append(op)
-                self.op_to_index_map[(job.job_id, op.op_id)] = idx_counter
-                
-                if not hasattr(op, 'sorted_machine_ids'):
-                    op.sorted_machine_ids = sorted(list(op.compatible_machines.keys()))
-                
-                idx_counter += 1
-        
-        self.total_ops = len(self.all_operations)
+        # 1. CONTEXT DÙNG CHUNG (Flatten Operations & Map chỉ build 1 lần / instance)
+        self.compiled = CompiledInstance.get(self.factory, self.jobs)
+        self.op_to_index_map = self.compiled.op_to_index_map
+        self.all_operations = self.compiled.all_operations
+        self.total_ops = self.compiled.total_ops
         
         # 2. GENOTYPE
         self.ms = [0] * self.total_ops
@@ -42,13 +58,301 @@ class Individual:
         self.fitness = 0.0       
         self.detailed_schedule = {} 
 
-    def decode(self):
+    def clone(self, copy_objectives=True):
+        """
+        Sao chép nhanh: chỉ copy genome (MS, OS), dùng chung dữ liệu instance (jobs, factory, compiled).
+        Thay thế copy.deepcopy(individual) trong các toán tử.
+
+        Args:
+            copy_objectives (bool): Sao chép cả kết quả decode (MCT, TEC, WCM, rank...).
+                                    False khi cá thể con sẽ được decode lại ngay.
+        """
+        Individual.clone_count += 1
+        new_ind = Individual.__new__(Individual)
+        new_ind.jobs = self.jobs
+        new_ind.factory = self.factory
+        new_ind.compiled = self.compiled
+        new_ind.op_to_index_map = self.op_to_index_map
+        new_ind.all_operations = self.all_operations
+        new_ind.total_ops = self.total_ops
+
+        new_ind.ms = self.ms[:]
+        new_ind.os = self.os[:]
+        if self._os_index is not None:
+            op_pos, pos_op = self._os_index
+            new_ind._os_index = (op_pos[:], pos_op[:])
+
+        if copy_objectives:
+            new_ind.makespan = self.makespan
+            new_ind.total_energy = self.total_energy
+            new_ind.wcm = self.wcm
+            new_ind.fitness = self.fitness
+            # decode() luôn tạo dict mới nên có thể dùng chung lịch trình cũ
+            new_ind.detailed_schedule = self.detailed_schedule
+            if hasattr(self, 'rank'):
+                new_ind.rank = self.rank
+            if hasattr(self, 'crowding_distance'):
+                new_ind.crowding_distance = self.crowding_distance
+        else:
+            new_ind.makespan = 0.0
+            new_ind.total_energy = 0.0
+            new_ind.wcm = 0.0
+            new_ind.fitness = 0.0
+            new_ind.detailed_schedule = {}
+        return new_ind
+
+    def decode(self, base=None, first_pos=None):
         """
         Insertion-based Decoding (Cập nhật xử lý Breakdown).
+        Chạy kernel JIT (numba_decoder) khi có Numba, ngược lại dùng bản Python thuần.
+        Tra cứu factory.fitness_cache (nếu có) trước khi decode.
+
+        Args:
+            base (Individual): Cá thể gốc đã decode, có genome trùng với self ở các vị trí OS < first_pos
+                               (VD: self = base sau khi đổi 1 gene MS / hoán đổi 2 vị trí OS).
+                               Khi đó chỉ giải mã lại từ vị trí first_pos (kết quả giống hệt decode đầy đủ).
+            first_pos (int): Vị trí OS đầu tiên bị thay đổi (None -> tự xác định, xem first_changed_position).
+        """
+        cache = getattr(self.factory, 'fitness_cache', None)
+        if cache is not None:
+            key = cache.key(self)
+            entry = cache.get(key, need_schedule=True)
+            if entry is not None:
+                self.makespan, self.total_energy, self.wcm, self.detailed_schedule = entry
+                return
+
+        self.decode_uncached(base, first_pos)
+
+        if cache is not None:
+            cache.put(key, self.makespan, self.total_energy, self.wcm, self.detailed_schedule)
+
+    def decode_uncached(self, base=None, first_pos=None):
+        """Decode không qua cache: kernel JIT nếu có Numba, ngược lại bản Python thuần."""
+        base_schedule = None
+        if base is not None:
+            base_schedule = base.detailed_schedule
+            # Chỉ dùng được lịch có vết giải mã, tính với cùng trạng thái breakdown
+            if not isinstance(base_schedule, DetailedSchedule) or \
+                    base_schedule.breakdown_version != self.factory.breakdown_version:
+                base_schedule = None
+            elif first_pos is None:
+                first_pos = self.first_changed_position(base)
+        if base_schedule is None or not first_pos:
+            base_schedule, first_pos = None, 0
+
+        Individual.decode_count += 1
+        if Individual.use_jit:
+            self.decode_jit(base_schedule, first_pos)
+        else:
+            self.decode_python(base_schedule, first_pos)
+
+    def operation_records(self):
+        """
+        OperationRecords của detailed_schedule hiện tại (decode nếu chưa có lịch).
+        Dựng 1 lần cho mỗi lịch (cache trên DetailedSchedule), dùng chung cho VNS và ES.
+        """
+        if not self.detailed_schedule:
+            self.decode()
+        schedule = self.detailed_schedule
+        records = getattr(schedule, 'records', None)
+        if records is None:
+            records = OperationRecords(self.compiled, schedule)
+            if isinstance(schedule, DetailedSchedule):
+                schedule.records = records
+        return records
+
+    # ========================================================
+    #       OS INDEX: operation <-> vị trí trong OS
+    # ========================================================
+    @property
+    def os(self):
+        return self._os
+
+    @os.setter
+    def os(self, os_vec):
+        # Gán vector OS mới -> index cũ không còn đúng (dựng lại khi cần)
+        self._os = os_vec
+        self._os_index = None
+
+    def os_index(self):
+        """
+        Index (op_pos, pos_op) của vector OS, dựng 1 lần rồi cập nhật theo swap_os()/move_os():
+            op_pos[g]: vị trí trong OS nơi operation g (global op index) được giải mã.
+            pos_op[p]: global op index được giải mã tại vị trí p.
+        Chỉ đúng khi OS chỉ được sửa qua swap_os()/move_os() hoặc gán lại cả vector.
+        """
+        if self._os_index is None:
+            counters = self.compiled.job_first_op_list[:]
+            pos_op = [0] * len(self._os)
+            for pos, job_id in enumerate(self._os):
+                pos_op[pos] = counters[job_id]
+                counters[job_id] += 1
+            op_pos = [0] * len(pos_op)
+            for pos, g in enumerate(pos_op):
+                op_pos[g] = pos
+            self._os_index = (op_pos, pos_op)
+        return self._os_index
+
+    def swap_os(self, pos1, pos2):
+        """
+        Hoán đổi 2 vị trí của OS. Nếu đã có index: chỉ cập nhật các op của 2 job nằm giữa pos1 và pos2
+        (thứ tự xuất hiện của chúng bị dịch 1 bậc), không dựng lại cả index.
+        """
+        os_vec = self._os
+        if pos1 > pos2:
+            pos1, pos2 = pos2, pos1
+        job1, job2 = os_vec[pos1], os_vec[pos2]
+        os_vec[pos1], os_vec[pos2] = job2, job1
+        if self._os_index is None or job1 == job2 or pos1 == pos2:
+            return
+        op_pos, pos_op = self._os_index
+        ci = self.compiled
+        # Job ở pos1 dời về pos2: các op sau của job này (trước pos2) lùi lên 1 bậc
+        g = pos_op[pos1]
+        last = ci.job_first_op_list[job1] + ci.job_num_ops_list[job1] - 1
+        while g < last and op_pos[g + 1] < pos2:
+            op_pos[g] = op_pos[g + 1]
+            pos_op[op_pos[g]] = g
+            g += 1
+        g_tail = g
+        # Job ở pos2 dời về pos1: các op trước của job này (sau pos1) tiến lên 1 bậc
+        g = pos_op[pos2]
+        first = ci.job_first_op_list[job2]
+        while g > first and op_pos[g - 1] > pos1:
+            op_pos[g] = op_pos[g - 1]
+            pos_op[op_pos[g]] = g
+            g -= 1
+        op_pos[g_tail], pos_op[pos2] = pos2, g_tail
+        op_pos[g], pos_op[pos1] = pos1, g
+
+    def move_os(self, src, dst):
+        """
+        Chèn phần tử OS ở vị trí src vào vị trí dst (các phần tử ở giữa dịch 1 ô).
+        Nếu đã có index: chỉ đánh lại các vị trí trong đoạn [min(src, dst), max(src, dst)].
+        """
+        os_vec = self._os
+        if self._os_index is None or src == dst:
+            os_vec.insert(dst, os_vec.pop(src))
+            return
+        op_pos, pos_op = self._os_index
+        lo, hi = min(src, dst), max(src, dst)
+        # Mỗi job giữ nguyên tập op trong đoạn (liên tiếp theo thứ tự job) -> đánh lại từ op đầu tiên của nó
+        next_op = {}
+        for pos in range(lo, hi + 1):
+            next_op.setdefault(os_vec[pos], pos_op[pos])
+        os_vec.insert(dst, os_vec.pop(src))
+        for pos in range(lo, hi + 1):
+            job_id = os_vec[pos]
+            g = next_op[job_id]
+            next_op[job_id] = g + 1
+            pos_op[pos] = g
+            op_pos[g] = pos
+
+    def first_changed_position(self, base):
+        """
+        Vị trí OS đầu tiên mà việc giải mã self khác base:
+        min(vị trí OS đầu tiên khác nhau, vị trí giải mã của các gene MS khác nhau).
+        """
+        os_diff = list(map(operator.ne, self.os, base.os))
+        first_pos = os_diff.index(True) if True in os_diff else self.total_ops
+        if self.ms != base.ms:
+            for g in compress(range(self.total_ops), map(operator.ne, self.ms, base.ms)):
+                first_pos = min(first_pos, self.os_position(g))
+        return first_pos
+
+    def os_position(self, gene_idx):
+        """Vị trí trong OS nơi operation có global index gene_idx được giải mã (O(1) nếu đã có os_index())."""
+        if self._os_index is not None:
+            return self._os_index[0][gene_idx]
+        ci = self.compiled
+        job_id = int(ci.op_job[gene_idx])
+        pos = -1
+        try:
+            for _ in range(gene_idx - ci.job_first_op_list[job_id] + 1):
+                pos = self.os.index(job_id, pos + 1)
+        except ValueError:
+            return -1
+        return pos
+
+    def decode_jit(self, base_schedule=None, first_pos=0):
+        """
+        Insertion-based Decoding bằng numba_decoder.decode_kernel.
+        Cho kết quả (MCT, TEC, WCM, detailed_schedule) giống hệt decode_python().
+
+        Args:
+            base_schedule (DetailedSchedule): Lịch của cá thể gốc, trùng với self ở các vị trí OS < first_pos.
+            first_pos (int): Các vị trí trước first_pos lấy lại lịch của cá thể gốc (0 = decode đầy đủ).
+        """
+        ci = self.compiled
+        bd_start, bd_end, bd_count, bd_total = breakdown_arrays(self.factory)
+        timeline_size = ci.max_ops_per_machine + bd_start.shape[1]
+        if base_schedule is not None:
+            prefix_start = base_schedule.pos_start[:first_pos]
+            prefix_end = base_schedule.pos_end[:first_pos]
+        else:
+            prefix_start = prefix_end = np.zeros(0)
+
+        ms_vec = np.array(self.ms, dtype=np.int64)
+        makespan, total_energy, wcm, op_start, op_end, op_gene = decode_kernel(
+            np.array(self.os, dtype=np.int64), ms_vec,
+            ci.job_first_op, ci.machine_of, ci.col_of, ci.PT, ci.ST, ci.AP, ci.AS, ci.TT, ci.AI,
+            ci.UT_k, ci.AC, bd_start, bd_end, bd_count, bd_total, timeline_size,
+            prefix_start, prefix_end)
+        pos_col = ci.col_of[op_gene, ms_vec[op_gene]]
+
+        # Dựng detailed_schedule (breakdown trước, sau đó task theo thứ tự OS)
+        machine_timelines = DetailedSchedule()
+        if base_schedule is not None:
+            # Breakdown + task của prefix không đổi -> dùng lại đầu danh sách của cá thể gốc
+            prefix_counts = np.bincount(pos_col[:first_pos], minlength=len(ci.machine_ids)).tolist()
+            for c, m_id in enumerate(ci.machine_ids):
+                machine_timelines[m_id] = base_schedule[m_id][:int(bd_count[c]) + prefix_counts[c]]
+        else:
+            for m in self.factory.machines:
+                machine_timelines[m.machine_id] = [{
+                    'start': bd['start'],
+                    'end': bd['end'],
+                    'op': None,
+                    'type': 'breakdown'
+                } for bd in getattr(m, 'breakdown_history', None) or []]
+
+        all_operations = ci.all_operations
+        machine_of_list = ci.machine_of_list
+        ms = self.ms
+        for start_time, end_time, g in zip(op_start[first_pos:].tolist(), op_end[first_pos:].tolist(),
+                                           op_gene[first_pos:].tolist()):
+            machine_id = machine_of_list[g][ms[g]]
+            machine_timelines[machine_id].append({
+                'start': start_time,
+                'end': end_time,
+                'op': all_operations[g],
+                'machine': machine_id,
+                'type': 'operation'
+            })
+
+        machine_timelines.pos_start = op_start
+        machine_timelines.pos_end = op_end
+        machine_timelines.pos_col = pos_col
+        machine_timelines.breakdown_version = self.factory.breakdown_version
+
+        self.makespan = makespan
+        self.total_energy = total_energy
+        self.wcm = wcm
+        self.detailed_schedule = machine_timelines
+
+    def decode_python(self, base_schedule=None, first_pos=0):
+        """
+        Insertion-based Decoding - bản Python thuần (fallback khi không có Numba).
+
+        Args:
+            base_schedule (DetailedSchedule): Lịch của cá thể gốc, trùng với self ở các vị trí OS < first_pos.
+            first_pos (int): Các vị trí trước first_pos lấy lại lịch của cá thể gốc (0 = decode đầy đủ).
         """
         # --- A. Reset trạng thái ---
-        machine_timelines = {m.machine_id: [] for m in self.factory.machines} 
-        machine_end_times = {m.machine_id: 0.0 for m in self.factory.machines}
+        # machine_timelines: danh sách task theo thứ tự chèn (-> detailed_schedule)
+        # sorted_timelines: cấu trúc khối bận đã sort theo start để tìm khe hở
+        machine_timelines = DetailedSchedule((m.machine_id, []) for m in self.factory.machines)
+        sorted_timelines = {m.machine_id: MachineTimeline() for m in self.factory.machines}
         
         # [NEW] --- XỬ LÝ BREAKDOWN: CHÈN CÁC KHOẢNG HỎNG VÀO TIMELINE TRƯỚC ---
         # Coi breakdown như một task cố định để thuật toán insertion tự né
@@ -63,11 +367,11 @@ class Individual:
                         'op': None,       # Không thuộc Job nào
                         'type': 'breakdown' # Đánh dấu loại
                     })
-                    # Cập nhật thời gian kết thúc của máy nếu breakdown nằm ở cuối
-                    if bd['end'] > machine_end_times[m.machine_id]:
-                        machine_end_times[m.machine_id] = bd['end']
+                    # Thời gian kết thúc của máy tự cập nhật nếu breakdown nằm ở cuối
+                    sorted_timelines[m.machine_id].insert(bd['start'], bd['end'])
 
         # Các biến theo dõi Job
+        ci = self.compiled
         job_end_times = {j.job_id: 0.0 for j in self.jobs} 
         job_prev_machine = {j.job_id: None for j in self.jobs} 
         job_op_counter = {j.job_id: 0 for j in self.jobs}
@@ -78,23 +382,29 @@ class Individual:
         E_transport = 0.0  
         E_idle = 0.0       
 
+        # Vết giải mã theo vị trí OS (cho decode tăng dần)
+        pos_start, pos_end, pos_col = [], [], []
+        if base_schedule is not None:
+            pos_start = base_schedule.pos_start[:first_pos].tolist()
+            pos_end = base_schedule.pos_end[:first_pos].tolist()
+            # Chỉ số task kế tiếp của prefix trong lịch gốc (bỏ qua các breakdown ở đầu)
+            next_base_task = {m_id: len(tasks) for m_id, tasks in machine_timelines.items()}
+
         # --- B. Vòng lặp giải mã (Duyệt vector OS) ---
-        for job_id in self.os:
+        for pos, job_id in enumerate(self.os):
             op_idx_in_job = job_op_counter[job_id]
-            current_job = next(j for j in self.jobs if j.job_id == job_id)
-            current_op = current_job.operations[op_idx_in_job]
             job_op_counter[job_id] += 1
 
-            # 1. Xác định Máy
-            gene_idx = self.op_to_index_map[(job_id, current_op.op_id)]
+            # 1. Xác định Máy (tra mảng compiled theo global op index)
+            gene_idx = ci.job_first_op_list[job_id] + op_idx_in_job
+            current_op = ci.all_operations[gene_idx]
             selected_machine_idx = self.ms[gene_idx]
-            machine_id = current_op.sorted_machine_ids[selected_machine_idx]
-            mach_info = current_op.compatible_machines[machine_id]
+            machine_id = ci.machine_of_list[gene_idx][selected_machine_idx]
             
-            PT = mach_info['PT']
-            AP = mach_info['AP']
-            ST = mach_info['ST']
-            AS = mach_info['AS']
+            PT = ci.PT_list[gene_idx][selected_machine_idx]
+            AP = ci.AP_list[gene_idx][selected_machine_idx]
+            ST = ci.ST_list[gene_idx][selected_machine_idx]
+            AS = ci.AS_list[gene_idx][selected_machine_idx]
 
             # 2. Tính Arrival Time
             prev_finish = job_end_times[job_id]
@@ -102,8 +412,8 @@ class Individual:
             prev_m_id = job_prev_machine[job_id]
             
             if prev_m_id is not None and prev_m_id != machine_id:
-                transport_time = self.factory.params.TT_matrix[prev_m_id][machine_id]
-                E_transport += transport_time * self.factory.params.UT_k 
+                transport_time = ci.TT_list[prev_m_id][machine_id]
+                E_transport += transport_time * ci.UT_k 
             
             arrival_time = prev_finish + transport_time
 
@@ -112,48 +422,42 @@ class Individual:
             E_processing += AP * PT 
             E_setup += AS * ST      
 
-            # Sắp xếp timeline để tìm khe hở (Bao gồm cả các khoảng Breakdown đã chèn)
-            timeline = sorted(machine_timelines[machine_id], key=lambda x: x['start'])
-            
-            best_start = -1
-            found_gap = False
-            prev_block_end = 0.0
-            
-            for block in timeline:
-                block_start = block['start']
-                gap_size = block_start - prev_block_end
-                
-                # Khe hở có đủ nhét vừa task không?
-                if gap_size >= duration:
-                    potential_start = max(prev_block_end, arrival_time)
-                    if potential_start + duration <= block_start:
-                        best_start = potential_start
-                        found_gap = True
-                        break 
-                prev_block_end = block['end']
-            
-            if found_gap:
-                start_time = best_start
+            timeline = sorted_timelines[machine_id]
+            if pos < first_pos:
+                # Vị trí thuộc prefix không đổi -> dùng lại task của cá thể gốc
+                task_info = base_schedule[machine_id][next_base_task[machine_id]]
+                next_base_task[machine_id] += 1
+                start_time = pos_start[pos]
+                end_time = pos_end[pos]
             else:
-                # Nếu không có khe, đặt sau task cuối cùng (hoặc sau breakdown cuối cùng)
-                start_time = max(machine_end_times[machine_id], arrival_time)
+                # Tìm khe hở trên timeline đã sort (Bao gồm cả các khoảng Breakdown đã chèn)
+                start_time = timeline.find_gap(arrival_time, duration)
+                
+                if start_time is None:
+                    # Nếu không có khe, đặt sau task cuối cùng (hoặc sau breakdown cuối cùng)
+                    start_time = max(timeline.end_time, arrival_time)
 
-            end_time = start_time + duration
+                end_time = start_time + duration
+                task_info = {
+                    'start': start_time,
+                    'end': end_time,
+                    'op': current_op,
+                    'machine': machine_id,
+                    'type': 'operation' # Đánh dấu là task thường
+                }
             
             # 4. Cập nhật trạng thái
-            task_info = {
-                'start': start_time,
-                'end': end_time,
-                'op': current_op,
-                'machine': machine_id,
-                'type': 'operation' # Đánh dấu là task thường
-            }
             machine_timelines[machine_id].append(task_info)
-            machine_end_times[machine_id] = max(machine_end_times[machine_id], end_time)
+            if pos >= first_pos:
+                pos_start.append(start_time)
+                pos_end.append(end_time)
+            pos_col.append(ci.col_of_list[gene_idx][selected_machine_idx])
+            timeline.insert(start_time, end_time)
             job_end_times[job_id] = end_time
             job_prev_machine[job_id] = machine_id
 
         # --- C. Tính toán Fitness ---
+        machine_end_times = {m_id: tl.end_time for m_id, tl in sorted_timelines.items()}
         
         self.makespan = max(machine_end_times.values()) if machine_end_times else 0
 
@@ -184,22 +488,25 @@ class Individual:
             # Idle time thực tế (máy bật nhưng không chạy và không sửa)
             idle_duration = max(0, end_time_k - busy_duration - total_breakdown_duration)
             
-            machine_obj = next(m for m in self.factory.machines if m.machine_id == m_id)
-            E_idle += idle_duration * machine_obj.AI
+            E_idle += idle_duration * ci.AI_by_machine[m_id]
 
         self.wcm = max_machine_workload
-        E_common = self.makespan * self.factory.params.AC
+        E_common = self.makespan * ci.AC
         self.total_energy = E_processing + E_setup + E_transport + E_idle + E_common
         
+        machine_timelines.pos_start = np.array(pos_start, dtype=float)
+        machine_timelines.pos_end = np.array(pos_end, dtype=float)
+        machine_timelines.pos_col = np.array(pos_col, dtype=np.int64)
+        machine_timelines.breakdown_version = self.factory.breakdown_version
         self.detailed_schedule = machine_timelines
 
     # ... (Giữ nguyên các hàm Crossover và Mutation ở dưới) ...
-    def crossover_machine_selection(self, partner):
+    def crossover_machine_selection(self, partner, rng=random):
         child1 = Individual(self.jobs, self.factory)
         child2 = Individual(self.jobs, self.factory)
         child1.os = self.os[:]
         child2.os = partner.os[:]
-        mask = [random.randint(0, 1) for _ in range(self.total_ops)]
+        mask = [rng.randint(0, 1) for _ in range(self.total_ops)]
         for i in range(self.total_ops):
             if mask[i] == 0:
                 child1.ms[i] = self.ms[i]
@@ -209,7 +516,7 @@ class Individual:
                 child2.ms[i] = self.ms[i]
         return child1, child2
 
-    def crossover_operation_sequence(self, partner):
+    def crossover_operation_sequence(self, partner, rng=random):
         child1 = Individual(self.jobs, self.factory)
         child2 = Individual(self.jobs, self.factory)
         child1.ms = self.ms[:]
@@ -217,7 +524,7 @@ class Individual:
         
         all_job_ids = list(set(self.os))
         subset_size = len(all_job_ids) // 2
-        subset_jobs = set(random.sample(all_job_ids, subset_size))
+        subset_jobs = set(rng.sample(all_job_ids, subset_size))
 
         def apply_jox(parent_main, parent_fill):
             new_os = [-1] * self.total_ops
@@ -236,19 +543,19 @@ class Individual:
         child2.os = apply_jox(partner, self)
         return child1, child2
 
-    def mutation_machine_selection(self, mutation_rate):
+    def mutation_machine_selection(self, mutation_rate, rng=random):
         for i in range(self.total_ops):
-            if random.random() < mutation_rate:
+            if rng.random() < mutation_rate:
                 op_obj = self.all_operations[i]
                 num_machines = len(op_obj.sorted_machine_ids)
                 if num_machines > 1:
                     current_idx = self.ms[i]
                     new_idx = current_idx
                     while new_idx == current_idx:
-                        new_idx = random.randint(0, num_machines - 1)
+                        new_idx = rng.randint(0, num_machines - 1)
                     self.ms[i] = new_idx
 
-    def mutation_operation_sequence(self, mutation_rate):
-        if random.random() < mutation_rate:
-            idx1, idx2 = random.sample(range(self.total_ops), 2)
-            self.os[idx1], self.os[idx2] = self.os[idx2], self.os[idx1]
\ No newline at end of file
+    def mutation_operation_sequence(self, mutation_rate, rng=random):
+        if rng.random() < mutation_rate:
+            idx1, idx2 = rng.sample(range(self.total_ops), 2)
+            self.swap_os(idx1, idx2)
\ No newline at end of file
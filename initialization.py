@@ -2,7 +2,8 @@ import random
 import math
 from individual import Individual
 class Initialization:
-    def __init__(self, N, random_rate, minimum_rate, maximum_remain_rate, mini_workload_rate, list_job, factory):
+    def __init__(self, N, random_rate, minimum_rate, maximum_remain_rate, mini_workload_rate, list_job, factory,
+                 rng=random):
         """
         Khởi tạo quần thể ban đầu theo 4 chiến lược.
         
@@ -14,8 +15,10 @@ class Initialization:
             mini_workload_rate (float): Tỷ lệ khởi tạo theo tải trọng máy nhỏ nhất (Strategy 4).
             list_job (list): Danh sách các đối tượng Job.
             factory (object): Đối tượng Factory chứa thông tin máy.
+            rng (random.Random): Nguồn ngẫu nhiên (mặc định: module random toàn cục).
         """
         self.N = N
+        self.rng = rng
         self.list_job = list_job
         self.factory = factory
         
@@ -76,7 +79,7 @@ class Initialization:
         os = []
         for job in self.list_job:
             os.extend([job.job_id] * len(job.operations))
-        random.shuffle(os)
+        self.rng.shuffle(os)
         individual.os = os
 
     def _strategy_random(self, individual, jobs, factory):
@@ -87,7 +90,7 @@ class Initialization:
         # Random MS
         for i, op in enumerate(individual.all_operations):
             num_machines = len(op.compatible_machines)
-            individual.ms[i] = random.randint(0, num_machines - 1)
+            individual.ms[i] = self.rng.randint(0, num_machines - 1)
 
     def _strategy_min_time(self, individual, jobs, factory):
         """(2) Generating according to the minimum time"""
@@ -113,7 +116,7 @@ class Initialization:
         """(3) Generating according to the maximum remaining time of processing first"""
         # Random MS
         for i, op in enumerate(individual.all_operations):
-            individual.ms[i] = random.randint(0, len(op.compatible_machines) - 1)
+            individual.ms[i] = self.rng.randint(0, len(op.compatible_machines) - 1)
 
         # Optimize OS: Sắp xếp Job theo tổng thời gian gia công giảm dần
         # Tính tổng PT trung bình của mỗi Job (vì máy chưa chọn cố định, ta lấy trung bình)
@@ -0,0 +1,55 @@
+class Instrumentation:
+    """
+    Lớp đo đạc (timers + counters) cho KEARL_Framework.run, gộp theo từng thế hệ.
+
+    Mỗi sự kiện là 1 dict, được gửi tới các callback (theo thứ tự đăng ký) và lưu vào history:
+        {'event': 'run_start', ...cấu hình}
+        {'event': 'generation', 'gen': g, 'timers': {pha: giây}, 'counters': {tên: số}, ...chỉ số}
+        {'event': 'run_end', 'timers': {...tổng}, 'counters': {...tổng}}
+
+    Framework chỉ gọi vào đây khi instrumentation được bật; các bộ đếm nóng (số lần decode, clone,
+    đánh giá VNS) là biến đếm luôn chạy của từng module, được lấy hiệu số mỗi thế hệ
+    -> khi tắt, chi phí gần như bằng 0.
+    """
+    def __init__(self, callbacks=None, keep_history=True):
+        self.callbacks = list(callbacks or [])
+        self.keep_history = keep_history
+        self.history = []
+        self.timers = {}        # Tổng theo pha của thế hệ hiện tại
+        self.counters = {}
+        self.total_timers = {}
+        self.total_counters = {}
+
+    def subscribe(self, callback):
+        """Đăng ký callback(event_dict)."""
+        self.callbacks.append(callback)
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def emit(self, event, **data):
+        record = {'event': event}
+        record.update(data)
+        if self.keep_history:
+            self.history.append(record)
+        for callback in self.callbacks:
+            callback(record)
+        return record
+
+    def end_generation(self, gen, **data):
+        """Phát sự kiện 'generation' với timers/counters của thế hệ, rồi cộng dồn vào tổng và reset."""
+        record = self.emit('generation', gen=gen, timers=self.timers, counters=self.counters, **data)
+        for name, value in self.timers.items():
+            self.total_timers[name] = self.total_timers.get(name, 0.0) + value
+        for name, value in self.counters.items():
+            self.total_counters[name] = self.total_counters.get(name, 0) + value
+        self.timers = {}
+        self.counters = {}
+        return record
+
+    def generations(self):
+        """Các sự kiện 'generation' đã lưu."""
+        return [record for record in self.history if record['event'] == 'generation']
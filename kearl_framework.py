@@ -1,4 +1,6 @@
-import copy
+import math
+import time
+import random
 import numpy as np
 
 # Import các module cần thiết
@@ -7,18 +9,83 @@ from initialization import Initialization
 from variable_neighborhood_search import VariableNeighborhoodSearch
 from energy_efficient_scheduler import EnergyEfficientScheduler
 from rl_agent import RLAgent
-from nsga2_utils import NSGAII_Utils, nextPopulation
+from nsga2_utils import RankedPopulation, nextPopulation
+from parallel_evaluator import ParallelEvaluator, _pack_schedule, _unpack_schedule
+from fitness_cache import FitnessCache
+from pareto_archive import ParetoArchive
+import quality_indicators
+from individual import Individual
+from compiled_instance import CompiledInstance
+from instrumentation import Instrumentation
+from random_streams import RandomStreams
+import checkpoint
+
+# Các pha được đo thời gian trong run() (KEARL_Framework.phase_times, giây)
+PHASES = ('initialization', 'decode', 'breakdown', 'offspring', 'rl', 'vns', 'es', 'sorting', 'archive', 'checkpoint')
+
+# Phần ngân sách cuối cùng (thời gian / số decode) trong đó nỗ lực VNS/ES giảm tuyến tính về 0
+EFFORT_TAPER = 0.25
 
 class KEARL_Framework:
     def __init__(self, factory, jobs, 
                  pop_size=100, max_gen=200, 
-                 vns_enabled=True, energy_strategy_enabled=True):
+                 vns_enabled=True, energy_strategy_enabled=True,
+                 decode_mode='insertion', workers=1, cache_size=5000,
+                 archive_size=200, archive_epsilon=0.01,
+                 reference_front=None, hv_reference_point=None, track_indicators=True,
+                 profile=False, on_event=None, seed=None,
+                 checkpoint_path=None, checkpoint_every=10,
+                 time_budget=None, eval_budget=None, stagnation_generations=None,
+                 vns_limit=5, vns_max_iter=30, vns_block_scan=False, vns_block_top_k=3):
         self.factory = factory
         self.jobs = jobs
         self.pop_size = pop_size
         self.max_gen = max_gen
         self.vns_enabled = vns_enabled
+        # Số cá thể tối đa của front 0 được chạy VNS mỗi thế hệ (các lượt chạy song song khi workers > 1)
+        self.vns_limit = vns_limit
+        # Số vòng tabu tối đa của N1' mỗi lượt VNS (MNS, Table 5)
+        self.vns_max_iter = vns_max_iter
+        # N2'/N3'/N4': quét toàn bộ láng giềng của các critical block (ước lượng head/tail, decode top-k)
+        # thay cho 1 nước ngẫu nhiên mỗi toán tử
+        self.vns_block_scan = vns_block_scan
+        self.vns_block_top_k = vns_block_top_k
         self.es_enabled = energy_strategy_enabled
+        # Chế độ decode cả quần thể bằng decode_batch: 'insertion' | 'semi_active'
+        self.decode_mode = decode_mode
+        # Số process decode song song (1 = tuần tự). Kết quả không phụ thuộc số worker.
+        self.workers = workers
+        # Số kết quả decode tối đa giữ trong LRU cache (0 = tắt cache)
+        self.cache_size = cache_size
+        # External Pareto archive (epsilon-box dominance), trả về từ run() thay cho front cuối
+        self.archive_size = archive_size
+        self.archive_epsilon = archive_epsilon
+        # Chỉ số chất lượng mỗi thế hệ (tính trên archive): Hypervolume, IGD/Spread (nếu có reference_front)
+        # hv_reference_point = None -> 1.1 * giá trị lớn nhất của quần thể khởi tạo
+        self.track_indicators = track_indicators
+        self.reference_front = reference_front
+        self.hv_reference_point = hv_reference_point
+        self.indicator_history = []
+        # Instrumentation (timers/counters theo thế hệ, phát sự kiện cho on_event(dict)); None = tắt
+        self.instrumentation = Instrumentation([on_event] if on_event else None) if (profile or on_event) else None
+        # Seed cho mọi thành phần ngẫu nhiên (mỗi thành phần 1 luồng RNG riêng, xem RandomStreams)
+        # None = dùng module random toàn cục như trước
+        self.seed = seed
+        self.random_streams = None
+        # Checkpoint (.npz, xem checkpoint.py) ghi mỗi checkpoint_every thế hệ và ở thế hệ cuối; None = tắt
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        # Điều kiện dừng sớm (None = không giới hạn), tính cho mỗi lần gọi run():
+        #   time_budget: giây (wall-clock, gồm cả khởi tạo); eval_budget: số lần decode;
+        #   stagnation_generations: số thế hệ liên tiếp archive không nhận lời giải mới và HV không tăng.
+        # Gần hết ngân sách (EFFORT_TAPER cuối) thì VNS/ES chạy trên ít cá thể hơn.
+        self.time_budget = time_budget
+        self.eval_budget = eval_budget
+        self.stagnation_generations = stagnation_generations
+        self.stop_reason = None
+        self.generations_completed = 0
+        self.stagnant_generations = 0
+        self._best_hv = None
         
         # [NEW] 1. Khởi tạo list lưu lịch sử hội tụ
         self.convergence_history = [] 
@@ -27,53 +94,147 @@ class KEARL_Framework:
         self.rl_agent = None 
         self.vns = None      
         self.es_scheduler = None 
+        self.evaluator = None
+        self.fitness_cache = None
+        self.archive = None
+        # Số lần decode lại quần thể được bỏ qua vì không có breakdown mới
+        self.decodes_avoided = 0
+        # Thời gian theo pha (PHASES) của lần run() gần nhất
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+
+    @property
+    def sort_time(self):
+        """Tổng thời gian phân lớp Pareto + chọn lọc (giây)."""
+        return self.phase_times['sorting']
+
+    def _rng(self, component):
+        """Luồng RNG của 1 thành phần (module random toàn cục nếu không đặt seed)."""
+        return self.random_streams[component] if self.random_streams is not None else random
+
+    def _lap(self, phase, start):
+        """Cộng thời gian từ mốc start vào phase_times[phase], trả về mốc mới."""
+        now = time.perf_counter()
+        self.phase_times[phase] += now - start
+        return now
         
-    def run(self):
+    def run(self, resume_from=None):
+        """
+        Chạy thuật toán.
+
+        Args:
+            resume_from (str): Đường dẫn checkpoint (save_checkpoint) để chạy tiếp từ thế hệ đã lưu.
+                               Kết quả giống hệt lần chạy không bị ngắt (cùng pop_size/max_gen).
+        """
         print("=== START KEARL ALGORITHM ===")
+        run_start = time.perf_counter()
+        decodes_start = Individual.decode_count
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        if resume_from is not None:
+            ckpt_arrays, ckpt_meta = checkpoint.read_checkpoint(resume_from)
+            self.seed = ckpt_meta['seed']
+        instr = self.instrumentation
+        if instr is not None:
+            instr.emit('run_start', pop_size=self.pop_size, max_gen=self.max_gen, total_ops=sum(len(j.operations) for j in self.jobs),
+                       machines=len(self.factory.machines), workers=self.workers, decode_mode=self.decode_mode)
+        t = time.perf_counter()
         
         # 1. Init Modules
-        init_module = Initialization(self.pop_size, 0.25, 0.25, 0.25, 0.25, self.jobs, self.factory)
-        self.vns = VariableNeighborhoodSearch(self.factory)
-        self.es_scheduler = EnergyEfficientScheduler(self.factory)
-        self.rl_agent = RLAgent(max_generations=self.max_gen)
-        
-        # 2. Population Initialization
-        print(f"Initializing Population (Size: {self.pop_size})...")
-        population = init_module.generate_population()
+        self.random_streams = RandomStreams(self.seed) if self.seed is not None else None
+        rng = self._rng
+        self.factory.rng = self.random_streams['breakdown'] if self.random_streams else None
+        init_module = Initialization(self.pop_size, 0.25, 0.25, 0.25, 0.25, self.jobs, self.factory,
+                                     rng=rng('initialization'))
+        self.fitness_cache = FitnessCache.attach(self.factory, self.cache_size)
+        self.evaluator = ParallelEvaluator(self.factory, self.jobs, workers=self.workers, decode_mode=self.decode_mode)
+        self.vns = VariableNeighborhoodSearch(self.factory, max_iter=self.vns_max_iter, rng=rng('vns'),
+                                              block_scan=self.vns_block_scan, block_top_k=self.vns_block_top_k)
+        self.es_scheduler = EnergyEfficientScheduler(self.factory, evaluator=self.evaluator)
+        self.rl_agent = RLAgent(max_generations=self.max_gen, rng=rng('rl'))
+        vns_max_iter = self.vns.max_iter
+        self.stop_reason = 'max_gen'
+        self.stagnant_generations = 0
+        self._best_hv = None
         
-        # Decode & Evaluate Gen 0
-        for ind in population:
-            ind.decode()
+        if resume_from is not None:
+            population, start_gen, current_state = self._restore_checkpoint(ckpt_arrays, ckpt_meta)
+            print(f"Resumed from {resume_from} (Gen {start_gen}/{self.max_gen})")
+            t = self._lap('checkpoint', t)
+        else:
+            # 2. Population Initialization
+            print(f"Initializing Population (Size: {self.pop_size})...")
+            population = init_module.generate_population()
+            t = self._lap('initialization', t)
             
-        # Init RL State
-        current_state = self.rl_agent.get_state(population, 1)
+            # Decode & Evaluate Gen 0
+            self.evaluator.evaluate(population)
+            t = self._lap('decode', t)
+            self.archive = ParetoArchive(self.archive_size, self.archive_epsilon)
+            self.archive.update(population)
+            self.indicator_history = []
+            if self.track_indicators and self.hv_reference_point is None:
+                nadir = np.max([[ind.makespan, ind.total_energy, ind.wcm] for ind in population], axis=0)
+                self.hv_reference_point = tuple((1.1 * nadir).tolist())
+                
+            # Init RL State
+            current_state = self.rl_agent.get_state(population, 1)
 
-        # Khởi tạo biến lưu trữ Global Best (Tốt nhất lịch sử)
-        self.global_best_solution = None
-        self.global_min_makespan = float('inf')
+            # Khởi tạo biến lưu trữ Global Best (Tốt nhất lịch sử)
+            self.global_best_solution = None
+            self.global_min_makespan = float('inf')
+            self.decodes_avoided = 0
+            start_gen = 0
+            t = self._lap('archive', t)
+        self.generations_completed = start_gen
+        base_gen_time = 0.0 # Thời gian 1 thế hệ không tính VNS/ES (phần không co giãn được)
 
         # ================= MAIN EVOLUTIONARY LOOP =================
-        for gen in range(1, self.max_gen + 1):
+        for gen in range(start_gen + 1, self.max_gen + 1):
+            stop_reason = self._stop_reason(run_start, decodes_start, base_gen_time)
+            if stop_reason is not None:
+                self.stop_reason = stop_reason
+                last_gen = gen - 1
+                if self.checkpoint_path and last_gen > start_gen and last_gen % self.checkpoint_every != 0:
+                    self.save_checkpoint(self.checkpoint_path, last_gen, population, current_state)
+                break
+            effort = self._effort(run_start, decodes_start)
+            gen_start, flexible_start = time.perf_counter(), self.phase_times['vns'] + self.phase_times['es']
+            cache = self.fitness_cache
+            cache_hits, cache_misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+            if instr is not None:
+                snapshot = self._counter_snapshot()
+            t = time.perf_counter()
             
             # --- 0. DYNAMIC BREAKDOWN SIMULATION ---
             # Lấy Makespan tốt nhất hiện tại làm mốc thời gian
             current_best_ms = min(ind.makespan for ind in population) if population else 0
             
             # Kiểm tra & Cập nhật hỏng hóc
+            bd_counts = self.factory.breakdown_counts()
             self.factory.update_machine_states(current_best_ms)
+            t = self._lap('breakdown', t)
 
             # Nếu có breakdown mới, decode lại quần thể cũ để tránh vùng hỏng
-            for ind in population:
-                ind.decode()
+            # (Breakdown làm đổi Idle Energy của mọi cá thể -> decode lại toàn bộ quần thể)
+            new_breakdowns = self.factory.breakdowns_since(bd_counts)
+            if new_breakdowns:
+                self.evaluator.evaluate(population)
+                self.archive.reevaluate(self.evaluator, self.jobs, self.factory)
+                # Objectives đổi -> HV các thế hệ trước không còn so sánh được
+                self._best_hv = None
+            else:
+                self.decodes_avoided += len(population)
+            t = self._lap('decode', t)
 
             # --- 3. RL Agent Select Action ---
             Pc, Pm = self.rl_agent.select_action(current_state, gen)
+            t = self._lap('rl', t)
             
             # --- 4. Evolution (Crossover & Mutation) ---
-            offspring = nextPopulation(population, Pc, Pm, self.factory)
+            offspring = nextPopulation(population, Pc, Pm, self.factory, rng=rng('variation'))
+            t = self._lap('offspring', t)
             
-            for ind in offspring:
-                ind.decode()
+            self.evaluator.evaluate(offspring)
+            t = self._lap('decode', t)
             
             # --- 5. RL Learn ---
             if gen < self.max_gen * 0.8:
@@ -83,41 +244,61 @@ class KEARL_Framework:
             
             self.rl_agent.update_policy(offspring, method=update_method)
             next_state = self.rl_agent.get_state(offspring, gen)
+            t = self._lap('rl', t)
             
             # --- 6. Variable Neighborhood Search (VNS) ---
-            combined_pop = population + offspring
+            # Phân lớp 1 lần, kết quả VNS/ES được thêm vào (cập nhật rank cục bộ, không sắp xếp lại)
+            combined_pop = RankedPopulation(population + offspring)
+            t = self._lap('sorting', t)
             
+            top_front, pareto_for_es, vns_improved = [], [], 0
             if self.vns_enabled:
-                fronts = NSGAII_Utils.fast_non_dominated_sort(combined_pop)
-                top_front = fronts[0]
+                top_front = combined_pop.first_front()
+                t = self._lap('sorting', t)
                 
-                limit_vns = min(5, len(top_front))
-                for i in range(limit_vns):
-                    original_ind = top_front[i]
-                    ind_clone = copy.deepcopy(original_ind)
-                    
-                    improved_ind = self.vns.run_vns(ind_clone)
-                    
-                    if improved_ind.makespan < original_ind.makespan:
+                limit_vns = min(math.ceil(self.vns_limit * effort), len(top_front))
+                self.vns.max_iter = max(1, math.ceil(vns_max_iter * effort))
+                # Các lượt VNS độc lập (tabu list + seed riêng) -> chạy song song trên pool của evaluator
+                seeds = [self.vns.rng.getrandbits(64) for _ in range(limit_vns)]
+                improved_list, evaluations = self.evaluator.run_vns(top_front[:limit_vns], seeds,
+                                                                    self.vns.tabu_size, self.vns.max_iter,
+                                                                    self.vns.block_scan, self.vns.block_top_k)
+                self.vns.evaluations += evaluations
+                for improved_ind in improved_list:
+                    if improved_ind is not None:
                         if improved_ind.wcm == 0: improved_ind.decode()
-                        combined_pop.append(improved_ind)
+                        vns_improved += 1
+                        t = self._lap('vns', t)
+                        combined_pop.extend([improved_ind])
+                        t = self._lap('sorting', t)
+                t = self._lap('vns', t)
 
             # --- 7. Energy Efficient Strategy (ES) ---
             if self.es_enabled:
-                fronts = NSGAII_Utils.fast_non_dominated_sort(combined_pop)
-                pareto_for_es = fronts[0]
+                pareto_for_es = self._effort_subset(combined_pop.first_front(), effort)
+                t = self._lap('sorting', t)
                 
                 improved_es_list = self.es_scheduler.apply_energy_strategy(
                     pareto_for_es, zz_rate=0.3, xx_rate=0.7
-                )
+                ) if pareto_for_es else []
                 
                 for ind in improved_es_list:
                     if ind.wcm == 0: ind.decode()
+                t = self._lap('es', t)
+                if instr is not None:
+                    instr.count('es_improvements', sum(new is not old for new, old in zip(improved_es_list, pareto_for_es)))
                 
                 combined_pop.extend(improved_es_list)
+                t = self._lap('sorting', t)
+
+            # Cập nhật archive bằng front 0 của quần thể gộp (gồm cả kết quả VNS/ES không được chọn)
+            first_front = combined_pop.first_front()
+            archive_accepted = self.archive.update(first_front)
+            t = self._lap('archive', t)
 
             # --- 8. Selection (NSGA-II) ---
-            population = NSGAII_Utils.select_survivors(combined_pop, self.pop_size)
+            population = combined_pop.select_survivors(self.pop_size)
+            t = self._lap('sorting', t)
             
             # --- [NEW] CẬP NHẬT BEST VÀ LỊCH SỬ HỘI TỤ ---
             # Tìm cá thể tốt nhất trong thế hệ hiện tại (theo Makespan)
@@ -129,17 +310,249 @@ class KEARL_Framework:
             # 2. Cập nhật Global Best (Best ever)
             if current_gen_best.makespan < self.global_min_makespan:
                 self.global_min_makespan = current_gen_best.makespan
-                # Dùng deepcopy để lưu bản cứng, tránh bị biến đổi ở gen sau
-                self.global_best_solution = copy.deepcopy(current_gen_best)
+                # Dùng clone để lưu bản cứng (genome + objectives), tránh bị biến đổi ở gen sau
+                self.global_best_solution = current_gen_best.clone()
             
             current_state = next_state
+
+            if self.track_indicators:
+                self.record_indicators(gen)
+                t = self._lap('archive', t)
+            self._update_stagnation(archive_accepted)
+            self.generations_completed = gen
+
+            if self.checkpoint_path and (gen % self.checkpoint_every == 0 or gen == self.max_gen):
+                self.save_checkpoint(self.checkpoint_path, gen, population, current_state)
+                t = self._lap('checkpoint', t)
             
             # Log: In ra cả Best hiện tại (Cur) và Best lịch sử (Hist)
-            print(f"Gen {gen}/{self.max_gen} | Cur MS: {current_gen_best.makespan:.1f} | Best Hist: {self.global_min_makespan:.1f} | RL: {update_method}")
+            log = f"Gen {gen}/{self.max_gen} | Cur MS: {current_gen_best.makespan:.1f} | Best Hist: {self.global_min_makespan:.1f} | RL: {update_method}"
+            if cache is not None:
+                log += f" | Cache hit/miss: {cache.hits - cache_hits}/{cache.misses - cache_misses}"
+            if self.track_indicators:
+                log += f" | HV: {self.indicator_history[-1]['hv']:.4g}"
+            if effort < 1:
+                log += f" | Effort: {effort:.2f}"
+            if instr is not None:
+                instr.count('breakdown_events', len(new_breakdowns))
+                instr.count('vns_improvements', vns_improved)
+                sizes = {'vns_front': len(top_front), 'es_front': len(pareto_for_es),
+                         'first_front': len(first_front), 'archive': len(self.archive)}
+                record = self._end_generation(instr, gen, snapshot, current_gen_best, sizes)
+                timers = record['timers']
+                log += f" | ms dec/vns/es/sort: {1e3 * timers['decode']:.0f}/{1e3 * timers['vns']:.0f}/{1e3 * timers['es']:.0f}/{1e3 * timers['sorting']:.0f}"
+            print(log)
+            base_gen_time = (time.perf_counter() - gen_start) - (self.phase_times['vns'] + self.phase_times['es'] - flexible_start)
 
         # 9. End
+        self.vns.max_iter = vns_max_iter
         print("=== END ===")
-        final_fronts = NSGAII_Utils.fast_non_dominated_sort(population)
+        print(f"Stopped after Gen {self.generations_completed}/{self.max_gen} ({self.stop_reason}), "
+              f"{time.perf_counter() - run_start:.2f}s, {Individual.decode_count - decodes_start} decodes")
+        print(f"Decodes avoided (no new breakdown): {self.decodes_avoided}")
+        print(f"Sorting time: {self.sort_time / max(1, self.generations_completed - start_gen) * 1e3:.2f} ms/gen")
+        print(f"Pareto archive: {len(self.archive)} solutions (epsilon={self.archive.epsilon:.4g})")
+        if instr is not None:
+            instr.emit('run_end', timers=dict(instr.total_timers), counters=dict(instr.total_counters))
+            print("Profile (s): " + ", ".join(f"{name}={value:.2f}" for name, value in instr.total_timers.items()))
+        self.evaluator.close()
         
-        # Trả về 2 giá trị: (Pareto Front cuối cùng, Best Lịch sử)
-        return final_fronts[0], self.global_best_solution
\ No newline at end of file
+        # Trả về 2 giá trị: (Pareto Front của archive [ArchivedSolution], Best Lịch sử)
+        return self.archive.front(), self.global_best_solution
+
+    def _budget_remaining(self, run_start, decodes_start):
+        """Phần ngân sách còn lại (0..1), lấy min giữa thời gian và số decode; 1.0 nếu không đặt ngân sách."""
+        remaining = 1.0
+        if self.time_budget is not None:
+            remaining = min(remaining, 1 - (time.perf_counter() - run_start) / self.time_budget)
+        if self.eval_budget is not None:
+            remaining = min(remaining, 1 - (Individual.decode_count - decodes_start) / self.eval_budget)
+        return max(0.0, remaining)
+
+    def _effort(self, run_start, decodes_start):
+        """Hệ số nỗ lực VNS/ES của thế hệ tới: 1 cho tới EFFORT_TAPER cuối của ngân sách, sau đó giảm tuyến tính về 0."""
+        return min(1.0, self._budget_remaining(run_start, decodes_start) / EFFORT_TAPER)
+
+    @staticmethod
+    def _effort_subset(front, effort):
+        """ceil(effort * |front|) cá thể rải đều trên front (giữ thứ tự); cả front nếu effort >= 1."""
+        if effort >= 1:
+            return front
+        k = math.ceil(effort * len(front))
+        if k == 0:
+            return []
+        return [front[i] for i in sorted(set(np.linspace(0, len(front) - 1, k).round().astype(int).tolist()))]
+
+    def _stop_reason(self, run_start, decodes_start, base_gen_time):
+        """
+        Lý do dừng trước khi chạy thế hệ tiếp theo (None = chạy tiếp).
+        Thế hệ chỉ được bắt đầu nếu phần không co giãn của nó (ước lượng từ thế hệ trước cho thời gian,
+        pop_size lần decode offspring cho số decode) còn nằm trong ngân sách.
+        """
+        if self.time_budget is not None and time.perf_counter() - run_start + base_gen_time > self.time_budget:
+            return 'time_budget'
+        if self.eval_budget is not None and Individual.decode_count - decodes_start + self.pop_size > self.eval_budget:
+            return 'eval_budget'
+        if self.stagnation_generations is not None and self.stagnant_generations >= self.stagnation_generations:
+            return 'stagnation'
+        return None
+
+    def _update_stagnation(self, archive_accepted):
+        """Đếm số thế hệ liên tiếp không cải thiện (archive không nhận lời giải mới và HV không tăng)."""
+        improved = archive_accepted > 0
+        if self.track_indicators:
+            hv = self.indicator_history[-1]['hv']
+            if self._best_hv is not None and hv > self._best_hv:
+                improved = True
+            if self._best_hv is None or hv > self._best_hv:
+                self._best_hv = hv
+        self.stagnant_generations = 0 if improved else self.stagnant_generations + 1
+
+    def save_checkpoint(self, path, gen, population, current_state):
+        """
+        Ghi checkpoint sau thế hệ gen: genome/objectives/rank của quần thể, archive, Q-table,
+        trạng thái RNG, trạng thái hỏng máy, tabu list của VNS, lịch sử hội tụ và chỉ số.
+        """
+        # Cùng 1 object có thể xuất hiện nhiều lần trong quần thể -> lưu vị trí xuất hiện đầu tiên
+        first_pos = {}
+        same_as = [first_pos.setdefault(id(ind), i) for i, ind in enumerate(population)]
+        ms, os_, objectives = checkpoint.genome_arrays(population)
+        arrays = {
+            'pop.ms': ms, 'pop.os': os_, 'pop.objectives': objectives,
+            'pop.same_as': np.array(same_as, dtype=np.int32),
+            'pop.rank': np.array([getattr(ind, 'rank', 0) for ind in population], dtype=np.int32),
+            'pop.crowding': np.array([getattr(ind, 'crowding_distance', 0.0) for ind in population], dtype=float),
+            # Cá thể đã có detailed_schedule (decode đầy đủ) -> decode lại khi khôi phục
+            'pop.scheduled': np.array([bool(ind.detailed_schedule) for ind in population]),
+        }
+        archive_state = self.archive.state()
+        arrays.update({f'archive.{k}': v for k, v in archive_state.items() if k != 'epsilon'})
+        arrays.update({f'factory.{k}': v for k, v in self.factory.breakdown_state().items()})
+        rl_arrays, rl_meta = checkpoint.split_state('rl', self.rl_agent.state_dict())
+        arrays.update(rl_arrays)
+
+        if self.random_streams is not None:
+            rng_states = self.random_streams.getstate()
+        else:
+            rng_states = {'global': random.getstate()}
+        gauss_next = {}
+        for name, state in rng_states.items():
+            arrays[f'rng.{name}'], gauss_next[name] = checkpoint.random_state_to_array(state)
+
+        best = self.global_best_solution
+        if best is not None:
+            arrays['best.ms'], arrays['best.os'], arrays['best.objectives'] = checkpoint.genome_arrays([best])
+            packed = _pack_schedule(best)
+            arrays['best.machines'] = np.array(list(packed), dtype=np.int64)
+            arrays['best.schedule'] = np.array([(k, start, end, g) for k, tasks in enumerate(packed.values())
+                                                for start, end, g in tasks], dtype=float).reshape(-1, 4)
+
+        meta = {
+            'gen': gen, 'max_gen': self.max_gen, 'pop_size': self.pop_size,
+            'total_ops': population[0].total_ops if population else 0,
+            'seed': self.seed, 'current_state': int(current_state),
+            'rl': rl_meta, 'rng_gauss_next': gauss_next,
+            'archive_epsilon': archive_state['epsilon'],
+            'tabu_list': [list(move) for move in self.vns.tabu_list],
+            'vns_evaluations': self.vns.evaluations,
+            'convergence_history': [float(v) for v in self.convergence_history],
+            'indicator_history': self.indicator_history,
+            'hv_reference_point': self.hv_reference_point,
+            'global_min_makespan': float(self.global_min_makespan),
+            'decodes_avoided': self.decodes_avoided,
+            'stagnant_generations': self.stagnant_generations,
+            'best_hv': self._best_hv,
+        }
+        checkpoint.write_checkpoint(path, arrays, meta)
+
+    def _restore_checkpoint(self, arrays, meta):
+        """Khôi phục trạng thái từ checkpoint (sau khi đã khởi tạo module). Trả về (population, gen, current_state)."""
+        total_ops = CompiledInstance.get(self.factory, self.jobs).total_ops
+        if meta['pop_size'] != self.pop_size or meta['total_ops'] != total_ops:
+            raise ValueError(f"Checkpoint không khớp cấu hình: pop_size={meta['pop_size']}, total_ops={meta['total_ops']} "
+                             f"(hiện tại pop_size={self.pop_size}, total_ops={total_ops})")
+
+        self.factory.load_breakdown_state({'machines': arrays['factory.machines'], 'history': arrays['factory.history']})
+        for name, gauss_next in meta['rng_gauss_next'].items():
+            state = checkpoint.random_state_from_array(arrays[f'rng.{name}'], gauss_next)
+            if name == 'global':
+                random.setstate(state)
+            else:
+                self.random_streams[name].setstate(state)
+        self.rl_agent.load_state_dict(checkpoint.join_state('rl', arrays, meta['rl']))
+        self.vns.tabu_list = [tuple(move) for move in meta['tabu_list']]
+        self.vns.evaluations = meta['vns_evaluations']
+
+        self.archive = ParetoArchive(self.archive_size, self.archive_epsilon)
+        self.archive.load_state({'ms': arrays['archive.ms'], 'os': arrays['archive.os'], 'objectives': arrays['archive.objectives'],
+                                 'boxes': arrays['archive.boxes'], 'epsilon': meta['archive_epsilon']})
+
+        population = []
+        rows = zip(arrays['pop.ms'].tolist(), arrays['pop.os'].tolist(), arrays['pop.objectives'].tolist(),
+                   arrays['pop.same_as'].tolist(), arrays['pop.rank'].tolist(), arrays['pop.crowding'].tolist(),
+                   arrays['pop.scheduled'].tolist())
+        for i, (ms, os_, objectives, same_as, rank, crowding, scheduled) in enumerate(rows):
+            if same_as != i:
+                population.append(population[same_as])
+                continue
+            ind = Individual(self.jobs, self.factory)
+            ind.ms, ind.os = ms, os_
+            if scheduled:
+                ind.decode()
+            ind.makespan, ind.total_energy, ind.wcm = objectives
+            ind.rank, ind.crowding_distance = rank, crowding
+            population.append(ind)
+
+        self.global_best_solution = None
+        if 'best.ms' in arrays:
+            best = Individual(self.jobs, self.factory)
+            best.ms, best.os = arrays['best.ms'][0].tolist(), arrays['best.os'][0].tolist()
+            best.makespan, best.total_energy, best.wcm = arrays['best.objectives'][0].tolist()
+            packed = {m_id: [] for m_id in arrays['best.machines'].tolist()}
+            machine_ids = list(packed)
+            for k, start, end, g in arrays['best.schedule'].tolist():
+                packed[machine_ids[int(k)]].append((start, end, int(g)))
+            best.detailed_schedule = _unpack_schedule(best, packed)
+            self.global_best_solution = best
+        self.global_min_makespan = meta['global_min_makespan']
+        self.convergence_history = list(meta['convergence_history'])
+        self.indicator_history = list(meta['indicator_history'])
+        if meta['hv_reference_point'] is not None:
+            self.hv_reference_point = tuple(meta['hv_reference_point'])
+        self.decodes_avoided = meta['decodes_avoided']
+        self.stagnant_generations = meta['stagnant_generations']
+        self._best_hv = meta['best_hv']
+        return population, meta['gen'], meta['current_state']
+
+    def record_indicators(self, gen):
+        """Tính Hypervolume (và IGD/Spread nếu có reference_front) của archive, lưu vào indicator_history."""
+        F = self.archive.objective_matrix()
+        record = {'gen': gen, 'hv': quality_indicators.hypervolume_3d(F, self.hv_reference_point)}
+        if self.reference_front is not None:
+            record['igd'] = quality_indicators.igd(F, self.reference_front)
+            record['spread'] = quality_indicators.spread(F, self.reference_front)
+        self.indicator_history.append(record)
+        return record
+
+    def _counter_snapshot(self):
+        """Giá trị hiện tại của các bộ đếm/đồng hồ luôn chạy (lấy hiệu số cuối thế hệ)."""
+        cache = self.fitness_cache
+        return (dict(self.phase_times), Individual.decode_count, Individual.clone_count, self.vns.evaluations,
+                cache.hits if cache is not None else 0, cache.misses if cache is not None else 0, self.decodes_avoided)
+
+    def _end_generation(self, instr, gen, snapshot, best, sizes):
+        """Gộp timers/counters của thế hệ gen vào instr và phát sự kiện 'generation'."""
+        phase_times, decodes, clones, vns_evals, hits, misses, avoided = snapshot
+        for phase in PHASES:
+            instr.add_time(phase, self.phase_times[phase] - phase_times[phase])
+        cache = self.fitness_cache
+        instr.count('decode_calls', Individual.decode_count - decodes)
+        instr.count('decodes_avoided', self.decodes_avoided - avoided)
+        instr.count('clones', Individual.clone_count - clones)
+        instr.count('vns_evaluations', self.vns.evaluations - vns_evals)
+        instr.count('cache_hits', (cache.hits if cache is not None else 0) - hits)
+        instr.count('cache_misses', (cache.misses if cache is not None else 0) - misses)
+        metrics = {'sizes': sizes, 'makespan': best.makespan, 'total_energy': best.total_energy, 'wcm': best.wcm}
+        if self.indicator_history and self.indicator_history[-1]['gen'] == gen:
+            metrics.update({k: v for k, v in self.indicator_history[-1].items() if k != 'gen'})
+        return instr.end_generation(gen, **metrics)
@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+
+class MachineTimeline:
+    """
+    Timeline của 1 máy cho Insertion-based Decoding.
+
+    Lưu các khối bận (operation hoặc breakdown) dưới dạng 2 list song song `starts`/`ends`,
+    luôn được sắp theo start (ổn định theo thứ tự chèn - giống sorted(..., key=start)).
+    Thay cho việc sort lại toàn bộ timeline và quét tuyến tính ở mỗi operation.
+    """
+    __slots__ = ('starts', 'ends', 'end_time', 'max_gap')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.end_time = 0.0   # Thời điểm kết thúc muộn nhất trên máy
+        self.max_gap = 0.0    # Cận trên của mọi khe hở (starts[i] - ends[i-1])
+
+    def find_gap(self, arrival_time, duration):
+        """
+        Tìm khe hở sớm nhất (theo thứ tự start) chứa được task dài `duration`
+        bắt đầu không sớm hơn `arrival_time`.
+        Trả về thời điểm bắt đầu, hoặc None nếu không có khe (đặt sau task cuối).
+
+        Cho kết quả giống hệt vòng quét tuyến tính cũ:
+            for block in sorted(timeline):
+                if block.start - prev_end >= duration and max(prev_end, arrival) + duration <= block.start: ...
+                prev_end = block.end
+        """
+        starts = self.starts
+        ends = self.ends
+        n = len(starts)
+
+        # Các khối có start < arrival + duration chắc chắn không thỏa -> bỏ qua bằng bisect
+        i = bisect_left(starts, arrival_time + duration)
+        if i >= n:
+            return None
+
+        # Khối đầu tiên: khe có thể bắt đầu trước arrival
+        prev_end = ends[i - 1] if i > 0 else 0.0
+        block_start = starts[i]
+        if block_start - prev_end >= duration:
+            potential_start = max(prev_end, arrival_time)
+            if potential_start + duration <= block_start:
+                return potential_start
+
+        # Các khối sau: prev_end >= starts[i] >= arrival -> chỉ phụ thuộc kích thước khe
+        if self.max_gap < duration:
+            return None
+        for k in range(i + 1, n):
+            prev_end = ends[k - 1]
+            block_start = starts[k]
+            if block_start - prev_end >= duration and prev_end + duration <= block_start:
+                return prev_end
+        return None
+
+    def insert(self, start, end):
+        """Chèn khối [start, end) vào đúng vị trí (sau các khối cùng start)."""
+        starts = self.starts
+        ends = self.ends
+        idx = bisect_right(starts, start)
+        starts.insert(idx, start)
+        ends.insert(idx, end)
+
+        # Cập nhật cận trên của khe hở (2 khe mới quanh khối vừa chèn)
+        prev_end = ends[idx - 1] if idx > 0 else 0.0
+        gap = start - prev_end
+        if idx + 1 < len(starts):
+            gap = max(gap, starts[idx + 1] - end)
+        if gap > self.max_gap:
+            self.max_gap = gap
+
+        if end > self.end_time:
+            self.end_time = end
+        return idx
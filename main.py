@@ -9,6 +9,7 @@ from kearl_framework import KEARL_Framework
 BASE_DATA_DIR = "./data"
 INSTANCES_TO_RUN = ["mk05"]
 CHART_DIR = "./charts"  # <--- [THÊM MỚI] Thư mục lưu ảnh biểu đồ
+SEED = None  # Đặt số nguyên để chạy lặp lại được (cùng seed -> cùng kết quả)
 
 # Tạo thư mục lưu biểu đồ nếu chưa có
 if not os.path.exists(CHART_DIR):
@@ -71,7 +72,8 @@ def run_single_instance(instance_name):
         pop_size=100,      
         max_gen=100,        
         vns_enabled=True,
-        energy_strategy_enabled=True
+        energy_strategy_enabled=True,
+        seed=SEED
     )
 
     # 4. Chạy thuật toán
@@ -0,0 +1,106 @@
+import numpy as np
+
+from individual import Individual
+from numba_decoder import breakdown_arrays, decode_kernel, reassign_makespans_kernel
+
+class ReassignmentEvaluator:
+    """
+    Engine đánh giá nước đi đổi máy của 1 operation (N1' của VNS) với OS cố định.
+
+    Lời giải hiện tại chỉ được giữ dưới dạng mảng (MS + vết start/end theo vị trí OS), không dựng
+    detailed_schedule. Đổi máy của gene g chỉ ảnh hưởng các vị trí OS từ vị trí của g trở đi, nên phần
+    đầu (head) của lịch được dùng lại và mọi slot thay thế được giải mã lại phần đuôi trong
+    1 lần gọi kernel -> makespan chính xác (giống hệt Individual.decode()).
+    Chỉ lời giải cuối cùng được decode đầy đủ (to_individual).
+
+    Không có JIT (Individual.use_jit = False): mỗi slot là 1 Individual decode tăng dần (decode_python).
+    """
+    def __init__(self, individual):
+        self.base = individual
+        self.ci = ci = individual.compiled
+        self.use_jit = Individual.use_jit
+        if not self.use_jit:
+            self.current = individual.clone()
+            if not self.current.detailed_schedule:
+                self.current.decode_uncached()
+            self._trials = {}
+            self.makespan = self.current.makespan
+            return
+
+        self.bd = breakdown_arrays(individual.factory)
+        self.timeline_size = ci.max_ops_per_machine + self.bd[0].shape[1]
+        self.os = np.array(individual.os, dtype=np.int64)
+        self.ms = np.array(individual.ms, dtype=np.int64)
+        # Vị trí OS nơi từng gene được giải mã (OS không đổi trong N1')
+        self.os_pos = individual.os_index()[0]
+        self._decode(0)
+
+    def _kernel_args(self):
+        ci = self.ci
+        return (ci.job_first_op, ci.machine_of, ci.col_of, ci.PT, ci.ST, ci.AP, ci.AS, ci.TT, ci.AI,
+                ci.UT_k, ci.AC, *self.bd, self.timeline_size)
+
+    def _decode(self, first_pos):
+        """Giải mã lại lời giải hiện tại từ vị trí OS first_pos."""
+        if first_pos:
+            prefix_start, prefix_end = self.op_start[:first_pos], self.op_end[:first_pos]
+        else:
+            prefix_start = prefix_end = np.zeros(0)
+        self.makespan, _, _, self.op_start, self.op_end, _ = decode_kernel(
+            self.os, self.ms, *self._kernel_args(), prefix_start, prefix_end)
+
+    def slot(self, gene):
+        """Slot máy hiện tại của gene."""
+        if not self.use_jit:
+            return self.current.ms[gene]
+        return int(self.ms[gene])
+
+    def makespans(self, gene):
+        """Makespan sau khi đổi máy của gene sang từng slot (list theo slot, slot hiện tại = None)."""
+        num_slots = self.ci.num_slots_list[gene]
+        if not self.use_jit:
+            cur = self.current
+            first_pos = cur.os_position(gene)
+            self._trials = {}
+            for s in range(num_slots):
+                if s == cur.ms[gene]:
+                    continue
+                trial = cur.clone(copy_objectives=False)
+                trial.ms[gene] = s
+                trial.decode_uncached(base=cur, first_pos=first_pos)
+                self._trials[s] = trial
+            return [self._trials[s].makespan if s in self._trials else None for s in range(num_slots)]
+
+        first_pos = self.os_pos[gene]
+        Individual.decode_count += num_slots - 1
+        values = reassign_makespans_kernel(self.os, self.ms, gene, *self._kernel_args(), num_slots,
+                                           self.op_start[:first_pos], self.op_end[:first_pos]).tolist()
+        values[self.ms[gene]] = None
+        return values
+
+    def apply(self, gene, new_slot):
+        """Thực hiện nước đi (gene -> new_slot) trên lời giải hiện tại."""
+        if not self.use_jit:
+            trial = self._trials.get(new_slot)
+            if trial is None:
+                self.makespans(gene)
+                trial = self._trials[new_slot]
+            self.current = trial
+            self._trials = {}
+            self.makespan = trial.makespan
+            return
+        self.ms[gene] = new_slot
+        self._decode(self.os_pos[gene])
+
+    def ms_list(self):
+        """Vector MS của lời giải hiện tại (list)."""
+        if not self.use_jit:
+            return self.current.ms[:]
+        return self.ms.tolist()
+
+    def to_individual(self, ms):
+        """Individual với vector MS cho trước (OS của cá thể gốc), decode đầy đủ tăng dần từ cá thể gốc."""
+        ind = self.base.clone(copy_objectives=False)
+        ind.ms = list(ms)
+        ind.decode(base=self.base)
+        return ind
@@ -1,5 +1,5 @@
 import random
-import copy
+import numpy as np
 
 class NSGAII_Utils:
     """
@@ -25,9 +25,163 @@ class NSGAII_Utils:
                 better_in_at_least_one = True
         return better_in_at_least_one
 
+    @staticmethod
+    def objective_matrix(population):
+        """Ma trận mục tiêu (N, 3): [MCT, TEC, WCM] của từng cá thể."""
+        return np.array([(ind.makespan, ind.total_energy, ind.wcm) for ind in population],
+                        dtype=float).reshape(-1, 3)
+
+    @staticmethod
+    def dominance_matrix(A, B):
+        """D[i, j] = True nếu A[i] trội B[j] (A, B: ma trận mục tiêu)."""
+        le = np.ones((len(A), len(B)), dtype=bool)
+        lt = np.zeros((len(A), len(B)), dtype=bool)
+        for m in range(A.shape[1]):
+            a = A[:, m, None]
+            b = B[None, :, m]
+            le &= a <= b
+            lt |= a < b
+        return le & lt
+
+    @staticmethod
+    def pareto_ranks(F, block_size=256):
+        """
+        Rank Pareto (0 = front đầu) của từng hàng trong ma trận mục tiêu F.
+
+        Duyệt các cá thể theo thứ tự từ điển (MCT, TEC, WCM): cá thể trội luôn đứng trước
+        cá thể bị trội, nên rank[q] = 1 + max(rank[p] | p trội q) chỉ cần so với các cá thể
+        đứng trước. Mỗi block so sánh dạng vector với phần đã xếp hạng, trong block thì lặp
+        tới điểm bất động (số vòng <= số front trong block).
+        """
+        n = len(F)
+        order = np.lexsort((F[:, 2], F[:, 1], F[:, 0]))
+        S = F[order]
+        sorted_ranks = np.zeros(n, dtype=np.int64)
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            blk = S[start:end]
+            if start > 0:
+                D = NSGAII_Utils.dominance_matrix(S[:start], blk)
+                r = np.where(D, sorted_ranks[:start, None], -1).max(axis=0) + 1
+            else:
+                r = np.zeros(end - start, dtype=np.int64)
+            D_in = NSGAII_Utils.dominance_matrix(blk, blk)
+            if D_in.any():
+                while True:
+                    new_r = np.maximum(r, np.where(D_in, r[:, None] + 1, 0).max(axis=0))
+                    if np.array_equal(new_r, r):
+                        break
+                    r = new_r
+            sorted_ranks[start:end] = r
+        ranks = np.empty(n, dtype=np.int64)
+        ranks[order] = sorted_ranks
+        return ranks
+
+    @staticmethod
+    def fronts_from_ranks(F, ranks, D=None):
+        """
+        Chia index theo rank thành các front, giữ đúng thứ tự của thuật toán gốc
+        (naive_non_dominated_sort):
+            - Front 0: theo thứ tự trong quần thể.
+            - Front k+1: q được thêm khi cá thể trội nó cuối cùng (trong front k) được duyệt
+              -> sắp theo vị trí (trong front k) của cá thể trội cuối cùng, hoà thì theo thứ tự quần thể.
+        D: Ma trận trội đầy đủ của F nếu đã có sẵn (None = tính theo từng cặp front).
+        """
+        if len(ranks) == 0:
+            return []
+        idx = np.argsort(ranks, kind='stable')
+        members = np.split(idx, np.cumsum(np.bincount(ranks))[:-1])
+        fronts = [members[0]]
+        for cur in members[1:]:
+            prev = fronts[-1]
+            D_pc = D[np.ix_(prev, cur)] if D is not None else NSGAII_Utils.dominance_matrix(F[prev], F[cur])
+            last = len(prev) - 1 - np.argmax(D_pc[::-1], axis=0)
+            fronts.append(cur[np.argsort(last, kind='stable')])
+        return [front.tolist() for front in fronts]
+
+    @staticmethod
+    def fronts_with_duplicates(F, uid, mult, D=None):
+        """
+        Phân lớp khi 1 cá thể xuất hiện nhiều lần trong quần thể (vd. ES trả lại chính cá thể gốc).
+        Mô phỏng đúng bộ đếm của naive_non_dominated_sort theo số lần xuất hiện:
+            - domination_count[q] = tổng số lần xuất hiện của các cá thể trội q.
+            - Mỗi lần p có mặt trong front giảm bộ đếm của q đúng mult[q] lần
+              (q lặp lại trong p.dominated_solutions); q vào front kế khi bộ đếm chạm đúng 0.
+            - Front 0 giữ nguyên các lần lặp; từ front 1 mỗi cá thể xuất hiện tối đa 1 lần.
+
+        Args:
+            F: Ma trận mục tiêu của các cá thể phân biệt (theo lần xuất hiện đầu tiên).
+            uid: Index cá thể phân biệt của từng vị trí trong quần thể.
+            mult: Số lần xuất hiện của từng cá thể phân biệt.
+            D: Ma trận trội của F nếu đã có sẵn.
+        Returns:
+            (fronts, ranks): các front (list index phân biệt) và {index: rank} của các cá thể được xếp.
+        """
+        if D is None:
+            D = NSGAII_Utils.dominance_matrix(F, F)
+        count = mult @ D.astype(np.int64)
+        positions = [[] for _ in range(len(F))]
+        for pos, u in enumerate(uid):
+            positions[u].append(pos)
+
+        front = [u for u in uid if count[u] == 0]
+        fronts = [front]
+        ranks = dict.fromkeys(front, 0)
+        while True:
+            cum = np.cumsum(D[front].astype(np.int64) * mult, axis=0)
+            qs = np.flatnonzero((count > 0) & (cum[-1] >= count))
+            if len(qs) == 0:
+                break
+            # Cá thể p (trong front) làm bộ đếm của q chạm 0, và lần xuất hiện thứ `need` của q trong p.dominated_solutions
+            row = np.argmax(cum[:, qs] >= count[qs], axis=0)
+            need = count[qs] - np.where(row > 0, cum[row - 1, qs], 0)
+            key_pos = [positions[q][k - 1] for q, k in zip(qs.tolist(), need.tolist())]
+            front = qs[np.lexsort((key_pos, row))].tolist()
+            count -= cum[-1]
+            ranks.update(dict.fromkeys(front, len(fronts)))
+            fronts.append(front)
+        return fronts, ranks
+
+    @staticmethod
+    def non_dominated_fronts(population, F=None):
+        """
+        Phân lớp Pareto, trả về các front dạng index trong population (gán ind.rank).
+        Cá thể xuất hiện nhiều lần được đại diện bởi index của lần xuất hiện đầu tiên.
+
+        Args:
+            F: Ma trận mục tiêu của population (None = tự trích xuất).
+        """
+        if not population:
+            return []
+        if F is None:
+            F = NSGAII_Utils.objective_matrix(population)
+        first_pos = {}
+        uid = [first_pos.setdefault(id(ind), pos) for pos, ind in enumerate(population)]
+        if len(first_pos) == len(population):
+            ranks = NSGAII_Utils.pareto_ranks(F)
+            for ind, r in zip(population, ranks.tolist()):
+                ind.rank = r
+            return NSGAII_Utils.fronts_from_ranks(F, ranks)
+
+        unique_pos = list(first_pos.values())
+        uid_of_pos = dict(zip(unique_pos, range(len(unique_pos))))
+        uid = [uid_of_pos[pos] for pos in uid]
+        fronts, ranks = NSGAII_Utils.fronts_with_duplicates(F[unique_pos], uid, np.bincount(uid))
+        for u, r in ranks.items():
+            population[unique_pos[u]].rank = r
+        return [[unique_pos[u] for u in front] for front in fronts]
+
     @staticmethod
     def fast_non_dominated_sort(population):
-        """Phân lớp Pareto (Fronts)."""
+        """
+        Phân lớp Pareto (Fronts) - bản vector hoá NumPy.
+        Kết quả (các front, thứ tự trong từng front, ind.rank) giống hệt naive_non_dominated_sort.
+        """
+        return [[population[i] for i in front] for front in NSGAII_Utils.non_dominated_fronts(population)]
+
+    @staticmethod
+    def naive_non_dominated_sort(population):
+        """Phân lớp Pareto (Fronts) - bản O(M.N^2) gốc, giữ lại để đối chiếu/benchmark."""
         fronts = [[]]
         for p in population:
             p.domination_count = 0
@@ -56,56 +210,169 @@ class NSGAII_Utils:
         return fronts[:-1] # Loại bỏ front rỗng cuối cùng
 
     @staticmethod
-    def calculate_crowding_distance(front):
-        """Tính khoảng cách đám đông để duy trì đa dạng."""
-        l = len(front)
-        if l == 0: return
-        
-        for ind in front:
-            ind.crowding_distance = 0
-            
-        # Với mỗi mục tiêu (0: MCT, 1: TEC, 2: WCM)
-        for m in range(3):
-            # Sort theo mục tiêu m
-            front.sort(key=lambda x: [x.makespan, x.total_energy, x.wcm][m])
-            
+    def crowding_distances(F, front, distances):
+        """
+        Crowding distance của các index `front` (ghi vào mảng distances), dạng vector.
+        Trả về front đã sắp lại như bản gốc: sort ổn định lần lượt theo MCT, TEC, WCM.
+        Index lặp lại (cùng 1 cá thể) được cộng dồn như khi gán trên cùng 1 object.
+        """
+        front = np.asarray(front, dtype=np.int64)
+        distances[front] = 0.0
+        for m in range(F.shape[1]):
+            front = front[np.argsort(F[front, m], kind='stable')]
             # Gán vô cùng cho biên
-            front[0].crowding_distance = float('inf')
-            front[-1].crowding_distance = float('inf')
-            
-            # Lấy range của mục tiêu
-            obj_values = [[x.makespan, x.total_energy, x.wcm][m] for x in front]
+            distances[front[0]] = np.inf
+            distances[front[-1]] = np.inf
+
+            obj_values = F[front, m]
             scale = obj_values[-1] - obj_values[0]
             if scale == 0: scale = 1.0
-            
-            for i in range(1, l - 1):
-                dist = (obj_values[i+1] - obj_values[i-1]) / scale
-                front[i].crowding_distance += dist
+            # np.add.at cộng lần lượt theo thứ tự index -> cùng thứ tự cộng với vòng lặp gốc
+            np.add.at(distances, front[1:-1], (obj_values[2:] - obj_values[:-2]) / scale)
+        return front
+
+    @staticmethod
+    def calculate_crowding_distance(front):
+        """Tính khoảng cách đám đông để duy trì đa dạng (sắp lại front tại chỗ như bản gốc)."""
+        l = len(front)
+        if l == 0: return
+
+        first_pos = {}
+        idx = [first_pos.setdefault(id(ind), pos) for pos, ind in enumerate(front)]
+        distances = np.zeros(l)
+        order = NSGAII_Utils.crowding_distances(NSGAII_Utils.objective_matrix(front), idx, distances)
+        front[:] = [front[i] for i in order.tolist()]
+        for ind, pos in zip(front, order.tolist()):
+            ind.crowding_distance = float(distances[pos])
 
     @staticmethod
     def select_survivors(population, n_survivors):
-        """Chọn N cá thể tốt nhất dựa trên Rank và Crowding Distance."""
-        fronts = NSGAII_Utils.fast_non_dominated_sort(population)
-        next_gen = []
-        
+        """
+        Chọn N cá thể tốt nhất dựa trên Rank và Crowding Distance.
+        Ma trận mục tiêu được trích xuất 1 lần; phân lớp, crowding và cắt front cuối đều chạy trên ndarray.
+        """
+        F = NSGAII_Utils.objective_matrix(population)
+        return NSGAII_Utils.select_from_fronts(population, F, NSGAII_Utils.non_dominated_fronts(population, F), n_survivors)
+
+    @staticmethod
+    def select_from_fronts(population, F, fronts, n_survivors):
+        """Phần chọn lọc của select_survivors khi đã có các front (index trong population)."""
+        distances = np.zeros(len(population))
+        selected, processed = [], []
+
         for front in fronts:
-            NSGAII_Utils.calculate_crowding_distance(front)
+            front = NSGAII_Utils.crowding_distances(F, front, distances)
+            processed.append(front)
             # Nếu thêm cả front này mà chưa vượt quá N -> Thêm hết
-            if len(next_gen) + len(front) <= n_survivors:
-                next_gen.extend(front)
+            if len(selected) + len(front) <= n_survivors:
+                selected.extend(front.tolist())
             else:
-                # Nếu vượt quá -> Sort theo Crowding Distance giảm dần và lấy đủ
-                front.sort(key=lambda x: x.crowding_distance, reverse=True)
-                needed = n_survivors - len(next_gen)
-                next_gen.extend(front[:needed])
+                # Nếu vượt quá -> Sort (ổn định) theo Crowding Distance giảm dần và lấy đủ
+                needed = n_survivors - len(selected)
+                selected.extend(front[np.argsort(-distances[front], kind='stable')][:needed].tolist())
                 break
-                
-        return next_gen
 
-def nextPopulation(current_pop, Pc, Pm, factory):
+        if processed:
+            for pos in np.unique(np.concatenate(processed)).tolist():
+                population[pos].crowding_distance = float(distances[pos])
+        return [population[pos] for pos in selected]
+
+class RankedPopulation:
+    """
+    Quần thể đã phân lớp Pareto, thêm được cá thể mới mà không phải sắp xếp lại từ đầu.
+    Dùng trong 1 thế hệ của KEARL_Framework.run: dựng 1 lần từ population + offspring,
+    thêm kết quả VNS/ES bằng extend(), chọn lọc bằng select_survivors().
+
+    Lưu cho các cá thể phân biệt (theo object, lần xuất hiện đầu tiên):
+        F: ma trận mục tiêu, D: ma trận trội (D[p, q] = p trội q), ranks: rank Pareto.
+    Thêm cá thể x chỉ tính các hàng/cột mới của D; rank chỉ có thể đổi ở x và các cá thể bị x trội,
+    nên chỉ tính lại rank trên tập đó.
+    Kết quả first_front()/fronts()/select_survivors() giống hệt khi gọi NSGAII_Utils trên cả list.
+    """
+    def __init__(self, population):
+        self.individuals = []   # Vị trí -> cá thể (giữ nguyên thứ tự thêm, kể cả lặp)
+        self.uid = []           # Vị trí -> index cá thể phân biệt
+        self.first_pos = []     # Index phân biệt -> vị trí xuất hiện đầu tiên
+        self._uid_of = {}       # id(object) -> index phân biệt
+        self.F = np.empty((0, 3))
+        self.D = np.empty((0, 0), dtype=bool)
+        self.ranks = np.empty(0, dtype=np.int64)
+        self.extend(population)
+
+    def __len__(self):
+        return len(self.individuals)
+
+    def extend(self, individuals):
+        """Thêm cá thể (đã decode) vào cuối quần thể và cập nhật rank cục bộ."""
+        n_old = len(self.first_pos)
+        repeated = []
+        for ind in individuals:
+            u = self._uid_of.setdefault(id(ind), len(self.first_pos))
+            if u == len(self.first_pos):
+                self.first_pos.append(len(self.individuals))
+            elif u < n_old:
+                repeated.append(u)
+            self.individuals.append(ind)
+            self.uid.append(u)
+
+        # Cá thể cũ được thêm lại nhưng đã bị decode lại (objectives đổi) -> dựng lại toàn bộ
+        if repeated:
+            F_rep = NSGAII_Utils.objective_matrix([self.individuals[self.first_pos[u]] for u in repeated])
+            if not np.array_equal(F_rep, self.F[repeated]):
+                self._rebuild()
+                return
+        if len(self.first_pos) == n_old:
+            return
+
+        F_new = NSGAII_Utils.objective_matrix([self.individuals[pos] for pos in self.first_pos[n_old:]])
+        F = np.vstack([self.F, F_new])
+        n = len(F)
+        D = np.zeros((n, n), dtype=bool)
+        D[:n_old, :n_old] = self.D
+        D[:, n_old:] = NSGAII_Utils.dominance_matrix(F, F_new)
+        D[n_old:, :n_old] = NSGAII_Utils.dominance_matrix(F_new, F[:n_old])
+
+        ranks = np.concatenate([self.ranks, np.zeros(n - n_old, dtype=np.int64)])
+        # Quan hệ trội có tính bắc cầu -> mọi cá thể bị ảnh hưởng đều bị 1 cá thể mới trội trực tiếp
+        S = np.union1d(np.flatnonzero(D[n_old:].any(axis=0)), np.arange(n_old, n))
+        # Duyệt theo thứ tự từ điển: mọi cá thể trội q đã có rank cuối cùng khi tới lượt q
+        DT = D.T
+        for q in S[np.lexsort((F[S, 2], F[S, 1], F[S, 0]))].tolist():
+            ranks[q] = ranks[DT[q]].max(initial=-1) + 1
+        self.F, self.D, self.ranks = F, D, ranks
+
+    def _rebuild(self):
+        individuals = self.individuals
+        self.__init__(individuals)
+
+    def first_front(self):
+        """Front 0 (giống fast_non_dominated_sort(...)[0], kể cả các lần lặp)."""
+        ranks = self.ranks.tolist()
+        return [ind for ind, u in zip(self.individuals, self.uid) if ranks[u] == 0]
+
+    def fronts(self):
+        """Các front dạng vị trí trong quần thể (giống NSGAII_Utils.non_dominated_fronts), gán ind.rank."""
+        if not self.individuals:
+            return []
+        if len(self.first_pos) == len(self.individuals):
+            for ind, r in zip(self.individuals, self.ranks.tolist()):
+                ind.rank = r
+            return NSGAII_Utils.fronts_from_ranks(self.F, self.ranks, self.D)
+
+        fronts, ranks = NSGAII_Utils.fronts_with_duplicates(self.F, self.uid, np.bincount(self.uid), self.D)
+        for u, r in ranks.items():
+            self.individuals[self.first_pos[u]].rank = r
+        return [[self.first_pos[u] for u in front] for front in fronts]
+
+    def select_survivors(self, n_survivors):
+        """Giống NSGAII_Utils.select_survivors(list quần thể, n_survivors)."""
+        return NSGAII_Utils.select_from_fronts(self.individuals, self.F[self.uid], self.fronts(), n_survivors)
+
+def nextPopulation(current_pop, Pc, Pm, factory, rng=random):
     """
     Tạo thế hệ con dựa trên Pc và Pm từ RL Agent.
-    Input: Quần thể hiện tại, Xác suất lai ghép (Pc), Xác suất đột biến (Pm).
+    Input: Quần thể hiện tại, Xác suất lai ghép (Pc), Xác suất đột biến (Pm),
+           rng (random.Random hoặc module random) dùng cho chọn lọc, lai ghép và đột biến.
     Output: Quần thể con (Offspring).
     """
     offspring = []
@@ -115,8 +382,8 @@ def nextPopulation(current_pop, Pc, Pm, factory):
     pool = []
     for _ in range(pop_size):
         # Binary Tournament
-        cand1 = random.choice(current_pop)
-        cand2 = random.choice(current_pop)
+        cand1 = rng.choice(current_pop)
+        cand2 = rng.choice(current_pop)
         
         # So sánh dựa trên Rank (nếu chưa có rank thì decode & sort trước)
         if not hasattr(cand1, 'rank'): cand1.rank = 0 
@@ -127,37 +394,37 @@ def nextPopulation(current_pop, Pc, Pm, factory):
         elif cand2.rank < cand1.rank:
             pool.append(cand2)
         else: # Rank bằng nhau thì xét Crowding Distance hoặc Random
-            pool.append(random.choice([cand1, cand2]))
+            pool.append(rng.choice([cand1, cand2]))
 
     # 2. Crossover & Mutation
     for i in range(0, pop_size, 2):
         parent1 = pool[i]
         # Xử lý lẻ
         if i + 1 >= pop_size:
-            offspring.append(copy.deepcopy(parent1))
+            offspring.append(parent1.clone())
             break
         parent2 = pool[i+1]
         
         child1, child2 = None, None
         
         # --- Crossover (Dựa trên Pc) ---
-        if random.random() < Pc:
+        if rng.random() < Pc:
             # Lai ghép MS
-            c1, c2 = parent1.crossover_machine_selection(parent2)
+            c1, c2 = parent1.crossover_machine_selection(parent2, rng)
             # Lai ghép OS (tiếp tục trên kết quả MS)
-            child1, child2 = c1.crossover_operation_sequence(c2)
+            child1, child2 = c1.crossover_operation_sequence(c2, rng)
         else:
-            child1 = copy.deepcopy(parent1)
-            child2 = copy.deepcopy(parent2)
+            child1 = parent1.clone()
+            child2 = parent2.clone()
             
         # --- Mutation (Dựa trên Pm) ---
         # Mutation MS
-        child1.mutation_machine_selection(mutation_rate=Pm)
-        child2.mutation_machine_selection(mutation_rate=Pm)
+        child1.mutation_machine_selection(mutation_rate=Pm, rng=rng)
+        child2.mutation_machine_selection(mutation_rate=Pm, rng=rng)
         
         # Mutation OS
-        child1.mutation_operation_sequence(mutation_rate=Pm)
-        child2.mutation_operation_sequence(mutation_rate=Pm)
+        child1.mutation_operation_sequence(mutation_rate=Pm, rng=rng)
+        child2.mutation_operation_sequence(mutation_rate=Pm, rng=rng)
         
         offspring.extend([child1, child2])
         
@@ -0,0 +1,196 @@
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback khi không có Numba: giữ nguyên hàm Python."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+def breakdown_arrays(factory):
+    """
+    Gom breakdown_history của các máy (theo thứ tự factory.machines) thành mảng cho decode_kernel.
+
+    Returns:
+        (bd_start, bd_end, bd_count, bd_total) - mỗi hàng đã sort ổn định theo start
+        (giống thứ tự chèn bisect_right của MachineTimeline).
+        Kết quả được cache trên factory theo factory.breakdown_version.
+    """
+    cached = getattr(factory, 'breakdown_arrays', None)
+    if cached is not None and cached[0] == factory.breakdown_version:
+        return cached[1]
+
+    histories = [getattr(m, 'breakdown_history', None) or [] for m in factory.machines]
+    M = len(histories)
+    B = max((len(h) for h in histories), default=0)
+    bd_start = np.zeros((M, B))
+    bd_end = np.zeros((M, B))
+    bd_count = np.zeros(M, dtype=np.int64)
+    bd_total = np.zeros(M)
+    for c, history in enumerate(histories):
+        blocks = sorted(history, key=lambda bd: bd['start'])
+        bd_start[c, :len(blocks)] = [bd['start'] for bd in blocks]
+        bd_end[c, :len(blocks)] = [bd['end'] for bd in blocks]
+        bd_count[c] = len(blocks)
+        # Cộng theo thứ tự lịch sử hỏng (giống Individual.decode)
+        bd_total[c] = sum(bd['end'] - bd['start'] for bd in history)
+
+    arrays = (bd_start, bd_end, bd_count, bd_total)
+    factory.breakdown_arrays = (factory.breakdown_version, arrays)
+    return arrays
+
+@njit(cache=True)
+def decode_kernel(os_vec, ms_vec, job_first_op, machine_of, col_of, PT, ST, AP, AS, TT, AI,
+                  UT_k, AC, bd_start, bd_end, bd_count, bd_total, timeline_size,
+                  prefix_start, prefix_end):
+    """
+    Kernel Insertion-based Decoding (cùng logic & thứ tự phép tính với Individual.decode()).
+
+    Args:
+        os_vec, ms_vec: Genome (int64).
+        machine_of, col_of, PT, ST, AP, AS: Mảng (global op, machine slot) của CompiledInstance.
+            col_of: cột của máy theo thứ tự factory.machines.
+        bd_start, bd_end (M x B): Breakdown mỗi máy, đã sort theo start (ổn định), bd_count (M,).
+        bd_total (M,): Tổng thời gian hỏng mỗi máy (cộng theo thứ tự lịch sử).
+        timeline_size: Số khối tối đa trên 1 máy.
+        prefix_start, prefix_end: Lịch (start, end) đã biết của các vị trí OS đầu tiên
+            (decode tăng dần từ cá thể gốc, xem Individual.decode); mảng rỗng = decode đầy đủ.
+
+    Returns:
+        (makespan, total_energy, wcm, op_start, op_end, op_gene) - 3 mảng cuối theo thứ tự vị trí OS.
+    """
+    n = os_vec.shape[0]
+    M = AI.shape[0]
+
+    tl_start = np.empty((M, timeline_size))
+    tl_end = np.empty((M, timeline_size))
+    tl_count = np.zeros(M, dtype=np.int64)
+    mach_end = np.zeros(M)
+    busy = np.zeros(M)
+
+    # --- A. Breakdown chèn trước vào timeline ---
+    for c in range(M):
+        for b in range(bd_count[c]):
+            tl_start[c, b] = bd_start[c, b]
+            tl_end[c, b] = bd_end[c, b]
+            if bd_end[c, b] > mach_end[c]:
+                mach_end[c] = bd_end[c, b]
+        tl_count[c] = bd_count[c]
+
+    num_jobs = job_first_op.shape[0]
+    job_end = np.zeros(num_jobs)
+    job_prev = np.full(num_jobs, -1, dtype=np.int64)
+    job_counter = np.zeros(num_jobs, dtype=np.int64)
+
+    op_start = np.empty(n)
+    op_end = np.empty(n)
+    op_gene = np.empty(n, dtype=np.int64)
+
+    E_processing = 0.0
+    E_setup = 0.0
+    E_transport = 0.0
+
+    # --- B. Vòng lặp giải mã (Duyệt vector OS) ---
+    for pos in range(n):
+        job = os_vec[pos]
+        g = job_first_op[job] + job_counter[job]
+        job_counter[job] += 1
+        s = ms_vec[g]
+        m_id = machine_of[g, s]
+        c = col_of[g, s]
+
+        transport_time = 0.0
+        prev_m = job_prev[job]
+        if prev_m >= 0 and prev_m != m_id:
+            transport_time = TT[prev_m, m_id]
+            E_transport += transport_time * UT_k
+        arrival_time = job_end[job] + transport_time
+
+        duration = PT[g, s] + ST[g, s]
+        E_processing += AP[g, s] * PT[g, s]
+        E_setup += AS[g, s] * ST[g, s]
+
+        cnt = tl_count[c]
+        if pos < prefix_start.shape[0]:
+            # Vị trí thuộc prefix không đổi -> lấy lại lịch của cá thể gốc
+            start_time = prefix_start[pos]
+            end_time = prefix_end[pos]
+        else:
+            # Tìm khe hở trên timeline đã sort
+            start_time = -1.0
+            found_gap = False
+            prev_block_end = 0.0
+            for k in range(cnt):
+                block_start = tl_start[c, k]
+                if block_start - prev_block_end >= duration:
+                    potential_start = max(prev_block_end, arrival_time)
+                    if potential_start + duration <= block_start:
+                        start_time = potential_start
+                        found_gap = True
+                        break
+                prev_block_end = tl_end[c, k]
+            if not found_gap:
+                start_time = max(mach_end[c], arrival_time)
+            end_time = start_time + duration
+
+        # Chèn (sau các khối cùng start)
+        ins = cnt
+        while ins > 0 and tl_start[c, ins - 1] > start_time:
+            tl_start[c, ins] = tl_start[c, ins - 1]
+            tl_end[c, ins] = tl_end[c, ins - 1]
+            ins -= 1
+        tl_start[c, ins] = start_time
+        tl_end[c, ins] = end_time
+        tl_count[c] = cnt + 1
+
+        if end_time > mach_end[c]:
+            mach_end[c] = end_time
+        busy[c] += end_time - start_time
+        job_end[job] = end_time
+        job_prev[job] = m_id
+
+        op_start[pos] = start_time
+        op_end[pos] = end_time
+        op_gene[pos] = g
+
+    # --- C. Tính toán Fitness ---
+    makespan = 0.0
+    wcm = 0.0
+    E_idle = 0.0
+    for c in range(M):
+        if c == 0 or mach_end[c] > makespan:
+            makespan = mach_end[c]
+        if busy[c] > wcm:
+            wcm = busy[c]
+        idle_duration = max(0.0, mach_end[c] - busy[c] - bd_total[c])
+        E_idle += idle_duration * AI[c]
+
+    E_common = makespan * AC
+    total_energy = E_processing + E_setup + E_transport + E_idle + E_common
+    return makespan, total_energy, wcm, op_start, op_end, op_gene
+
+@njit(cache=True)
+def reassign_makespans_kernel(os_vec, ms_vec, gene, job_first_op, machine_of, col_of, PT, ST, AP, AS, TT, AI,
+                              UT_k, AC, bd_start, bd_end, bd_count, bd_total, timeline_size,
+                              num_slots, prefix_start, prefix_end):
+    """
+    Makespan của genome khi đổi máy của operation `gene` sang từng slot 0..num_slots-1
+    (OS giữ nguyên, các vị trí OS trước vị trí của gene lấy lại từ prefix_start/prefix_end).
+    Slot hiện tại (ms_vec[gene]) trả về NaN.
+    """
+    makespans = np.empty(num_slots)
+    trial = ms_vec.copy()
+    for s in range(num_slots):
+        if s == ms_vec[gene]:
+            makespans[s] = np.nan
+            continue
+        trial[gene] = s
+        makespans[s] = decode_kernel(os_vec, trial, job_first_op, machine_of, col_of, PT, ST, AP, AS, TT, AI,
+                                     UT_k, AC, bd_start, bd_end, bd_count, bd_total, timeline_size,
+                                     prefix_start, prefix_end)[0]
+    return makespans
@@ -0,0 +1,210 @@
+import numpy as np
+
+# Loại cạnh ràng buộc thời điểm bắt đầu của 1 operation (OperationRecords.edge)
+EDGE_NONE = 0       # Bắt đầu tại 0 / không bị ràng buộc bởi khối nào
+EDGE_MACHINE = 1    # Bắt đầu ngay khi operation trước trên cùng máy kết thúc
+EDGE_JOB = 2        # Bắt đầu ngay khi operation trước của job tới nơi (kết thúc + vận chuyển)
+EDGE_BREAKDOWN = 3  # Bắt đầu ngay khi máy sửa xong
+
+# Dung sai so sánh số thực khi xác định cạnh ràng buộc (giống Algorithm 1 trước đây)
+EPS = 1e-4
+
+class OperationRecords:
+    """
+    Bản ghi theo operation của 1 lịch đã decode (index theo global op index g, giống vector MS):
+        start[g], end[g]: thời điểm bắt đầu/kết thúc.
+        machine[g]:       machine_id được gán.
+        mach_pred[g]:     operation ngay trước g trên cùng máy THEO THỜI GIAN (-1 nếu g là khối đầu tiên
+                          của máy hoặc khối ngay trước là khoảng hỏng máy).
+        job_pred[g]:      operation trước của cùng job (-1 nếu g là op đầu tiên).
+        mach_ready[g]:    thời điểm khối ngay trước g trên máy kết thúc (0 nếu không có).
+        job_ready[g]:     thời điểm job tới máy của g: kết thúc op trước + vận chuyển (0 nếu là op đầu tiên).
+        edge[g]:          cạnh ràng buộc thời điểm bắt đầu (EDGE_*). Khi cả máy và job cùng khít,
+                          ưu tiên máy để đường găng tạo thành block dài.
+
+    Dựng 1 lần từ detailed_schedule (Individual.operation_records() cache trên DetailedSchedule),
+    sau đó đường găng / block / operation cuối được trích trong O(độ dài đường găng).
+    """
+    __slots__ = ('start', 'end', 'machine', 'mach_pred', 'job_pred', 'mach_ready', 'job_ready', 'edge',
+                 '_compiled', '_tails')
+
+    def __init__(self, compiled, schedule):
+        ci = self._compiled = compiled
+        self._tails = None
+        n = ci.total_ops
+        job_first_op = ci.job_first_op_list
+        # Mọi khối của lịch: (start, end, cột máy, global op index | -1 nếu là khoảng hỏng)
+        blocks = np.array([(t['start'], t['end'], c, -1 if t['op'] is None else job_first_op[t['op'].job_id] + t['op'].op_id)
+                           for c, tasks in enumerate(schedule.values()) for t in tasks], dtype=float).reshape(-1, 4)
+        # Thứ tự thời gian trên từng máy (lexsort ổn định: cùng start thì khối chèn trước đứng trước,
+        # giống MachineTimeline.insert)
+        blocks = blocks[np.lexsort((blocks[:, 0], blocks[:, 2]))]
+        b_start, b_end = blocks[:, 0], blocks[:, 1]
+        b_col = blocks[:, 2].astype(np.int64)
+        b_gene = blocks[:, 3].astype(np.int64)
+        # Khối ngay trước trên cùng máy
+        has_prev = np.zeros(len(blocks), dtype=bool)
+        has_prev[1:] = b_col[1:] == b_col[:-1]
+        prev_end = np.zeros(len(blocks))
+        prev_end[1:] = b_end[:-1]
+        prev_gene = np.full(len(blocks), -1, dtype=np.int64)
+        prev_gene[1:] = b_gene[:-1]
+
+        is_op = b_gene >= 0
+        g = b_gene[is_op]
+        machine_ids = np.array(list(schedule.keys()), dtype=np.int64)
+        self.start = np.zeros(n)
+        self.end = np.zeros(n)
+        self.machine = np.full(n, -1, dtype=np.int64)
+        self.mach_pred = np.full(n, -1, dtype=np.int64)
+        self.mach_ready = mach_ready = np.zeros(n)
+        after_breakdown = np.zeros(n, dtype=bool)
+        has_block_before = np.zeros(n, dtype=bool)
+        self.start[g] = b_start[is_op]
+        self.end[g] = b_end[is_op]
+        self.machine[g] = machine_ids[b_col[is_op]]
+        self.mach_pred[g] = np.where(has_prev, prev_gene, -1)[is_op]
+        mach_ready[g] = np.where(has_prev, prev_end, 0.0)[is_op]
+        has_block_before[g] = has_prev[is_op]
+        after_breakdown[g] = (has_prev & (prev_gene < 0))[is_op]
+
+        self.job_pred = np.arange(n, dtype=np.int64) - 1
+        self.job_pred[ci.job_first_op[ci.job_num_ops > 0]] = -1
+        # Thời điểm job tới máy: kết thúc op trước của job + vận chuyển (nếu khác máy)
+        has_job_pred = self.job_pred >= 0
+        pred = np.where(has_job_pred, self.job_pred, 0)
+        pred_machine = self.machine[pred]
+        transport = np.where(pred_machine != self.machine, ci.TT[pred_machine, self.machine], 0.0)
+        self.job_ready = job_ready = np.where(has_job_pred, self.end[pred] + transport, 0.0)
+
+        machine_tight = has_block_before & (np.abs(self.start - mach_ready) < EPS)
+        job_tight = has_job_pred & (np.abs(self.start - job_ready) < EPS)
+        self.edge = np.select([machine_tight & after_breakdown, machine_tight, job_tight],
+                              [EDGE_BREAKDOWN, EDGE_MACHINE, EDGE_JOB], EDGE_NONE).astype(np.int8)
+
+    def last_operation(self):
+        """Operation kết thúc muộn nhất (quyết định makespan); -1 nếu lịch rỗng."""
+        if not len(self.end):
+            return -1
+        return int(np.argmax(self.end))
+
+    def critical_path(self):
+        """
+        Đường găng (Algorithm 1): từ operation cuối, lần ngược theo cạnh ràng buộc tới khi gặp
+        EDGE_NONE (bắt đầu tại 0) hoặc EDGE_BREAKDOWN. Trả về list global op index [đầu -> cuối].
+        """
+        g = self.last_operation()
+        if g < 0:
+            return []
+        edge = self.edge.tolist()
+        mach_pred = self.mach_pred.tolist()
+        job_pred = self.job_pred.tolist()
+        path = [g]
+        while True:
+            if edge[g] == EDGE_MACHINE:
+                g = mach_pred[g]
+            elif edge[g] == EDGE_JOB:
+                g = job_pred[g]
+            else:
+                break
+            path.append(g)
+        return path[::-1]
+
+    def critical_blocks(self, path=None):
+        """Gom các operation liên tiếp trên cùng 1 máy của đường găng thành block (>= 2 ops)."""
+        if path is None:
+            path = self.critical_path()
+        machine = self.machine
+        blocks = []
+        current_block = path[:1]
+        for prev, curr in zip(path, path[1:]):
+            if machine[prev] == machine[curr]:
+                current_block.append(curr)
+            else:
+                if len(current_block) > 1:
+                    blocks.append(current_block)
+                current_block = [curr]
+        if len(current_block) > 1:
+            blocks.append(current_block)
+        return blocks
+
+    # ========================================================
+    #       ƯỚC LƯỢNG NHANH NƯỚC ĐI TRONG BLOCK (head/tail)
+    # ========================================================
+    def tails(self):
+        """
+        Tail q[g]: độ dài đường dài nhất từ lúc g kết thúc tới cuối lịch, qua các cạnh máy
+        (operation kế tiếp theo thời gian) và cạnh job (op kế tiếp + vận chuyển), bỏ qua thời gian chờ.
+        Tính 1 lần, dùng cho estimate_swap(). Trả về (tail, duration, job_tail, mach_succ) dạng list:
+            job_tail[g]: phần tail đi qua cạnh job (0 nếu g là op cuối của job).
+            mach_succ[g]: operation kế tiếp trên máy (-1 nếu không có).
+        """
+        if self._tails is None:
+            ci = self._compiled
+            n = len(self.start)
+            duration = (self.end - self.start).tolist()
+            mach_succ = np.full(n, -1, dtype=np.int64)
+            has_pred = self.mach_pred >= 0
+            mach_succ[self.mach_pred[has_pred]] = np.flatnonzero(has_pred)
+            mach_succ = mach_succ.tolist()
+            # Cạnh job g -> g + 1: thời gian vận chuyển nếu khác máy
+            job_succ = np.flatnonzero(self.job_pred >= 0)
+            src, dst = self.machine[job_succ - 1], self.machine[job_succ]
+            job_transport = np.full(n, -1.0)
+            job_transport[job_succ - 1] = np.where(src != dst, ci.TT[src, dst], 0.0)
+            job_transport = job_transport.tolist()
+
+            tail = [0.0] * n
+            job_tail = [0.0] * n
+            # Duyệt ngược theo thời gian (operation kế tiếp luôn kết thúc muộn hơn)
+            for g in np.lexsort((-self.start, -self.end)).tolist():
+                q = 0.0
+                if job_transport[g] >= 0:
+                    q = job_tail[g] = job_transport[g] + duration[g + 1] + tail[g + 1]
+                m = mach_succ[g]
+                if m >= 0 and duration[m] + tail[m] > q:
+                    q = duration[m] + tail[m]
+                tail[g] = q
+            self._tails = (tail, duration, job_tail, mach_succ)
+        return self._tails
+
+    def estimate_swaps(self, block):
+        """
+        Ước lượng makespan (kiểu head/tail trên đồ thị disjunctive) sau khi đổi chỗ block[i] và block[j]
+        trong thứ tự trên máy của 1 critical block, cho mọi cặp i < j:
+        head tính lại tiến từ i tới j (max(job_ready, op trước trên máy kết thúc)),
+        tail tính lại lùi từ j về i; ước lượng = max(head + duration + tail) trên đoạn [i, j].
+        Không decode; các op ngoài đoạn giữ head/tail cũ. Trả về list (ước lượng, i, j).
+        """
+        tail, duration, job_tail, mach_succ = self.tails()
+        L = len(block)
+        dur = [duration[g] for g in block]
+        ready = self.job_ready[block].tolist()
+        jtail = [job_tail[g] for g in block]
+        # Kết thúc của op trước block[i] trên máy / tail sau block[j] qua op kế tiếp trên máy (không đổi)
+        end_before = [float(self.mach_ready[block[0]])] + [float(e) for e in self.end[block[:-1]].tolist()]
+        tail_after = []
+        for g in block:
+            nxt = mach_succ[g]
+            tail_after.append(duration[nxt] + tail[nxt] if nxt >= 0 else 0.0)
+
+        estimates = []
+        for i in range(L - 1):
+            for j in range(i + 1, L):
+                seq = list(range(i, j + 1))
+                seq[0], seq[-1] = j, i
+                end = end_before[i]
+                heads = []
+                for k in seq:
+                    head = ready[k] if ready[k] > end else end
+                    heads.append(head)
+                    end = head + dur[k]
+                after = tail_after[j]
+                estimate = 0.0
+                for k, head in zip(reversed(seq), reversed(heads)):
+                    q = jtail[k] if jtail[k] > after else after
+                    if head + dur[k] + q > estimate:
+                        estimate = head + dur[k] + q
+                    after = dur[k] + q
+                estimates.append((estimate, i, j))
+        return estimates
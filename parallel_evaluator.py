@@ -0,0 +1,258 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from individual import Individual
+from batch_decoder import decode_batch
+from variable_neighborhood_search import VariableNeighborhoodSearch
+
+# Số cá thể tối thiểu mỗi worker (batch nhỏ hơn thì decode tại chỗ, tránh chi phí IPC)
+MIN_CHUNK = 4
+
+# ========================================================
+#               PHÍA WORKER (mỗi process 1 bản instance)
+# ========================================================
+_worker = {}
+
+def _init_worker(factory, jobs):
+    """Nhận instance một lần duy nhất khi khởi động worker."""
+    _worker['factory'] = factory
+    factory.fitness_cache = None # Cache do process chính quản lý
+    _worker['jobs'] = jobs
+    _worker['bd_state'] = None
+
+def _sync_breakdowns(bd_state):
+    """Đồng bộ breakdown_history của worker với process chính (chỉ khi có thay đổi)."""
+    if bd_state == _worker['bd_state']:
+        return
+    for m, history in zip(_worker['factory'].machines, bd_state):
+        m.breakdown_history = [{'start': start, 'end': end} for start, end in history]
+    _worker['bd_state'] = bd_state
+
+def _evaluate_chunk(bd_state, genomes, mode, full):
+    """
+    Decode 1 nhóm genome (ms, os).
+    full=False: decode_batch(mode), trả về [(MCT, TEC, WCM)].
+    full=True: decode() đầy đủ, trả về thêm detailed_schedule dạng gọn (xem _pack_schedule).
+    """
+    _sync_breakdowns(bd_state)
+    factory, jobs = _worker['factory'], _worker['jobs']
+    population = []
+    for ms, os_vec in genomes:
+        ind = Individual(jobs, factory)
+        ind.ms = ms
+        ind.os = os_vec
+        population.append(ind)
+
+    if not full:
+        decode_batch(population, mode=mode)
+        return [(ind.makespan, ind.total_energy, ind.wcm) for ind in population]
+
+    results = []
+    for ind in population:
+        ind.decode()
+        results.append((ind.makespan, ind.total_energy, ind.wcm, _pack_schedule(ind)))
+    return results
+
+def _local_search(ind, seed, tabu_size, max_iter, block_scan=False, block_top_k=3):
+    """
+    1 lượt VNS độc lập trên bản sao ind: tabu list riêng (rỗng) và random.Random(seed) riêng
+    -> kết quả chỉ phụ thuộc (genome, seed), không phụ thuộc thứ tự/nơi chạy.
+    Trả về (cá thể cải thiện makespan hoặc None, số láng giềng đã đánh giá).
+    """
+    vns = VariableNeighborhoodSearch(ind.factory, tabu_size=tabu_size, max_iter=max_iter, rng=random.Random(seed),
+                                     block_scan=block_scan, block_top_k=block_top_k)
+    best = vns.run_vns(ind)
+    return (best if best.makespan < ind.makespan else None), vns.evaluations
+
+def _vns_task(bd_state, ms, os_vec, seed, tabu_size, max_iter, block_scan, block_top_k):
+    """Chạy 1 lượt VNS trong worker; trả về (genome + objectives + lịch dạng gọn | None, evaluations, decodes)."""
+    _sync_breakdowns(bd_state)
+    decodes = Individual.decode_count
+    ind = Individual(_worker['jobs'], _worker['factory'])
+    ind.ms = ms
+    ind.os = os_vec
+    best, evaluations = _local_search(ind, seed, tabu_size, max_iter, block_scan, block_top_k)
+    result = None
+    if best is not None:
+        result = (best.ms, best.os, best.makespan, best.total_energy, best.wcm, _pack_schedule(best))
+    return result, evaluations, Individual.decode_count - decodes
+
+def _pack_schedule(ind):
+    """detailed_schedule -> {machine_id: [(start, end, global op index | -1 nếu breakdown)]}"""
+    ci = ind.compiled
+    return {m_id: [(t['start'], t['end'], -1 if t['op'] is None else ci.op_index(t['op'])) for t in tasks]
+            for m_id, tasks in ind.detailed_schedule.items()}
+
+def _unpack_schedule(ind, packed):
+    """Dựng lại detailed_schedule (cùng định dạng với Individual.decode) từ dạng gọn."""
+    all_operations = ind.compiled.all_operations
+    schedule = {}
+    for m_id, tasks in packed.items():
+        timeline = []
+        for start, end, g in tasks:
+            if g < 0:
+                timeline.append({'start': start, 'end': end, 'op': None, 'type': 'breakdown'})
+            else:
+                timeline.append({'start': start, 'end': end, 'op': all_operations[g],
+                                 'machine': m_id, 'type': 'operation'})
+        schedule[m_id] = timeline
+    return schedule
+
+# ========================================================
+#               PHÍA PROCESS CHÍNH
+# ========================================================
+class ParallelEvaluator:
+    """
+    Đánh giá (decode) nhiều cá thể trên Process Pool.
+
+    - Worker nhận instance (factory, jobs) một lần lúc khởi động; mỗi lượt chỉ gửi
+      genome (ms, os) và trạng thái breakdown hiện tại.
+    - Kết quả được ghi lại theo đúng thứ tự đầu vào, và decode là tất định
+      -> kết quả không phụ thuộc số worker.
+    - workers <= 1 (hoặc batch nhỏ): decode ngay trong process chính.
+    """
+    def __init__(self, factory, jobs, workers=1, decode_mode='insertion'):
+        self.factory = factory
+        self.jobs = jobs
+        self.workers = max(1, int(workers))
+        self.decode_mode = decode_mode
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_worker,
+                                             initargs=(self.factory, self.jobs))
+        return self._pool
+
+    def _num_chunks(self, n):
+        if self.workers <= 1:
+            return 1
+        return min(self.workers, n // MIN_CHUNK)
+
+    def _map(self, individuals, mode, full):
+        """Chia individuals thành các nhóm liên tiếp, decode song song, trả kết quả theo thứ tự."""
+        chunk_size = math.ceil(len(individuals) / self._num_chunks(len(individuals)))
+        bd_state = self._breakdown_state()
+        futures = []
+        for i in range(0, len(individuals), chunk_size):
+            genomes = [(ind.ms, ind.os) for ind in individuals[i:i + chunk_size]]
+            futures.append(self._get_pool().submit(_evaluate_chunk, bd_state, genomes, mode, full))
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _breakdown_state(self):
+        """Trạng thái breakdown gửi kèm mỗi lượt cho worker (tuple có thể so sánh để bỏ qua đồng bộ)."""
+        return tuple(tuple((bd['start'], bd['end']) for bd in getattr(m, 'breakdown_history', None) or [])
+                     for m in self.factory.machines)
+
+    def _lookup(self, individuals, mode, need_schedule):
+        """Tách các cá thể có sẵn trong factory.fitness_cache; trả về (cache, keys, các cá thể cần decode)."""
+        cache = getattr(self.factory, 'fitness_cache', None)
+        if cache is None:
+            return None, None, individuals
+        keys, pending = [], []
+        for ind in individuals:
+            key = cache.key(ind, mode)
+            entry = cache.get(key, need_schedule=need_schedule)
+            if entry is None:
+                keys.append(key)
+                pending.append(ind)
+            else:
+                ind.makespan, ind.total_energy, ind.wcm = entry[:3]
+                ind.detailed_schedule = entry[3] if need_schedule else {}
+        return cache, keys, pending
+
+    def evaluate(self, population):
+        """
+        Decode cả quần thể theo decode_mode (chỉ MCT, TEC, WCM; detailed_schedule = {}),
+        tương đương decode_batch(population, mode=decode_mode).
+        """
+        cache, keys, pending = self._lookup(population, self.decode_mode, False)
+        Individual.decode_count += len(pending)
+        if self._num_chunks(len(pending)) <= 1:
+            decode_batch(pending, mode=self.decode_mode)
+        else:
+            for ind, (makespan, total_energy, wcm) in zip(pending, self._map(pending, self.decode_mode, False)):
+                ind.makespan = makespan
+                ind.total_energy = total_energy
+                ind.wcm = wcm
+                ind.detailed_schedule = {}
+
+        if cache is not None:
+            for key, ind in zip(keys, pending):
+                cache.put(key, ind.makespan, ind.total_energy, ind.wcm)
+        return population
+
+    def evaluate_full(self, individuals, bases=None, first_pos=None):
+        """
+        Decode đầy đủ (Insertion-based, kèm detailed_schedule) - tương đương gọi ind.decode()
+        cho từng cá thể. Dùng cho các ứng viên của VNS/ES.
+
+        Args:
+            bases (list): Cá thể gốc của từng ứng viên (decode tăng dần khi decode tại chỗ).
+            first_pos (int): Vị trí OS đầu tiên bị đổi (chung cho mọi ứng viên, None = tự xác định).
+        """
+        base_of = {id(ind): base for ind, base in zip(individuals, bases)} if bases else {}
+        cache, keys, pending = self._lookup(individuals, 'insertion', True)
+        if self._num_chunks(len(pending)) <= 1:
+            for ind in pending:
+                ind.decode_uncached(base=base_of.get(id(ind)), first_pos=first_pos)
+        else:
+            Individual.decode_count += len(pending)
+            for ind, (makespan, total_energy, wcm, packed) in zip(pending, self._map(pending, None, True)):
+                ind.makespan = makespan
+                ind.total_energy = total_energy
+                ind.wcm = wcm
+                ind.detailed_schedule = _unpack_schedule(ind, packed)
+
+        if cache is not None:
+            for key, ind in zip(keys, pending):
+                cache.put(key, ind.makespan, ind.total_energy, ind.wcm, ind.detailed_schedule)
+        return individuals
+
+    def run_vns(self, individuals, seeds, tabu_size=10, max_iter=30, block_scan=False, block_top_k=3):
+        """
+        Chạy VNS độc lập cho từng cá thể (mỗi lượt 1 tabu list và 1 random.Random(seed) riêng),
+        mỗi lượt 1 task trên Process Pool. Kết quả giống nhau với mọi số worker.
+
+        Returns:
+            (list cá thể cải thiện makespan hoặc None theo thứ tự đầu vào, tổng số láng giềng đã đánh giá)
+        """
+        if self.workers <= 1 or len(individuals) <= 1:
+            # Tại chỗ, tuần tự
+            results, evaluations = [], 0
+            for ind, seed in zip(individuals, seeds):
+                best, n = _local_search(ind.clone(), seed, tabu_size, max_iter, block_scan, block_top_k)
+                results.append(best)
+                evaluations += n
+            return results, evaluations
+
+        bd_state = self._breakdown_state()
+        futures = [self._get_pool().submit(_vns_task, bd_state, ind.ms, ind.os, seed, tabu_size, max_iter,
+                                            block_scan, block_top_k)
+                   for ind, seed in zip(individuals, seeds)]
+        results, evaluations = [], 0
+        for future in futures:
+            packed, n, decodes = future.result()
+            evaluations += n
+            Individual.decode_count += decodes
+            if packed is None:
+                results.append(None)
+                continue
+            ms, os_vec, makespan, total_energy, wcm, schedule = packed
+            best = Individual(self.jobs, self.factory)
+            best.ms, best.os = ms, os_vec
+            best.makespan, best.total_energy, best.wcm = makespan, total_energy, wcm
+            best.detailed_schedule = _unpack_schedule(best, schedule)
+            results.append(best)
+        return results, evaluations
+
+    def close(self):
+        """Tắt Process Pool (nếu đã khởi tạo)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,162 @@
+import math
+import numpy as np
+
+from individual import Individual
+
+class ArchivedSolution:
+    """
+    Lời giải lưu trong ParetoArchive: chỉ gồm genome (MS, OS) và objectives (MCT, TEC, WCM).
+    Dựng lại Individual đầy đủ (có detailed_schedule) bằng to_individual().
+    """
+    __slots__ = ('ms', 'os', 'makespan', 'total_energy', 'wcm')
+
+    def __init__(self, ms, os, makespan, total_energy, wcm):
+        self.ms = ms
+        self.os = os
+        self.makespan = makespan
+        self.total_energy = total_energy
+        self.wcm = wcm
+
+    @classmethod
+    def from_individual(cls, ind):
+        return cls(tuple(ind.ms), tuple(ind.os), ind.makespan, ind.total_energy, ind.wcm)
+
+    @property
+    def objectives(self):
+        return (self.makespan, self.total_energy, self.wcm)
+
+    def to_individual(self, jobs, factory, decode=True):
+        """Tạo Individual từ genome (decode theo trạng thái breakdown hiện tại của factory)."""
+        ind = Individual(jobs, factory)
+        ind.ms = list(self.ms)
+        ind.os = list(self.os)
+        if decode:
+            ind.decode()
+        return ind
+
+    def __repr__(self):
+        return f"ArchivedSolution(MCT={self.makespan:.2f}, TEC={self.total_energy:.2f}, WCM={self.wcm:.2f})"
+
+class ParetoArchive:
+    """
+    Archive ngoài (external archive) các lời giải không trội (MCT, TEC, WCM) qua mọi thế hệ,
+    dùng epsilon-box dominance (Laumanns et al., 2002) để giới hạn kích thước.
+
+    - Box của lời giải f: b_m = floor(log(f_m) / log(1 + epsilon)) (epsilon tương đối, không phụ thuộc
+      đơn vị của từng mục tiêu).
+    - Mỗi box giữ tối đa 1 lời giải; lời giải mới bị loại nếu box của nó bị box khác trội,
+      và xoá mọi lời giải có box bị box mới trội.
+    - Cùng box: giữ lời giải trội, nếu không trội nhau thì giữ lời giải gần góc dưới của box hơn.
+    - Nếu vượt max_size: tăng epsilon (x1.5) và dựng lại archive.
+
+    Chi phí mỗi lần thêm: O(kích thước archive), tính vector trên mảng box/objectives.
+    """
+    def __init__(self, max_size=200, epsilon=0.01):
+        self.max_size = max_size
+        self.epsilon = epsilon
+        self.solutions = []
+        self._boxes = np.empty((0, 3), dtype=np.int64)
+        self._objs = np.empty((0, 3))
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def _box(self, objs):
+        log_step = math.log1p(self.epsilon)
+        return np.floor(np.log(np.maximum(objs, 1e-12)) / log_step).astype(np.int64)
+
+    def _corner_distance(self, obj, box):
+        corner = np.exp(box * math.log1p(self.epsilon))
+        return float(np.sum((obj - corner) ** 2))
+
+    def update(self, individuals):
+        """Thêm các cá thể (đã decode). Trả về số lời giải được nhận vào archive."""
+        accepted = 0
+        for ind in individuals:
+            accepted += self.add(ArchivedSolution.from_individual(ind))
+        return accepted
+
+    def add(self, solution):
+        """Thêm 1 ArchivedSolution theo luật epsilon-box dominance. Trả về True nếu được nhận."""
+        obj = np.array(solution.objectives, dtype=float)
+        box = self._box(obj)
+
+        boxes = self._boxes
+        le = (boxes <= box).all(axis=1)
+        same = le & (boxes == box).all(axis=1)
+        # Box mới bị một box khác trội -> loại
+        if (le & ~same).any():
+            return False
+
+        if same.any():
+            i = int(np.flatnonzero(same)[0])
+            old = self._objs[i]
+            new_dominates = (obj <= old).all() and (obj < old).any()
+            old_dominates = (old <= obj).all() and (old < obj).any()
+            if old_dominates:
+                return False
+            if not new_dominates and self._corner_distance(obj, box) >= self._corner_distance(old, box):
+                return False
+            self.solutions[i] = solution
+            self._objs[i] = obj
+            return True
+
+        # Xoá các lời giải có box bị box mới trội
+        keep = ~(box <= boxes).all(axis=1)
+        if not keep.all():
+            self.solutions = [s for s, k in zip(self.solutions, keep.tolist()) if k]
+            self._boxes = self._boxes[keep]
+            self._objs = self._objs[keep]
+        self.solutions.append(solution)
+        self._boxes = np.vstack([self._boxes, box])
+        self._objs = np.vstack([self._objs, obj])
+
+        if len(self.solutions) > self.max_size:
+            self._coarsen()
+        return True
+
+    def _coarsen(self):
+        """Tăng epsilon tới khi archive không vượt max_size."""
+        while len(self.solutions) > self.max_size:
+            solutions = self.solutions
+            self.epsilon *= 1.5
+            self.clear()
+            for solution in solutions:
+                self.add(solution)
+
+    def clear(self):
+        self.solutions = []
+        self._boxes = np.empty((0, 3), dtype=np.int64)
+        self._objs = np.empty((0, 3))
+
+    def reevaluate(self, evaluator, jobs, factory):
+        """
+        Decode lại các lời giải theo trạng thái breakdown hiện tại rồi dựng lại archive
+        (objectives cũ không còn đúng sau khi có breakdown mới).
+        """
+        individuals = [s.to_individual(jobs, factory, decode=False) for s in self.solutions]
+        evaluator.evaluate(individuals)
+        self.clear()
+        self.update(individuals)
+
+    def state(self):
+        """Trạng thái dạng mảng (cho checkpoint): genome, objectives, box và epsilon hiện tại."""
+        ms = np.array([s.ms for s in self.solutions], dtype=np.int32)
+        os_ = np.array([s.os for s in self.solutions], dtype=np.int32)
+        return {'ms': ms, 'os': os_, 'objectives': self._objs.copy(), 'boxes': self._boxes.copy(),
+                'epsilon': self.epsilon}
+
+    def load_state(self, state):
+        self.epsilon = state['epsilon']
+        self._objs = np.array(state['objectives'], dtype=float).reshape(-1, 3)
+        self._boxes = np.array(state['boxes'], dtype=np.int64).reshape(-1, 3)
+        self.solutions = [ArchivedSolution(tuple(ms), tuple(os_), *obj)
+                          for ms, os_, obj in zip(state['ms'].tolist(), state['os'].tolist(), self._objs.tolist())]
+
+    def objective_matrix(self):
+        """Ma trận objectives (K, 3) của các lời giải trong archive."""
+        return self._objs.copy()
+
+    def front(self):
+        """Các lời giải trong archive, sắp theo (MCT, TEC, WCM)."""
+        return sorted(self.solutions, key=lambda s: s.objectives)
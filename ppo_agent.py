@@ -4,6 +4,7 @@ import torch.optim as optim
 from torch.distributions import Categorical
 import numpy as np
 import random
+from checkpoint import random_state_to_array, random_state_from_array
 
 # --- Mạng Neural Actor-Critic ---
 class ActorCriticNet(nn.Module):
@@ -33,8 +34,16 @@ class ActorCriticNet(nn.Module):
 
 # --- Lớp PPO Agent chính ---
 class PPOAgent:
-    def __init__(self, max_generations=200):
+    def __init__(self, max_generations=200, seed=None):
+        """
+        seed (int): Seed cho trọng số mạng + lấy mẫu hành động (torch.manual_seed) và nhiễu Pc/Pm
+        (random.Random riêng). Ví dụ: PPOAgent(seed=RandomStreams(seed).seed_for('ppo')).
+        None = không seed.
+        """
         self.max_generations = max_generations
+        if seed is not None:
+            torch.manual_seed(seed)
+        self.rng = random.Random(seed) if seed is not None else random
         
         # Không gian hành động giống file gốc của bạn
         self.pc_actions = [0.4 + i * 0.05 for i in range(10)]
@@ -100,8 +109,8 @@ class PPOAgent:
         }
         
         # Trả về giá trị thực tế để EA sử dụng
-        val_pc = min(1.0, self.pc_actions[idx_pc.item()] + random.uniform(0, 0.05))
-        val_pm = min(1.0, self.pm_actions[idx_pm.item()] + random.uniform(0, 0.02))
+        val_pc = min(1.0, self.pc_actions[idx_pc.item()] + self.rng.uniform(0, 0.05))
+        val_pm = min(1.0, self.pm_actions[idx_pm.item()] + self.rng.uniform(0, 0.02))
         
         return val_pc, val_pm
 
@@ -122,6 +131,46 @@ class PPOAgent:
             self._ppo_update()
             self.memory = []
 
+    def state_dict(self):
+        """
+        Trạng thái để lưu checkpoint (mọi tensor -> numpy array): trọng số policy/policy_old,
+        moment của Adam, batch memory chưa cập nhật, trạng thái RNG của torch và nhiễu Pc/Pm.
+        """
+        state = {f'policy.{k}': v.detach().cpu().numpy() for k, v in self.policy.state_dict().items()}
+        state.update({f'policy_old.{k}': v.detach().cpu().numpy() for k, v in self.policy_old.state_dict().items()})
+        for idx, param_state in self.optimizer.state_dict()['state'].items():
+            for k, v in param_state.items():
+                state[f'optimizer.{idx}.{k}'] = v.detach().cpu().numpy() if torch.is_tensor(v) else np.array(v)
+        for k in ('state', 'idx_pc', 'idx_pm', 'log_prob_pc', 'log_prob_pm'):
+            state[f'memory.{k}'] = np.array([m[k].detach().cpu().numpy() for m in self.memory])
+        state['memory.reward'] = np.array([m['reward'] for m in self.memory], dtype=float)
+        state['torch_rng'] = torch.get_rng_state().numpy()
+        if isinstance(self.rng, random.Random):
+            state['rng_state'], state['rng_gauss_next'] = random_state_to_array(self.rng.getstate())
+        state['initial_metrics'] = {k: (None if v is None else float(v)) for k, v in self.initial_metrics.items()}
+        return state
+
+    def load_state_dict(self, state):
+        self.policy.load_state_dict({k[len('policy.'):]: torch.as_tensor(v) for k, v in state.items() if k.startswith('policy.')})
+        self.policy_old.load_state_dict({k[len('policy_old.'):]: torch.as_tensor(v) for k, v in state.items() if k.startswith('policy_old.')})
+        optimizer_state = self.optimizer.state_dict()
+        optimizer_state['state'] = {}
+        for key, v in state.items():
+            if key.startswith('optimizer.'):
+                _, idx, k = key.split('.', 2)
+                optimizer_state['state'].setdefault(int(idx), {})[k] = torch.as_tensor(v)
+        self.optimizer.load_state_dict(optimizer_state)
+        self.memory = []
+        for i in range(len(state['memory.reward'])):
+            step = {k: torch.as_tensor(state[f'memory.{k}'][i]) for k in ('state', 'idx_pc', 'idx_pm', 'log_prob_pc', 'log_prob_pm')}
+            step['reward'] = float(state['memory.reward'][i])
+            self.memory.append(step)
+        torch.set_rng_state(torch.as_tensor(state['torch_rng'], dtype=torch.uint8))
+        if 'rng_state' in state:
+            self.rng = random.Random()
+            self.rng.setstate(random_state_from_array(state['rng_state'], state['rng_gauss_next']))
+        self.initial_metrics = dict(state['initial_metrics'])
+
 def _ppo_update(self):
         # 1. Chuẩn bị dữ liệu
         old_states = torch.stack([m['state'] for m in self.memory]).detach()
@@ -0,0 +1,101 @@
+"""
+Chỉ số chất lượng cho front (MCT, TEC, WCM) - bài toán minimization:
+    - hypervolume_3d: Hypervolume chính xác, thuật toán quét (sweep) theo trục thứ 3.
+    - igd, spread: so với một front tham chiếu (reference front), trên objectives đã chuẩn hoá.
+"""
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+def objective_matrix(solutions):
+    """Ma trận (N, 3) từ list Individual / ArchivedSolution, hoặc từ array sẵn có."""
+    if isinstance(solutions, np.ndarray):
+        return solutions.reshape(-1, 3).astype(float)
+    return np.array([(s.makespan, s.total_energy, s.wcm) for s in solutions], dtype=float).reshape(-1, 3)
+
+def hypervolume_3d(solutions, reference_point):
+    """
+    Hypervolume của front so với reference_point (các điểm không trội hẳn reference_point bị bỏ qua).
+
+    Quét các điểm theo mục tiêu thứ 3 tăng dần, duy trì "bậc thang" 2D (x tăng, y giảm) của các
+    điểm đã gặp cùng diện tích nó chiếm; thể tích += diện tích * bề dày lát cắt.
+    Mỗi điểm chèn/xoá bằng bisect trên list đã sắp (tổng O(n log n) phép so sánh).
+    """
+    F = objective_matrix(solutions)
+    rx, ry, rz = (float(v) for v in reference_point)
+    F = F[(F < [rx, ry, rz]).all(axis=1)]
+    if len(F) == 0:
+        return 0.0
+    F = F[np.argsort(F[:, 2], kind='stable')]
+
+    xs, ys = [], []     # Bậc thang: x tăng dần, y giảm dần
+    area = 0.0
+    volume = 0.0
+    points = F.tolist()
+    for i, (px, py, pz) in enumerate(points):
+        # Bị điểm có x <= px, y <= py trội (yếu) -> không đổi diện tích
+        j = bisect_right(xs, px) - 1
+        if j < 0 or ys[j] > py:
+            k = bisect_left(xs, px)
+            left_y = ys[k - 1] if k > 0 else ry
+            # Các điểm x >= px, y >= py bị p trội -> xoá (liên tiếp nhau từ vị trí k)
+            end = k
+            while end < len(xs) and ys[end] >= py:
+                end += 1
+            right_x = xs[end] if end < len(xs) else rx
+
+            # Diện tích mới = phần của [px, right_x) x [py, ry) chưa bị bậc thang cũ chiếm
+            seg_x = [px] + xs[k:end] + [right_x]
+            seg_y = [left_y] + ys[k:end]
+            for a in range(len(seg_y)):
+                area += (seg_x[a + 1] - seg_x[a]) * (seg_y[a] - py)
+            xs[k:end] = [px]
+            ys[k:end] = [py]
+
+        next_z = points[i + 1][2] if i + 1 < len(points) else rz
+        volume += area * (next_z - pz)
+    return volume
+
+def normalize(F, ideal, nadir):
+    """Chuẩn hoá objectives về [0, 1] theo ideal/nadir (mục tiêu có range 0 giữ thang đo 1)."""
+    scale = np.where(nadir - ideal > 0, nadir - ideal, 1.0)
+    return (F - ideal) / scale
+
+def _nearest_distances(A, B):
+    """Khoảng cách Euclid từ mỗi điểm của A tới điểm gần nhất của B."""
+    return np.sqrt(((A[:, None, :] - B[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+
+def igd(solutions, reference_front):
+    """
+    Inverted Generational Distance: trung bình khoảng cách từ mỗi điểm của reference_front
+    tới front cần đánh giá (objectives chuẩn hoá theo ideal/nadir của reference_front).
+    """
+    R = objective_matrix(reference_front)
+    F = objective_matrix(solutions)
+    if len(F) == 0 or len(R) == 0:
+        return float('inf')
+    ideal, nadir = R.min(axis=0), R.max(axis=0)
+    return float(_nearest_distances(normalize(R, ideal, nadir), normalize(F, ideal, nadir)).mean())
+
+def spread(solutions, reference_front):
+    """
+    Generalized spread (Delta) cho front nhiều mục tiêu (Zhou et al., 2006), 0 = phân bố đều:
+        Delta = (sum_m d(e_m, S) + sum_x |d(x, S) - d_mean|) / (sum_m d(e_m, S) + |S| * d_mean)
+    với e_m là điểm cực trị (tốt nhất theo mục tiêu m) của reference_front, d(x, S) là khoảng cách tới láng giềng gần nhất.
+    """
+    R = objective_matrix(reference_front)
+    F = objective_matrix(solutions)
+    if len(F) < 2 or len(R) == 0:
+        return float('inf')
+    ideal, nadir = R.min(axis=0), R.max(axis=0)
+    R, F = normalize(R, ideal, nadir), normalize(F, ideal, nadir)
+
+    extremes = R[np.argmin(R, axis=0)]
+    d_extreme = _nearest_distances(extremes, F).sum()
+    D = np.sqrt(((F[:, None, :] - F[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(D, np.inf)
+    d = D.min(axis=1)
+    d_mean = d.mean()
+    denominator = d_extreme + len(F) * d_mean
+    if denominator == 0:
+        return 0.0
+    return float((d_extreme + np.abs(d - d_mean).sum()) / denominator)
@@ -0,0 +1,44 @@
+import random
+import numpy as np
+
+# Các thành phần ngẫu nhiên của KEARL, mỗi thành phần 1 luồng RNG độc lập.
+# Chỉ thêm tên mới vào CUỐI tuple: thứ tự quyết định luồng con của SeedSequence.spawn().
+COMPONENTS = ('initialization', 'variation', 'vns', 'rl', 'breakdown', 'ppo')
+
+class RandomStreams:
+    """
+    Sinh các luồng RNG độc lập cho từng thành phần từ 1 seed duy nhất
+    (numpy.random.SeedSequence(seed).spawn -> mỗi thành phần 1 seed con).
+
+    - streams['vns'] -> random.Random: dùng trong các vòng lặp nóng (choice/randint/sample trên
+      từng phần tử), cùng API với module random nên thay thế trực tiếp.
+    - streams.generator('vns') -> numpy.random.Generator cho các thao tác vector hoá.
+    - streams.seed_for('ppo') -> seed nguyên (ví dụ cho torch.manual_seed).
+
+    Luồng của 1 thành phần không phụ thuộc số lần gọi của thành phần khác
+    -> thay đổi VNS không làm lệch quần thể khởi tạo hay breakdown.
+    """
+    def __init__(self, seed):
+        self.seed = seed
+        children = np.random.SeedSequence(seed).spawn(len(COMPONENTS))
+        self._seeds = {name: int(child.generate_state(1, dtype=np.uint64)[0])
+                       for name, child in zip(COMPONENTS, children)}
+        self.rngs = {name: random.Random(s) for name, s in self._seeds.items()}
+
+    def __getitem__(self, name):
+        return self.rngs[name]
+
+    def seed_for(self, name):
+        return self._seeds[name]
+
+    def generator(self, name):
+        """numpy.random.Generator mới, tất định theo seed của thành phần."""
+        return np.random.default_rng(self._seeds[name])
+
+    def getstate(self):
+        """Trạng thái của mọi luồng random.Random (dùng cho checkpoint)."""
+        return {name: rng.getstate() for name, rng in self.rngs.items()}
+
+    def setstate(self, state):
+        for name, rng_state in state.items():
+            self.rngs[name].setstate(rng_state)
@@ -2,10 +2,12 @@ import numpy as np
 import random
 
 class RLAgent:
-    def __init__(self, alpha=0.1, gamma=0.9, epsilon_start=0.9, epsilon_min=0.05, max_generations=200):
+    def __init__(self, alpha=0.1, gamma=0.9, epsilon_start=0.9, epsilon_min=0.05, max_generations=200, rng=random):
         """
         Khởi tạo Agent cho KEARL hỗ trợ cả Q-Learning và SARSA.
+        rng (random.Random): Nguồn ngẫu nhiên cho epsilon-greedy và nhiễu Pc/Pm.
         """
+        self.rng = rng
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon_start
@@ -62,15 +64,15 @@ class RLAgent:
 
     def _choose_action_index(self, q_table, state):
         """Helper: Chọn index hành động dựa trên Epsilon-Greedy (cho nội bộ class dùng)"""
-        if random.random() > self.epsilon:
+        if self.rng.random() > self.epsilon:
             # Exploitation
             # Nếu có nhiều max bằng nhau thì chọn ngẫu nhiên trong số đó (tránh bias)
             max_val = np.max(q_table[state])
             candidates = np.where(q_table[state] == max_val)[0]
-            return random.choice(candidates)
+            return self.rng.choice(candidates)
         else:
             # Exploration
-            return random.randint(0, q_table.shape[1] - 1)
+            return self.rng.randint(0, q_table.shape[1] - 1)
 
     def select_action(self, state, current_gen):
         """
@@ -93,8 +95,8 @@ class RLAgent:
         base_pc = self.pc_actions[idx_pc]
         base_pm = self.pm_actions[idx_pm]
         
-        final_pc = min(1.0, base_pc + random.uniform(0, 0.05))
-        final_pm = min(1.0, base_pm + random.uniform(0, 0.02))
+        final_pc = min(1.0, base_pc + self.rng.uniform(0, 0.05))
+        final_pm = min(1.0, base_pm + self.rng.uniform(0, 0.02))
         
         return final_pc, final_pm
 
@@ -149,4 +151,25 @@ class RLAgent:
             target_pm = self.q_table_pm[next_state, next_action_pm]
 
         new_q_pm = (1 - self.alpha) * q_curr_pm + self.alpha * (reward + self.gamma * target_pm)
-        self.q_table_pm[self.last_state, self.last_action_idx_pm] = new_q_pm
\ No newline at end of file
+        self.q_table_pm[self.last_state, self.last_action_idx_pm] = new_q_pm
+
+    def state_dict(self):
+        """Trạng thái học được (Q-table, epsilon, bước t trước) để lưu checkpoint."""
+        return {
+            'q_table_pc': self.q_table_pc.copy(),
+            'q_table_pm': self.q_table_pm.copy(),
+            'epsilon': float(self.epsilon),
+            'initial_metrics': {k: (None if v is None else float(v)) for k, v in self.initial_metrics.items()},
+            'last_state': int(self.last_state),
+            'last_action_idx_pc': int(self.last_action_idx_pc),
+            'last_action_idx_pm': int(self.last_action_idx_pm),
+        }
+
+    def load_state_dict(self, state):
+        self.q_table_pc = np.array(state['q_table_pc'], dtype=float)
+        self.q_table_pm = np.array(state['q_table_pm'], dtype=float)
+        self.epsilon = state['epsilon']
+        self.initial_metrics = dict(state['initial_metrics'])
+        self.last_state = state['last_state']
+        self.last_action_idx_pc = state['last_action_idx_pc']
+        self.last_action_idx_pm = state['last_action_idx_pm']
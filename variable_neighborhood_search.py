@@ -1,16 +1,28 @@
 import random
-import copy
 import math
 
+from move_evaluator import ReassignmentEvaluator
+
 class VariableNeighborhoodSearch:
-    def __init__(self, factory, tabu_size=10, max_iter=30):
+    def __init__(self, factory, tabu_size=10, max_iter=30, rng=random, block_scan=False, block_top_k=3):
         """
         Knowledge-guided Variable Neighborhood Search (VNS)
+
+        Args:
+            block_scan (bool): Thay N2'/N3'/N4' (mỗi toán tử thử 1 nước ngẫu nhiên) bằng quét toàn bộ láng giềng
+                               của mọi critical block (operator_block_scan).
+            block_top_k (int): Số nước đi tốt nhất theo ước lượng head/tail được decode đầy đủ khi block_scan.
+            rng (random.Random): Nguồn ngẫu nhiên cho các toán tử (mặc định: module random).
         """
         self.factory = factory
+        self.rng = rng
         self.tabu_list = [] 
         self.tabu_size = tabu_size
         self.max_iter = max_iter # MNS param (Table 5)
+        self.block_scan = block_scan
+        self.block_top_k = block_top_k
+        # Tổng số láng giềng đã được đánh giá (decode)
+        self.evaluations = 0
 
     def run_vns(self, individual):
         """
@@ -20,7 +32,7 @@ class VariableNeighborhoodSearch:
         if not individual.detailed_schedule or individual.makespan == 0:
             individual.decode()
 
-        best_ind = copy.deepcopy(individual)
+        best_ind = individual.clone()
 
         # 1. N1': Critical Path Move (Tabu Search)
         ind_n1 = self.operator_n1_tabu_search(best_ind)
@@ -31,6 +43,13 @@ class VariableNeighborhoodSearch:
         blocks = self.get_critical_blocks(best_ind)
         if not blocks: return best_ind
 
+        if self.block_scan:
+            # N2' + N3' + N4': best-improvement trên toàn bộ láng giềng của các block
+            ind_b = self.operator_block_scan(best_ind, blocks)
+            if ind_b.makespan < best_ind.makespan:
+                best_ind = ind_b
+            return best_ind
+
         # 2. N2': Move to Block Tail
         ind_n2 = self.operator_n2_block_tail(best_ind, blocks)
         if ind_n2.makespan < best_ind.makespan:
@@ -56,131 +75,16 @@ class VariableNeighborhoodSearch:
     def get_critical_path(self, individual):
         """
         Tìm đường găng dựa trên Algorithm 1.
-        Sử dụng 'detailed_schedule' từ class Individual.
+        Lần ngược theo cạnh ràng buộc (máy trước / job trước) trong OperationRecords của cá thể,
+        ưu tiên cạnh máy khi cả 2 cùng khít (để tạo Block). Trả về list global op index [Start -> End].
         """
-        schedule = individual.detailed_schedule
-        
-        # 1. Tìm Operation kết thúc cuối cùng (xác định Makespan)
-        critical_op_node = None
-        max_end_time = -1.0
-        
-        for m_id, tasks in schedule.items():
-            if not tasks: continue
-            last_task = tasks[-1] # Task cuối cùng trên máy
-            if last_task['end'] > max_end_time:
-                max_end_time = last_task['end']
-                critical_op_node = last_task
-
-        if critical_op_node is None: return []
-
-        # 2. Backtrack (Truy vết ngược)
-        critical_path = [critical_op_node]
-        current_node = critical_op_node
-        
-        while True:
-            # Điều kiện dừng: Start Time ~ 0
-            if current_node['start'] <= 1e-4:
-                break
-                
-            op_obj = current_node['op']
-            machine_id = current_node['machine']
-            
-            # --- Tìm các Tiền nhiệm (Predecessors) ---
-            
-            # A. Machine Predecessor (Op ngay trước trên cùng máy)
-            mach_pred_node = None
-            tasks_on_machine = schedule[machine_id]
-            # (Giả định tasks đã sort theo start time trong decode)
-            # Tìm index của op hiện tại
-            # Lưu ý: So sánh object identity để an toàn
-            for i in range(len(tasks_on_machine) - 1, 0, -1):
-                if tasks_on_machine[i]['op'] is op_obj:
-                    mach_pred_node = tasks_on_machine[i-1]
-                    break
-            
-            # B. Job Predecessor (Op trước của cùng Job)
-            job_pred_node = None
-            job_pred_finish_time = 0.0
-            
-            if op_obj.op_id > 0: # Không phải op đầu tiên của Job
-                # Tìm Op trước trong Job (cần tìm nó chạy máy nào)
-                pred_op_obj = individual.jobs[op_obj.job_id].operations[op_obj.op_id - 1]
-                
-                # Quét schedule để tìm node của pred_op_obj
-                # (Có thể tối ưu bằng map ngược, nhưng loop này cũng nhanh)
-                found = False
-                for m_id, m_tasks in schedule.items():
-                    for t in m_tasks:
-                        if t['op'] is pred_op_obj:
-                            job_pred_node = t
-                            found = True
-                            break
-                    if found: break
-                
-                # Tính thời gian sau khi vận chuyển
-                if job_pred_node:
-                    transport = 0.0
-                    if job_pred_node['machine'] != machine_id:
-                        transport = self.factory.params.TT_matrix[job_pred_node['machine']][machine_id]
-                    job_pred_finish_time = job_pred_node['end'] + transport
-
-            # --- So sánh để chọn hướng đi tiếp (Algorithm 1) ---
-            # StartTime hiện tại bị ràng buộc bởi cái nào kết thúc muộn nhất?
-            
-            mach_pred_end = mach_pred_node['end'] if mach_pred_node else 0.0
-            
-            # Ưu tiên Machine Constraint nếu thời gian khít nhau (để tạo Block)
-            # Dung sai so sánh số thực
-            EPS = 1e-4
-            
-            is_machine_constrained = abs(current_node['start'] - mach_pred_end) < EPS
-            is_job_constrained = abs(current_node['start'] - job_pred_finish_time) < EPS
-            
-            if is_machine_constrained:
-                critical_path.append(mach_pred_node)
-                current_node = mach_pred_node
-            elif is_job_constrained and job_pred_node:
-                critical_path.append(job_pred_node)
-                current_node = job_pred_node
-            else:
-                # Trường hợp đặc biệt (ví dụ Job đến sớm nhưng phải đợi Setup/Idle)
-                # Theo heuristic: ưu tiên bám theo máy nếu có thể để hình thành block dài
-                if mach_pred_node and current_node['start'] >= mach_pred_end:
-                     critical_path.append(mach_pred_node)
-                     current_node = mach_pred_node
-                elif job_pred_node:
-                     critical_path.append(job_pred_node)
-                     current_node = job_pred_node
-                else:
-                    break # Không tìm thấy đường
-
-        return critical_path[::-1] # Đảo ngược lại [Start -> End]
+        return individual.operation_records().critical_path()
 
     def get_critical_blocks(self, individual):
         """
-        Gom các Critical Op liên tiếp trên cùng 1 máy thành Block.
+        Gom các Critical Op liên tiếp trên cùng 1 máy thành Block (list global op index, >= 2 ops).
         """
-        path = self.get_critical_path(individual)
-        if not path: return []
-        
-        blocks = []
-        current_block = [path[0]]
-        
-        for i in range(1, len(path)):
-            prev = path[i-1]
-            curr = path[i]
-            
-            if prev['machine'] == curr['machine']:
-                current_block.append(curr)
-            else:
-                if len(current_block) > 1: # Block chỉ tính khi có >= 2 ops
-                    blocks.append(current_block)
-                current_block = [curr]
-        
-        if len(current_block) > 1:
-            blocks.append(current_block)
-            
-        return blocks
+        return individual.operation_records().critical_blocks()
 
     # ========================================================
     #       NEIGHBORHOOD OPERATORS (N1 - N4)
@@ -192,72 +96,61 @@ class VariableNeighborhoodSearch:
         Thay đổi máy cho 1 operation trên đường găng.
         """
         path = self.get_critical_path(individual)
+        ci = individual.compiled
         # Chỉ xét op có thể chuyển sang máy khác
-        candidates = [node for node in path if len(node['op'].sorted_machine_ids) > 1]
+        candidates = [g for g in path if ci.num_slots_list[g] > 1]
         
         if not candidates: return individual
         
-        best_global_ind = copy.deepcopy(individual)
-        curr_ind = copy.deepcopy(individual)
-        
+        # Lời giải hiện tại được giữ trong engine dạng mảng, chỉ lời giải tốt nhất được decode đầy đủ
+        engine = ReassignmentEvaluator(individual)
+        best_makespan = individual.makespan
+        best_ms = None
+
         # Tabu Loop
         for _ in range(self.max_iter):
-            # Chọn ngẫu nhiên 1 op để di chuyển
-            target_node = random.choice(candidates)
-            op_obj = target_node['op']
-            
-            # Lấy index gene trong MS (O(1) nhờ map)
-            gene_idx = curr_ind.op_to_index_map[(op_obj.job_id, op_obj.op_id)]
-            current_ms_val = curr_ind.ms[gene_idx]
-            
-            num_machines = len(op_obj.sorted_machine_ids)
-            possible_moves = range(num_machines)
-            
-            best_local_ind = None
-            best_local_move_info = None # (gene_idx, new_val, signature)
+            # Chọn ngẫu nhiên 1 op để di chuyển (global op index = index gene trong MS)
+            gene_idx = self.rng.choice(candidates)
+            op_obj = ci.all_operations[gene_idx]
+
+            # Makespan của mọi neighbor (thử di chuyển sang tất cả các máy khác), không dựng lịch
+            neighbor_makespans = engine.makespans(gene_idx)
+            self.evaluations += len(neighbor_makespans) - 1
+
+            best_local_move = None
             min_local_makespan = float('inf')
-            
-            # Thử di chuyển sang tất cả các máy khác
-            for new_val in possible_moves:
-                if new_val == current_ms_val: continue
-                
+            for new_val, makespan in enumerate(neighbor_makespans):
+                if makespan is None: continue
                 # Tabu check: (Job, Op, NewMachineIndex)
                 move_sig = (op_obj.job_id, op_obj.op_id, new_val)
-                
+
                 # Aspiration Criteria: Nếu bị cấm nhưng tốt hơn Global Best thì vẫn lấy
-                is_tabu = move_sig in self.tabu_list
-                
-                # Tạo neighbor
-                temp_ind = copy.deepcopy(curr_ind)
-                temp_ind.ms[gene_idx] = new_val
-                temp_ind.decode() # Tính Makespan
-                
-                # Logic Aspiration
-                if is_tabu and temp_ind.makespan >= best_global_ind.makespan:
-                    continue # Skip if tabu and not executing aspiration
-                
-                if temp_ind.makespan < min_local_makespan:
-                    min_local_makespan = temp_ind.makespan
-                    best_local_ind = temp_ind
-                    best_local_move_info = (move_sig)
+                if move_sig in self.tabu_list and makespan >= best_makespan:
+                    continue
+
+                if makespan < min_local_makespan:
+                    min_local_makespan = makespan
+                    best_local_move = move_sig
 
             # Thực hiện move tốt nhất tìm được
-            if best_local_ind:
-                curr_ind = best_local_ind
-                move_sig = best_local_move_info
-                
+            if best_local_move:
+                engine.apply(gene_idx, best_local_move[2])
+
                 # Update Tabu List
-                self.tabu_list.append(move_sig)
+                self.tabu_list.append(best_local_move)
                 if len(self.tabu_list) > self.tabu_size:
                     self.tabu_list.pop(0)
-                
+
                 # Update Global Best
-                if curr_ind.makespan < best_global_ind.makespan:
-                    best_global_ind = copy.deepcopy(curr_ind)
+                if engine.makespan < best_makespan:
+                    best_makespan = engine.makespan
+                    best_ms = engine.ms_list()
             else:
                 break # Dead end
 
-        return best_global_ind
+        if best_ms is None:
+            return individual.clone()
+        return engine.to_individual(best_ms)
 
     def operator_n2_block_tail(self, individual, blocks):
         """
@@ -265,18 +158,15 @@ class VariableNeighborhoodSearch:
         Swap 1 op bất kỳ trong block (trừ tail) ra vị trí cuối block trong OS.
         """
         if not blocks: return individual
-        block = random.choice(blocks)
+        block = self.rng.choice(blocks)
         
         # Cần block có ít nhất 2 phần tử
         if len(block) < 2: return individual
         
         # Chọn op để di chuyển (không chọn tail)
         # Trong bài báo nói "intermediate", nhưng logic tổng quát là move cái gì đó về đuôi
-        target_idx = random.randint(0, len(block) - 2)
-        target_op = block[target_idx]['op']
-        tail_op = block[-1]['op']
-        
-        return self._swap_ops_in_os(individual, target_op, tail_op)
+        target_idx = self.rng.randint(0, len(block) - 2)
+        return self._swap_ops_in_os(individual, block[target_idx], block[-1])
 
     def operator_n3_block_head(self, individual, blocks):
         """
@@ -284,15 +174,12 @@ class VariableNeighborhoodSearch:
         Swap 1 op bất kỳ trong block (trừ head) ra vị trí đầu block trong OS.
         """
         if not blocks: return individual
-        block = random.choice(blocks)
+        block = self.rng.choice(blocks)
         if len(block) < 2: return individual
         
         # Chọn op để di chuyển (từ vị trí 1 trở đi)
-        target_idx = random.randint(1, len(block) - 1)
-        target_op = block[target_idx]['op']
-        head_op = block[0]['op']
-        
-        return self._swap_ops_in_os(individual, target_op, head_op)
+        target_idx = self.rng.randint(1, len(block) - 1)
+        return self._swap_ops_in_os(individual, block[target_idx], block[0])
 
     def operator_n4_random_swap(self, individual, blocks):
         """
@@ -300,52 +187,60 @@ class VariableNeighborhoodSearch:
         Tráo đổi vị trí 2 op bất kỳ trong cùng 1 block.
         """
         if not blocks: return individual
-        block = random.choice(blocks)
+        block = self.rng.choice(blocks)
         if len(block) < 2: return individual
         
-        idx1, idx2 = random.sample(range(len(block)), 2)
-        op1 = block[idx1]['op']
-        op2 = block[idx2]['op']
-        
-        return self._swap_ops_in_os(individual, op1, op2)
+        idx1, idx2 = self.rng.sample(range(len(block)), 2)
+        return self._swap_ops_in_os(individual, block[idx1], block[idx2])
+
+    def operator_block_scan(self, individual, blocks):
+        """
+        N2' + N3' + N4' với best-improvement:
+        1. Liệt kê mọi nước đi của các block: N2' (op -> tail), N3' (op -> head), N4' (cặp bất kỳ);
+           hợp của chúng là mọi cặp op trong cùng block (bỏ cặp cùng job: đổi chỗ trong OS không có tác dụng).
+        2. Ước lượng makespan từng nước bằng head/tail (OperationRecords.estimate_swaps), không decode.
+        3. Decode đầy đủ (tăng dần) block_top_k nước có ước lượng nhỏ nhất, lấy nước tốt nhất nếu cải thiện.
+        """
+        records = individual.operation_records()
+        op_job = individual.compiled.op_job
+        moves = []
+        for block in blocks:
+            for estimate, i, j in records.estimate_swaps(block):
+                if op_job[block[i]] != op_job[block[j]]:
+                    moves.append((estimate, block[i], block[j]))
+        if not moves: return individual
+
+        # Sort ổn định theo ước lượng (hoà -> theo thứ tự liệt kê)
+        moves.sort(key=lambda move: move[0])
+        op_pos = individual.os_index()[0]
+        best_ind = individual
+        for _, g1, g2 in moves[:self.block_top_k]:
+            idx1, idx2 = op_pos[g1], op_pos[g2]
+            new_ind = individual.clone(copy_objectives=False)
+            new_ind.swap_os(idx1, idx2)
+            new_ind.decode(base=individual, first_pos=min(idx1, idx2))
+            self.evaluations += 1
+            if new_ind.makespan < best_ind.makespan:
+                best_ind = new_ind
+        return best_ind
 
     # ================= HELPER FUNCTIONS =================
 
-    def _swap_ops_in_os(self, individual, op1, op2):
+    def _swap_ops_in_os(self, individual, g1, g2):
         """
-        Tìm và hoán đổi vị trí của op1 và op2 trong vector OS.
-        Lưu ý: OS chỉ chứa Job ID, cần đếm lần xuất hiện để tìm đúng index.
+        Hoán đổi vị trí trong OS của 2 operation g1, g2 (global op index).
+        Vị trí tra O(1) qua Individual.os_index() (dựng 1 lần trên cá thể gốc, bản clone sao chép theo).
         """
-        new_ind = copy.deepcopy(individual)
-        os_vec = new_ind.os
-        
-        idx1 = self._find_os_index(os_vec, op1)
-        idx2 = self._find_os_index(os_vec, op2)
-        
-        if idx1 != -1 and idx2 != -1:
-            # Swap
-            os_vec[idx1], os_vec[idx2] = os_vec[idx2], os_vec[idx1]
-            new_ind.decode() # Tính lại fitness
-            
-            # Acceptance Criterion: Chỉ lấy nếu tốt hơn (Greedy)
-            if new_ind.makespan < individual.makespan:
-                return new_ind
-                
-        return individual
+        op_pos = individual.os_index()[0]
+        idx1, idx2 = op_pos[g1], op_pos[g2]
 
-    def _find_os_index(self, os_vec, op_obj):
-        """
-        Tìm index của op_obj trong vector OS.
-        Vector OS: [1, 2, 1, 3...]
-        Op: Job 1, op_id 1 -> Tìm số 1 xuất hiện lần thứ 2.
-        """
-        target_job = op_obj.job_id
-        target_count = op_obj.op_id # 0-based index
-        
-        current_count = 0
-        for i, job_id in enumerate(os_vec):
-            if job_id == target_job:
-                if current_count == target_count:
-                    return i
-                current_count += 1
-        return -1
\ No newline at end of file
+        new_ind = individual.clone(copy_objectives=False)
+        new_ind.swap_os(idx1, idx2)
+        new_ind.decode(base=individual, first_pos=min(idx1, idx2)) # Tính lại fitness (từ vị trí đổi đầu tiên)
+        self.evaluations += 1
+
+        # Acceptance Criterion: Chỉ lấy nếu tốt hơn (Greedy)
+        if new_ind.makespan < individual.makespan:
+            return new_ind
+
+        return individual